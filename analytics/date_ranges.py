@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import calendar
 from dataclasses import dataclass
 from datetime import date, datetime, time, timedelta
 
@@ -31,3 +32,50 @@ def bucket_for_range(date_range: DateRange) -> str:
     if days <= 365:
         return "week"
     return "month"
+
+
+@dataclass(frozen=True)
+class RangePlan:
+    # Disjoint spans that together cover a range exactly: whole calendar years, whole months
+    # outside those years, and the leftover days at either edge.
+    years: tuple[DateRange, ...]
+    months: tuple[DateRange, ...]
+    days: tuple[DateRange, ...]
+
+
+def _month_end(day: date) -> date:
+    return day.replace(day=calendar.monthrange(day.year, day.month)[1])
+
+
+def _split_months(start: date, end: date) -> tuple[list[DateRange], list[DateRange]]:
+    first = start if start.day == 1 else _month_end(start) + timedelta(days=1)
+    last = end if end == _month_end(end) else end.replace(day=1) - timedelta(days=1)
+    if first > last:
+        return [], [DateRange(start, end, label="days")]
+    days = []
+    if start < first:
+        days.append(DateRange(start, first - timedelta(days=1), label="days"))
+    if last < end:
+        days.append(DateRange(last + timedelta(days=1), end, label="days"))
+    return [DateRange(first, last, label="months")], days
+
+
+def plan_range(date_range: DateRange) -> RangePlan:
+    start, end = date_range.start, date_range.end
+    first_year = start.year if (start.month, start.day) == (1, 1) else start.year + 1
+    last_year = end.year if (end.month, end.day) == (12, 31) else end.year - 1
+    years: list[DateRange] = []
+    edges = [(start, end)]
+    if first_year <= last_year:
+        whole = DateRange(date(first_year, 1, 1), date(last_year, 12, 31), label="years")
+        years.append(whole)
+        edges = [(start, whole.start - timedelta(days=1)), (whole.end + timedelta(days=1), end)]
+
+    months: list[DateRange] = []
+    days: list[DateRange] = []
+    for edge_start, edge_end in edges:
+        if edge_start <= edge_end:
+            edge_months, edge_days = _split_months(edge_start, edge_end)
+            months += edge_months
+            days += edge_days
+    return RangePlan(years=tuple(years), months=tuple(months), days=tuple(days))
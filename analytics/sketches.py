@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+import hashlib
+import math
+from collections.abc import Iterable
+
+import numpy as np
+
+# Mergeable distinct-count sketches. A set of up to SPARSE_LIMIT ids is stored as its sorted
+# 64-bit hashes, which count exactly and merge by union. Larger sets, and any merge that outgrows
+# the limit, become HyperLogLog registers: 2**14 of them, about 0.8% standard error.
+PRECISION = 14
+REGISTERS = 1 << PRECISION
+SPARSE_LIMIT = REGISTERS // 8  # as many bytes of hashes as the registers take
+
+_SPARSE = b"S"
+_DENSE = b"D"
+_HASH_BITS = 64 - PRECISION
+
+
+def hash_ids(ids: Iterable[str]) -> np.ndarray:
+    # blake2b rather than hash(), so sketches written by one process merge with another's.
+    return np.array(
+        [
+            int.from_bytes(hashlib.blake2b(value.encode(), digest_size=8).digest(), "little")
+            for value in ids
+        ],
+        dtype=np.uint64,
+    )
+
+
+def _registers(hashes: np.ndarray) -> np.ndarray:
+    registers = np.zeros(REGISTERS, dtype=np.uint8)
+    if hashes.size:
+        index = (hashes >> np.uint64(_HASH_BITS)).astype(np.intp)
+        rest = hashes & np.uint64((1 << _HASH_BITS) - 1)
+        # Below 2**53 the float conversion is exact, so frexp's exponent is the bit length.
+        rank = _HASH_BITS + 1 - np.frexp(rest.astype(np.float64))[1]
+        np.maximum.at(registers, index, rank.astype(np.uint8))
+    return registers
+
+
+def encode_sketch(hashes: np.ndarray) -> bytes:
+    hashes = np.unique(hashes)
+    if hashes.size <= SPARSE_LIMIT:
+        return _SPARSE + hashes.astype("<u8").tobytes()
+    return _DENSE + _registers(hashes).tobytes()
+
+
+def build_sketch(ids: Iterable[str]) -> bytes:
+    return encode_sketch(hash_ids(ids))
+
+
+def _estimate(registers: np.ndarray) -> int:
+    alpha = 0.7213 / (1 + 1.079 / REGISTERS)
+    raw = alpha * REGISTERS * REGISTERS / float(np.ldexp(1.0, -registers.astype(np.int32)).sum())
+    zeros = int(np.count_nonzero(registers == 0))
+    if raw <= 2.5 * REGISTERS and zeros:
+        # Linear counting is more accurate while many registers are still empty.
+        return round(REGISTERS * math.log(REGISTERS / zeros))
+    return round(raw)
+
+
+def merged_count(sketches: Iterable[bytes | None]) -> int:
+    sparse: list[np.ndarray] = []
+    dense: list[np.ndarray] = []
+    for sketch in sketches:
+        if not sketch:
+            continue
+        body = np.frombuffer(sketch, dtype=np.uint8, offset=1)
+        if sketch[:1] == _SPARSE:
+            sparse.append(body.view("<u8"))
+        else:
+            dense.append(body)
+
+    hashes = np.unique(np.concatenate(sparse)) if sparse else np.empty(0, dtype=np.uint64)
+    if not dense and hashes.size <= SPARSE_LIMIT:
+        return int(hashes.size)
+    registers = _registers(hashes)
+    for other in dense:
+        np.maximum(registers, other, out=registers)
+    return _estimate(registers)
@@ -16,11 +16,11 @@ from analytics.wrapped import classify_era
 from app.types import DateRange
 from app.ui.components import empty_state, metric_row
 from app.ui.settings import render_settings_page
+from db.query_stats import track_cache
 from db.repository import (
     Pagination,
     album_daily_trend,
     artist_daily_trend,
-    daily_minutes,
     genre_evolution,
     get_kpis,
     hourly_distribution,
@@ -38,6 +38,7 @@ from db.repository import (
     top_entities_for_dashboard,
     top_genres,
     top_songs,
+    weekday_week_matrix,
     weekday_weekend,
 )
 from spotify.client import artist_image_urls
@@ -48,16 +49,19 @@ def _to_analytics_range(date_range: DateRange) -> AnalyticsDateRange:
     return AnalyticsDateRange(start=date_range.start, end=date_range.end, label=date_range.label)
 
 
+@track_cache("get_kpis")
 @st.cache_data(ttl=60)
 def _cached_kpis(start: date, end: date) -> dict[str, float]:
     return get_kpis(AnalyticsDateRange(start=start, end=end, label="cached"))
 
 
+@track_cache("weekday_week_matrix")
 @st.cache_data(ttl=60)
-def _cached_daily(start: date, end: date) -> pd.DataFrame:
-    return daily_minutes(AnalyticsDateRange(start=start, end=end, label="cached"))
+def _cached_heatmap(start: date, end: date) -> pd.DataFrame:
+    return weekday_week_matrix(AnalyticsDateRange(start=start, end=end, label="cached"))
 
 
+@track_cache("top_entities_for_dashboard")
 @st.cache_data(ttl=60)
 def _cached_top(start: date, end: date) -> tuple[pd.DataFrame, pd.DataFrame]:
     return top_entities_for_dashboard(AnalyticsDateRange(start=start, end=end, label="cached"))
@@ -165,15 +169,12 @@ def _render_dashboard(date_range: DateRange) -> None:
             st.plotly_chart(fig, use_container_width=True)
 
     st.subheader("Listening heatmap")
-    daily = _cached_daily(date_range.start, date_range.end)
-    if daily.empty:
+    matrix = _cached_heatmap(date_range.start, date_range.end)
+    if matrix.empty:
         empty_state("No daily listening data.")
     else:
-        daily["day"] = pd.to_datetime(daily["day"])
-        daily["weekday"] = daily["day"].dt.weekday
-        daily["week"] = daily["day"].dt.isocalendar().week.astype(int)
-        pivot = daily.pivot_table(index="weekday", columns="week", values="minutes", fill_value=0)
-        fig = px.imshow(pivot, aspect="auto", labels={"x": "ISO Week", "y": "Weekday", "color": "Minutes"})
+        pivot = matrix.pivot_table(index="weekday", columns="week", values="minutes", fill_value=0)
+        fig = px.imshow(pivot, aspect="auto", labels={"x": "Week of", "y": "Weekday", "color": "Minutes"})
         st.plotly_chart(fig, use_container_width=True)
 
 
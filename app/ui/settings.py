@@ -1,11 +1,11 @@
 from __future__ import annotations
 
-import tempfile
-from pathlib import Path
+import zipfile
 
 import streamlit as st
 
 from analytics.date_ranges import DateRange
+from db import query_stats, slow_queries
 from db.repository import get_setting
 from db.seed_demo import seed_from_demo_file
 from exports.csv_export import export_rankings_csv
@@ -21,14 +21,22 @@ from spotify.auth import (
     is_connected,
 )
 from spotify.client import current_user_profile
-from spotify.sync import LAST_SYNC_KEY, import_extended_history_files, sync_recently_played
+from spotify.history import HistorySource, history_zip_members
+from spotify.sync import (
+    LAST_SYNC_KEY,
+    ImportProgress,
+    import_extended_history_files,
+    sync_recently_played,
+)
 
 
 def render_settings_page(date_range: DateRange) -> None:
     st.title("Settings")
     st.caption(f"Date range: {date_range.start.isoformat()} to {date_range.end.isoformat()}")
 
-    connect_tab, import_tab, export_tab = st.tabs(["Connect", "Import", "Export"])
+    connect_tab, import_tab, export_tab, diagnostics_tab = st.tabs(
+        ["Connect", "Import", "Export", "Diagnostics"]
+    )
 
     with connect_tab:
         _render_connect_section()
@@ -39,6 +47,9 @@ def render_settings_page(date_range: DateRange) -> None:
     with export_tab:
         _render_export_section(date_range)
 
+    with diagnostics_tab:
+        _render_diagnostics_section()
+
 
 def _render_connect_section() -> None:
     st.subheader("Spotify OAuth")
@@ -93,30 +104,26 @@ def _render_connect_section() -> None:
 
 def _render_import_section() -> None:
     st.subheader("Historical Import")
-    st.caption("Upload Spotify Extended Streaming History JSON files (StreamingHistory*.json).")
+    st.caption(
+        "Upload the Spotify data export ZIP, or Extended Streaming History JSON files "
+        "(Streaming_History_Audio_*.json)."
+    )
 
     uploaded = st.file_uploader(
-        "Upload one or more JSON files",
-        type=["json"],
+        "Upload the export ZIP or one or more JSON files",
+        type=["json", "zip"],
         accept_multiple_files=True,
     )
+    c1, c2 = st.columns(2)
+    with c1:
+        include_video = st.checkbox("Include video history", value=False)
+    with c2:
+        include_podcasts = st.checkbox("Include podcast episodes", value=False)
 
     if uploaded and st.button("Import Uploaded Files", use_container_width=True):
-        temp_paths: list[str] = []
-        try:
-            for file in uploaded:
-                with tempfile.NamedTemporaryFile(delete=False, suffix=".json") as tmp:
-                    tmp.write(file.getbuffer())
-                    temp_paths.append(tmp.name)
-            try:
-                with st.spinner("Importing history files..."):
-                    inserted = import_extended_history_files(temp_paths)
-                st.success(f"Import complete. Inserted {inserted} listens.")
-            except Exception as exc:  # noqa: BLE001
-                st.error(f"Import failed: {exc}")
-        finally:
-            for path in temp_paths:
-                Path(path).unlink(missing_ok=True)
+        _run_history_import(
+            uploaded, include_video=include_video, include_podcasts=include_podcasts
+        )
 
     st.divider()
     st.subheader("Demo Mode")
@@ -125,6 +132,45 @@ def _render_import_section() -> None:
         st.success(f"Demo data loaded. Processed {inserted} rows.")
 
 
+def _run_history_import(uploaded: list, include_video: bool, include_podcasts: bool) -> None:
+    try:
+        sources: list[HistorySource] = []
+        for file in uploaded:
+            if file.name.lower().endswith(".zip"):
+                sources.extend(history_zip_members(file, include_video=include_video))
+            else:
+                sources.append(file)
+    except zipfile.BadZipFile as exc:
+        st.error(f"Import failed: {exc}")
+        return
+    if not sources:
+        st.warning("No Streaming_History_Audio_*.json files found in the upload.")
+        return
+
+    overall = st.progress(0.0, text=f"Importing {len(sources)} files...")
+    file_lines = [st.empty() for _ in sources]
+    finished: set[int] = set()
+
+    def on_progress(event: ImportProgress) -> None:
+        if event.done:
+            finished.add(event.index)
+            file_lines[event.index].caption(f"Done: {event.name} ({event.items} listens)")
+            overall.progress(
+                len(finished) / event.total,
+                text=f"Imported {len(finished)} of {event.total} files",
+            )
+        else:
+            file_lines[event.index].caption(f"Importing {event.name}: {event.items} read")
+
+    try:
+        inserted = import_extended_history_files(
+            sources, progress=on_progress, include_podcasts=include_podcasts
+        )
+        st.success(f"Import complete. Inserted {inserted} listens.")
+    except Exception as exc:  # noqa: BLE001
+        st.error(f"Import failed: {exc}")
+
+
 def _render_export_section(date_range: DateRange) -> None:
     st.subheader("Export filtered rankings")
     entity = st.selectbox("Entity", ["songs", "artists", "albums", "genres"])
@@ -148,6 +194,66 @@ def _render_export_section(date_range: DateRange) -> None:
     )
 
 
+def _render_diagnostics_section() -> None:
+    st.subheader("Query latency")
+    st.caption(
+        "Per repository function since this server process started. Percentiles cover the "
+        f"last {query_stats.ROLLING_WINDOW} calls; cache columns count dashboard cache lookups."
+    )
+
+    stats = query_stats.snapshot()
+    if stats.empty:
+        st.info("No queries recorded yet. Open a few pages and come back.")
+    else:
+        st.dataframe(
+            stats,
+            hide_index=True,
+            use_container_width=True,
+            column_config={
+                "total_ms": st.column_config.NumberColumn("total ms", format="%.0f"),
+                "mean_ms": st.column_config.NumberColumn("mean ms", format="%.1f"),
+                "p50_ms": st.column_config.NumberColumn("p50 ms", format="%.1f"),
+                "p95_ms": st.column_config.NumberColumn("p95 ms", format="%.1f"),
+                "p99_ms": st.column_config.NumberColumn("p99 ms", format="%.1f"),
+                "max_ms": st.column_config.NumberColumn("max ms", format="%.1f"),
+                "avg_rows": st.column_config.NumberColumn("avg rows", format="%.0f"),
+                "memory_kb": st.column_config.NumberColumn("memory KB", format="%.0f"),
+                "cache_hit_rate": st.column_config.NumberColumn("cache hit rate", format="%.2f"),
+            },
+        )
+
+    if st.button("Reset statistics", use_container_width=True):
+        query_stats.reset()
+        st.rerun()
+
+    st.divider()
+    st.subheader("Slow queries")
+    st.caption(
+        f"Queries slower than {slow_queries.SLOW_QUERY_MS:.0f} ms (SLOW_QUERY_MS) with their "
+        f"EXPLAIN QUERY PLAN; the newest {slow_queries.SLOW_QUERY_LOG_SIZE} are kept."
+    )
+    slow = slow_queries.recent_slow_queries()
+    if slow.empty:
+        st.info("No slow queries logged.")
+        return
+    scans = int(slow["full_scan"].astype(bool).sum())
+    if scans:
+        st.warning(f"{scans} of {len(slow)} logged queries scan the whole listens table.")
+    st.dataframe(
+        slow[["recorded_at", "query_name", "duration_ms", "full_scan", "params"]],
+        hide_index=True,
+        use_container_width=True,
+    )
+    for row in slow.head(20).itertuples(index=False):
+        label = f"{row.query_name} · {row.duration_ms:.0f} ms"
+        with st.expander(f"{label} · SCAN listens" if row.full_scan else label):
+            st.code(row.query_plan or "(no plan)", language="text")
+            st.code(row.sql_text, language="sql")
+    if st.button("Clear slow-query log", use_container_width=True):
+        slow_queries.clear_slow_queries()
+        st.rerun()
+
+
 def _handle_oauth_callback() -> None:
     params = st.query_params
     code = params.get("code")
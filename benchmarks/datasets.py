@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+import hashlib
+from collections.abc import Iterator
+from contextlib import contextmanager
+from datetime import date
+from functools import cache
+from pathlib import Path
+
+from sqlalchemy.dialects import sqlite
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.schema import CreateIndex, CreateTable
+
+from db import slow_queries
+from db.models import Base
+from db.session import SessionLocal, create_db_engine
+from db.synthetic_history import DEFAULT_SEED, generate_history, insert_history
+
+# Synthetic datasets end on a fixed day so preset ranges cover the same listens on every run.
+ANCHOR_DAY = date(2026, 6, 30)
+DATA_DIR = Path(".benchmarks")
+SIZES = {"100k": 100_000, "1m": 1_000_000, "10m": 10_000_000}
+
+
+def parse_size(value: str) -> int:
+    if value.lower() in SIZES:
+        return SIZES[value.lower()]
+    return int(value.replace("_", ""))
+
+
+def size_label(listens: int) -> str:
+    for label, count in SIZES.items():
+        if count == listens:
+            return label
+    return str(listens)
+
+
+@cache
+def schema_fingerprint() -> str:
+    # Cached datasets are keyed by the schema they were built with, so index changes rebuild them.
+    dialect = sqlite.dialect()
+    ddl = []
+    for table in Base.metadata.sorted_tables:
+        ddl.append(str(CreateTable(table).compile(dialect=dialect)))
+        ddl.extend(
+            str(CreateIndex(index).compile(dialect=dialect))
+            for index in sorted(table.indexes, key=lambda index: index.name or "")
+        )
+    return hashlib.sha256("\n".join(ddl).encode()).hexdigest()[:8]
+
+
+def dataset_path(listens: int, data_dir: Path = DATA_DIR, seed: int = DEFAULT_SEED) -> Path:
+    return data_dir / f"synthetic_{size_label(listens)}_seed{seed}_{schema_fingerprint()}.db"
+
+
+def build_dataset(listens: int, data_dir: Path = DATA_DIR, seed: int = DEFAULT_SEED) -> Path:
+    # Built once per size and seed, then reused; delete the file to force a rebuild.
+    path = dataset_path(listens, data_dir, seed)
+    if path.exists():
+        return path
+
+    data_dir.mkdir(parents=True, exist_ok=True)
+    partial = path.with_suffix(".partial")
+    partial.unlink(missing_ok=True)
+    engine = create_db_engine(f"sqlite:///{partial}")
+    Base.metadata.create_all(engine)
+    catalog, history = generate_history(listens, seed=seed, end=ANCHOR_DAY)
+    with sessionmaker(bind=engine, future=True)() as session:
+        insert_history(session, catalog, history)
+        session.commit()
+    engine.dispose()
+    partial.rename(path)
+    return path
+
+
+@contextmanager
+def use_database(path: Path, slow_query_ms: float | None = None) -> Iterator[Engine]:
+    # Points every module's SessionLocal at the dataset (they share the one sessionmaker) and
+    # optionally overrides the slow-query threshold; both are restored on exit, even on errors.
+    engine = create_db_engine(f"sqlite:///{path}")
+    bind, threshold = SessionLocal.kw.get("bind"), slow_queries.SLOW_QUERY_MS
+    SessionLocal.configure(bind=engine)
+    if slow_query_ms is not None:
+        slow_queries.SLOW_QUERY_MS = slow_query_ms
+    try:
+        yield engine
+    finally:
+        SessionLocal.configure(bind=bind)
+        slow_queries.SLOW_QUERY_MS = threshold
+        engine.dispose()
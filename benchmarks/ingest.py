@@ -0,0 +1,263 @@
+from __future__ import annotations
+
+import argparse
+import json
+import multiprocessing
+import platform
+import resource
+import sys
+import tempfile
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any
+
+from sqlalchemy import event, text
+
+from benchmarks.datasets import ANCHOR_DAY, parse_size, use_database
+from db import seed_demo
+from db.models import Base
+from db.session import SessionLocal
+from db.synthetic_history import (
+    DEFAULT_SEED,
+    SyntheticCatalog,
+    SyntheticListens,
+    generate_history,
+    write_history_files,
+)
+from spotify import sync
+
+SCENARIOS = ("import", "sync", "seed")
+RECENTLY_PLAYED_PAGE = 50
+DEFAULT_SYNC_CALLS = 200
+
+
+@dataclass(frozen=True)
+class IngestResult:
+    scenario: str
+    listens: int
+    inserted: int
+    seconds: float
+    listens_per_sec: float
+    statements: int
+    statements_per_listen: float
+    aggregate_refresh_s: float
+    peak_rss_mb: float
+
+
+class FakeSpotifyClient:
+    # Serves recently-played pages in order, like successive polls of the real endpoint.
+    def __init__(self, pages: list[dict[str, Any]]) -> None:
+        self._pages = iter(pages)
+
+    def current_user_recently_played(self, limit: int = 50) -> dict[str, Any]:
+        page = next(self._pages, {"items": []})
+        return {"items": page.get("items", [])[:limit]}
+
+
+def recently_played_pages(
+    catalog: SyntheticCatalog, history: SyntheticListens, calls: int
+) -> list[dict[str, Any]]:
+    pages = []
+    count = min(len(history), calls * RECENTLY_PLAYED_PAGE)
+    for offset in range(0, count, RECENTLY_PLAYED_PAGE):
+        items = []
+        for idx in range(offset, min(offset + RECENTLY_PLAYED_PAGE, count)):
+            track = int(history.tracks[idx])
+            played_at = time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(int(history.played_at[idx])))
+            items.append(
+                {
+                    "played_at": f"{played_at}.000Z",
+                    "context": {"type": "playlist", "uri": "spotify:playlist:benchmark"},
+                    "track": {
+                        "id": catalog.track_ids[track],
+                        "name": catalog.track_names[track],
+                        "duration_ms": int(catalog.track_durations[track]),
+                        "explicit": False,
+                        "popularity": 50,
+                        "album": {
+                            "id": catalog.album_ids[catalog.track_albums[track]],
+                            "name": catalog.album_names[catalog.track_albums[track]],
+                        },
+                        "artists": [
+                            {"id": catalog.artist_ids[artist], "name": catalog.artist_names[artist]}
+                            for artist in catalog.track_artists[track]
+                        ],
+                    },
+                }
+            )
+        # The API lists the most recent play first.
+        pages.append({"items": items[::-1]})
+    return pages
+
+
+def prepare_inputs(
+    scenario: str,
+    listens: int,
+    work_dir: Path,
+    seed: int = DEFAULT_SEED,
+    sync_calls: int = DEFAULT_SYNC_CALLS,
+) -> list[Path]:
+    # Inputs are generated in the parent so the measured process only pays for ingest.
+    catalog, history = generate_history(listens, seed=seed, end=ANCHOR_DAY)
+    target = work_dir / f"{scenario}_input"
+    if scenario == "import":
+        return write_history_files(catalog, history, target)
+    if scenario == "sync":
+        target.mkdir(parents=True, exist_ok=True)
+        paths = []
+        for number, page in enumerate(recently_played_pages(catalog, history, sync_calls)):
+            path = target / f"recently_played_{number:05d}.json"
+            path.write_text(json.dumps(page))
+            paths.append(path)
+        return paths
+    if scenario == "seed":
+        # seed_from_demo_file reads a single file; hand it the whole generated history.
+        files = write_history_files(catalog, history, target)
+        items = [item for path in files for item in json.loads(path.read_text())]
+        demo = target / "demo_streaming_history.json"
+        demo.write_text(json.dumps(items))
+        return [demo]
+    raise ValueError(f"Unknown scenario: {scenario}")
+
+
+def run_scenario(
+    scenario: str, inputs: list[Path], work_dir: Path, workers: int | None = None
+) -> IngestResult:
+    # Runs in a fresh process so peak RSS belongs to this scenario alone.
+    context = multiprocessing.get_context("spawn")
+    queue = context.Queue()
+    process = context.Process(
+        target=_scenario_process, args=(queue, scenario, inputs, work_dir, workers)
+    )
+    process.start()
+    outcome = queue.get()
+    process.join()
+    if isinstance(outcome, BaseException):
+        raise outcome
+    return outcome
+
+
+def _scenario_process(queue: Any, *args: Any) -> None:
+    try:
+        queue.put(_measure(*args))
+    except Exception as exc:  # noqa: BLE001
+        queue.put(exc)
+
+
+def _measure(
+    scenario: str, inputs: list[Path], work_dir: Path, workers: int | None
+) -> IngestResult:
+    db_path = work_dir / f"ingest_{scenario}.db"
+    db_path.unlink(missing_ok=True)
+    with use_database(db_path) as engine:
+        Base.metadata.create_all(engine)
+
+        counters = {"statements": 0, "refresh_s": 0.0}
+
+        @event.listens_for(engine, "before_cursor_execute")
+        def _before(_conn, _cursor, _statement, _params, context, _executemany) -> None:  # type: ignore[no-untyped-def]
+            counters["statements"] += 1
+            context._benchmark_started = time.perf_counter()
+
+        @event.listens_for(engine, "after_cursor_execute")
+        def _after(_conn, _cursor, statement, _params, context, _executemany) -> None:  # type: ignore[no-untyped-def]
+            # Every refresh statement reads one of the _refresh_days/_months/_years tables.
+            if "_refresh_" in statement:
+                counters["refresh_s"] += time.perf_counter() - context._benchmark_started
+
+        def offline() -> Any:
+            raise RuntimeError("benchmarks run offline")
+
+        if scenario == "import":
+            sync.get_spotify_client = offline
+            started = time.perf_counter()
+            processed = sync.import_extended_history_files(inputs, workers=workers)
+        elif scenario == "sync":
+            pages = [json.loads(path.read_text()) for path in inputs]
+            client = FakeSpotifyClient(pages)
+            sync.get_spotify_client = lambda: client
+            started = time.perf_counter()
+            for _ in pages:
+                sync.sync_recently_played()
+            processed = sum(len(page.get("items", [])) for page in pages)
+        elif scenario == "seed":
+            started = time.perf_counter()
+            processed = seed_demo.seed_from_demo_file(str(inputs[0]))
+        else:
+            raise ValueError(f"Unknown scenario: {scenario}")
+        seconds = time.perf_counter() - started
+        with SessionLocal() as session:
+            inserted = session.execute(text("SELECT COUNT(*) FROM listens")).scalar_one()
+
+    peak_kb = max(
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss,
+    )
+    return IngestResult(
+        scenario=scenario,
+        listens=processed,
+        inserted=inserted,
+        seconds=round(seconds, 3),
+        listens_per_sec=round(processed / seconds, 1) if seconds else 0.0,
+        statements=counters["statements"],
+        statements_per_listen=round(counters["statements"] / processed, 4) if processed else 0.0,
+        aggregate_refresh_s=round(counters["refresh_s"], 3),
+        peak_rss_mb=round(peak_kb / 1024, 1),
+    )
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Measure ingest throughput on synthetic data.")
+    parser.add_argument("--listens", default="100k", help="listens per scenario, e.g. 100k or 1m")
+    parser.add_argument("--scenario", action="append", choices=SCENARIOS, dest="scenarios")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument("--workers", type=int, help="parser processes for the import scenario")
+    parser.add_argument(
+        "--sync-calls",
+        type=int,
+        default=DEFAULT_SYNC_CALLS,
+        help="recently-played polls of 50 plays each for the sync scenario",
+    )
+    parser.add_argument(
+        "--recorded", type=Path, help="replay recently-played JSON payloads from this directory"
+    )
+    parser.add_argument("--output", type=Path, help="write the JSON report here")
+    args = parser.parse_args(argv)
+
+    listens = parse_size(args.listens)
+    results = []
+    with tempfile.TemporaryDirectory(prefix="ingest-bench-") as work_dir:
+        for scenario in args.scenarios or SCENARIOS:
+            if scenario == "sync" and args.recorded is not None:
+                inputs = sorted(args.recorded.glob("*.json"))
+            else:
+                inputs = prepare_inputs(
+                    scenario, listens, Path(work_dir), seed=args.seed, sync_calls=args.sync_calls
+                )
+            result = run_scenario(scenario, inputs, Path(work_dir), workers=args.workers)
+            print(
+                f"{result.scenario:<7} {result.listens:>9} listens  "
+                f"{result.listens_per_sec:>10.0f}/s  "
+                f"{result.statements_per_listen:.4f} stmt/listen  "
+                f"refresh {result.aggregate_refresh_s:.2f}s  peak {result.peak_rss_mb:.0f} MB",
+                file=sys.stderr,
+                flush=True,
+            )
+            results.append(asdict(result))
+
+    report = {
+        "machine": f"{platform.system()} {platform.machine()} / Python {platform.python_version()}",
+        "seed": args.seed,
+        "results": results,
+    }
+    payload = json.dumps(report, indent=2) + "\n"
+    if args.output is not None:
+        args.output.write_text(payload)
+    else:
+        print(payload, end="")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
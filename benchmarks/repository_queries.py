@@ -0,0 +1,327 @@
+from __future__ import annotations
+
+import argparse
+import json
+import platform
+import sys
+import time
+from collections.abc import Callable
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import event, text
+
+from analytics.date_ranges import bucket_for_range
+from app.ui.date_filter import date_range_from_preset
+from benchmarks.datasets import (
+    ANCHOR_DAY,
+    DATA_DIR,
+    SIZES,
+    build_dataset,
+    parse_size,
+    size_label,
+    use_database,
+)
+from db import repository, slow_queries
+from db.models import SlowQuery
+from db.session import SessionLocal
+
+BASELINE_PATH = Path(__file__).parent / "baselines" / "repository_queries.json"
+PRESET_KEYS = ("today", "this_month", "this_year", "last_3_years")
+DEFAULT_REPEAT = 5
+DEFAULT_THRESHOLD = 0.25
+# Regressions smaller than this are timer noise, whatever the ratio.
+MIN_REGRESSION_MS = 2.0
+# SQLite calls the progress handler every this many virtual machine instructions.
+STEP_GRANULARITY = 1000
+
+
+@dataclass(frozen=True)
+class SampleIds:
+    track_id: str
+    artist_id: str
+    album_id: str
+
+
+@dataclass(frozen=True)
+class QueryTiming:
+    size: str
+    query: str
+    preset: str
+    p50_ms: float
+    p95_ms: float
+    rows: int
+
+    @property
+    def key(self) -> str:
+        return f"{self.size}/{self.query}/{self.preset}"
+
+
+Query = Callable[[Any, SampleIds], Any]
+
+QUERIES: dict[str, Query] = {
+    "get_kpis": lambda r, _ids: repository.get_kpis(r),
+    "get_kpis_exact": lambda r, _ids: repository.get_kpis(r, exact=True),
+    "listened_days": lambda r, _ids: repository.listened_days(r),
+    "top_songs": lambda r, _ids: repository.top_songs(r),
+    "top_artists": lambda r, _ids: repository.top_artists(r),
+    "top_albums": lambda r, _ids: repository.top_albums(r),
+    "top_genres": lambda r, _ids: repository.top_genres(r),
+    "daily_minutes": lambda r, _ids: repository.daily_minutes(r),
+    "hourly_distribution": lambda r, _ids: repository.hourly_distribution(r),
+    "weekday_weekend": lambda r, _ids: repository.weekday_weekend(r),
+    "weekday_week_matrix": lambda r, _ids: repository.weekday_week_matrix(r),
+    "repeat_ratio": lambda r, _ids: repository.repeat_ratio(r),
+    "top_entities_for_dashboard": lambda r, _ids: repository.top_entities_for_dashboard(r),
+    "song_daily_trend": lambda r, ids: repository.song_daily_trend(ids.track_id, r),
+    "artist_daily_trend": lambda r, ids: repository.artist_daily_trend(ids.artist_id, r),
+    "album_daily_trend": lambda r, ids: repository.album_daily_trend(ids.album_id, r),
+    "genre_evolution": lambda r, _ids: repository.genre_evolution(r, bucket_for_range(r)),
+    "obsession_candidates_songs": lambda r, _ids: repository.obsession_candidates_songs(r),
+    "obsession_candidates_artists": lambda r, _ids: repository.obsession_candidates_artists(r),
+    "obsession_candidates_albums": lambda r, _ids: repository.obsession_candidates_albums(r),
+    "latest_listen": lambda _r, _ids: repository.latest_listen(),
+    "playlists": lambda _r, _ids: repository.playlists(),
+}
+# These ignore the date range and are timed once per size.
+RANGE_FREE_QUERIES = {"latest_listen", "playlists"}
+
+
+def row_count(result: Any) -> int:
+    if result is None:
+        return 0
+    if isinstance(result, pd.DataFrame | list):
+        return len(result)
+    if isinstance(result, tuple):
+        return sum(row_count(part) for part in result)
+    return 1
+
+
+def sample_ids() -> SampleIds:
+    # The generator ranks tracks and artists by popularity, so the lowest ids are the hottest.
+    with SessionLocal() as session:
+        track_id, album_id = session.execute(
+            text("SELECT id, album_id FROM tracks ORDER BY id LIMIT 1")
+        ).one()
+        artist_id = session.execute(
+            text("SELECT artist_id FROM track_artists WHERE track_id = :track_id LIMIT 1"),
+            {"track_id": track_id},
+        ).scalar_one()
+    return SampleIds(track_id=track_id, artist_id=artist_id, album_id=album_id)
+
+
+def time_query(
+    query: Query, date_range: Any, ids: SampleIds, repeat: int
+) -> tuple[list[float], int]:
+    rows = row_count(query(date_range, ids))
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        query(date_range, ids)
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples, rows
+
+
+def run_suite(
+    sizes: list[int],
+    data_dir: Path = DATA_DIR,
+    repeat: int = DEFAULT_REPEAT,
+    queries: list[str] | None = None,
+    progress: Callable[[QueryTiming], None] | None = None,
+) -> list[QueryTiming]:
+    selected = queries or list(QUERIES)
+    ranges = [date_range_from_preset(key, today=ANCHOR_DAY) for key in PRESET_KEYS]
+    timings: list[QueryTiming] = []
+    # Logging slow queries would time EXPLAIN and the log insert along with the query.
+    for listens in sizes:
+        with use_database(build_dataset(listens, data_dir), slow_query_ms=-1):
+            ids = sample_ids()
+            for name in selected:
+                for date_range in ranges[:1] if name in RANGE_FREE_QUERIES else ranges:
+                    samples, rows = time_query(QUERIES[name], date_range, ids, repeat)
+                    timing = QueryTiming(
+                        size=size_label(listens),
+                        query=name,
+                        preset="-" if name in RANGE_FREE_QUERIES else date_range.label,
+                        p50_ms=round(float(np.percentile(samples, 50)), 3),
+                        p95_ms=round(float(np.percentile(samples, 95)), 3),
+                        rows=rows,
+                    )
+                    timings.append(timing)
+                    if progress is not None:
+                        progress(timing)
+    return timings
+
+
+def explain_suite(
+    sizes: list[int], data_dir: Path = DATA_DIR, queries: list[str] | None = None
+) -> dict[str, dict[str, bool]]:
+    # Runs every query once with the slow-query log catching everything, then reads back
+    # which repository functions scan listens at each size.
+    selected = queries or list(QUERIES)
+    ranges = [date_range_from_preset(key, today=ANCHOR_DAY) for key in PRESET_KEYS]
+    scans: dict[str, dict[str, bool]] = {}
+    for listens in sizes:
+        with use_database(build_dataset(listens, data_dir), slow_query_ms=0) as engine:
+            SlowQuery.__table__.create(engine, checkfirst=True)
+            slow_queries.clear_slow_queries()
+            ids = sample_ids()
+            for name in selected:
+                for date_range in ranges[:1] if name in RANGE_FREE_QUERIES else ranges:
+                    QUERIES[name](date_range, ids)
+            slow_queries.flush()
+            with SessionLocal() as session:
+                rows = session.execute(
+                    text(
+                        "SELECT query_name, MAX(full_scan) FROM slow_queries GROUP BY query_name"
+                    )
+                ).all()
+            scans[size_label(listens)] = {query: bool(scan) for query, scan in sorted(rows)}
+            slow_queries.clear_slow_queries()
+    return scans
+
+
+def steps_suite(
+    sizes: list[int], data_dir: Path = DATA_DIR, queries: list[str] | None = None
+) -> dict[str, dict[str, int]]:
+    # Counts the SQLite virtual machine instructions each query runs, in thousands. Every row a
+    # scan, join or sort passes along costs instructions, so unlike timings the count tracks the
+    # intermediate rows a plan produces and repeats exactly from run to run.
+    selected = queries or list(QUERIES)
+    ranges = [date_range_from_preset(key, today=ANCHOR_DAY) for key in PRESET_KEYS]
+    steps: dict[str, dict[str, int]] = {}
+    counter = {"steps": 0}
+
+    def count() -> int:
+        counter["steps"] += 1
+        return 0
+
+    def attach(conn, _cursor, _statement, _params, _context, _executemany) -> None:  # type: ignore[no-untyped-def]
+        conn.connection.driver_connection.set_progress_handler(count, STEP_GRANULARITY)
+
+    for listens in sizes:
+        with use_database(build_dataset(listens, data_dir), slow_query_ms=-1) as engine:
+            event.listen(engine, "before_cursor_execute", attach)
+            ids = sample_ids()
+            counts = {}
+            for name in selected:
+                for date_range in ranges[:1] if name in RANGE_FREE_QUERIES else ranges:
+                    preset = "-" if name in RANGE_FREE_QUERIES else date_range.label
+                    counter["steps"] = 0
+                    QUERIES[name](date_range, ids)
+                    counts[f"{name}/{preset}"] = counter["steps"]
+            steps[size_label(listens)] = counts
+    return steps
+
+
+def compare_to_baseline(
+    timings: list[QueryTiming], baseline: dict[str, Any], threshold: float | None = None
+) -> list[str]:
+    limit = baseline.get("threshold", DEFAULT_THRESHOLD) if threshold is None else threshold
+    expected = baseline.get("results", {})
+    problems = []
+    for timing in timings:
+        base = expected.get(timing.key)
+        if base is None:
+            continue
+        if timing.rows != base["rows"]:
+            problems.append(f"{timing.key}: returned {timing.rows} rows, baseline {base['rows']}")
+        allowed = base["p50_ms"] * (1 + limit)
+        if timing.p50_ms > allowed and timing.p50_ms - base["p50_ms"] > MIN_REGRESSION_MS:
+            problems.append(
+                f"{timing.key}: p50 {timing.p50_ms:.1f}ms vs baseline {base['p50_ms']:.1f}ms "
+                f"(+{timing.p50_ms / base['p50_ms'] - 1:.0%}, limit +{limit:.0%})"
+            )
+    return problems
+
+
+def baseline_payload(
+    timings: list[QueryTiming], previous: dict[str, Any], threshold: float
+) -> dict[str, Any]:
+    results = dict(previous.get("results", {}))
+    results.update(
+        {
+            timing.key: {"p50_ms": timing.p50_ms, "p95_ms": timing.p95_ms, "rows": timing.rows}
+            for timing in timings
+        }
+    )
+    return {
+        "threshold": threshold,
+        "anchor_day": ANCHOR_DAY.isoformat(),
+        "machine": f"{platform.system()} {platform.machine()} / Python {platform.python_version()}",
+        "results": dict(sorted(results.items())),
+    }
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Time db.repository queries on synthetic data.")
+    parser.add_argument(
+        "--sizes", nargs="+", default=["100k", "1m"], help=f"any of {', '.join(SIZES)} or a count"
+    )
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT)
+    parser.add_argument("--query", action="append", choices=sorted(QUERIES), dest="queries")
+    parser.add_argument("--data-dir", type=Path, default=DATA_DIR)
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH)
+    parser.add_argument("--threshold", type=float)
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--output", type=Path, help="also write the timings to this JSON file")
+    parser.add_argument(
+        "--explain", action="store_true", help="list which queries scan listens instead of timing"
+    )
+    parser.add_argument(
+        "--steps",
+        action="store_true",
+        help="count SQLite instructions (thousands) per query instead of timing",
+    )
+    args = parser.parse_args(argv)
+    sizes = [parse_size(size) for size in args.sizes]
+
+    if args.explain:
+        for size, scans in explain_suite(sizes, args.data_dir, args.queries).items():
+            for query, scan in scans.items():
+                print(f"{size:>5} {query:<30} {'SCAN listens' if scan else 'index'}")
+        return 0
+
+    if args.steps:
+        for size, counts in steps_suite(sizes, args.data_dir, args.queries).items():
+            for key, count in counts.items():
+                query, preset = key.split("/")
+                print(f"{size:>5} {query:<30} {preset:<13} {count:>10}k steps")
+        return 0
+
+    def report(timing: QueryTiming) -> None:
+        print(
+            f"{timing.size:>5} {timing.query:<30} {timing.preset:<13} "
+            f"p50 {timing.p50_ms:9.2f}ms  p95 {timing.p95_ms:9.2f}ms  rows {timing.rows}",
+            flush=True,
+        )
+
+    timings = run_suite(
+        sizes,
+        data_dir=args.data_dir,
+        repeat=args.repeat,
+        queries=args.queries,
+        progress=report,
+    )
+    if args.output is not None:
+        args.output.write_text(json.dumps([asdict(t) for t in timings], indent=2) + "\n")
+
+    baseline = json.loads(args.baseline.read_text()) if args.baseline.exists() else {}
+    if args.update_baseline:
+        threshold = args.threshold or baseline.get("threshold", DEFAULT_THRESHOLD)
+        payload = baseline_payload(timings, baseline, threshold)
+        args.baseline.write_text(json.dumps(payload, indent=2) + "\n")
+        print(f"Baseline written to {args.baseline}")
+        return 0
+
+    problems = compare_to_baseline(timings, baseline, args.threshold)
+    for problem in problems:
+        print(f"REGRESSION {problem}", file=sys.stderr)
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
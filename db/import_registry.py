@@ -0,0 +1,109 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import UTC, datetime
+from typing import Any
+
+from sqlalchemy import text
+
+STATUS_RUNNING = "running"
+STATUS_COMPLETE = "complete"
+
+
+@dataclass(frozen=True)
+class ImportFileState:
+    content_hash: str
+    name: str
+    status: str
+    items_done: int
+
+    @property
+    def complete(self) -> bool:
+        return self.status == STATUS_COMPLETE
+
+
+def begin_import(
+    session: Any, content_hash: str, name: str, include_podcasts: bool = True
+) -> ImportFileState:
+    # A file imported with a different podcast setting holds a different set of listens, so it
+    # starts over with the new setting instead of counting as complete or resuming.
+    now = datetime.now(UTC)
+    session.execute(
+        text(
+            """
+            INSERT INTO import_files(
+                content_hash, name, status, items_done, include_podcasts, started_at, updated_at
+            )
+            VALUES(:content_hash, :name, :status, 0, :include_podcasts, :now, :now)
+            ON CONFLICT(content_hash) DO UPDATE SET
+                name=excluded.name,
+                updated_at=excluded.updated_at,
+                status=CASE
+                    WHEN import_files.include_podcasts = excluded.include_podcasts
+                    THEN import_files.status ELSE excluded.status
+                END,
+                items_done=CASE
+                    WHEN import_files.include_podcasts = excluded.include_podcasts
+                    THEN import_files.items_done ELSE 0
+                END,
+                include_podcasts=excluded.include_podcasts
+            """
+        ),
+        {
+            "content_hash": content_hash,
+            "name": name,
+            "status": STATUS_RUNNING,
+            "include_podcasts": include_podcasts,
+            "now": now,
+        },
+    )
+    row = session.execute(
+        text(
+            """
+            SELECT name, status, items_done
+            FROM import_files
+            WHERE content_hash = :content_hash
+            """
+        ),
+        {"content_hash": content_hash},
+    ).one()
+    return ImportFileState(
+        content_hash=content_hash, name=row[0], status=row[1], items_done=int(row[2])
+    )
+
+
+def checkpoint_import(session: Any, content_hash: str, items_done: int) -> None:
+    session.execute(
+        text(
+            """
+            UPDATE import_files
+            SET items_done = :items_done, updated_at = :now
+            WHERE content_hash = :content_hash AND status = :status
+            """
+        ),
+        {
+            "content_hash": content_hash,
+            "items_done": items_done,
+            "now": datetime.now(UTC),
+            "status": STATUS_RUNNING,
+        },
+    )
+
+
+def complete_import(session: Any, content_hash: str, items_done: int) -> None:
+    now = datetime.now(UTC)
+    session.execute(
+        text(
+            """
+            UPDATE import_files
+            SET status = :status, items_done = :items_done, updated_at = :now, completed_at = :now
+            WHERE content_hash = :content_hash
+            """
+        ),
+        {
+            "content_hash": content_hash,
+            "items_done": items_done,
+            "now": now,
+            "status": STATUS_COMPLETE,
+        },
+    )
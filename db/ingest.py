@@ -0,0 +1,450 @@
+from __future__ import annotations
+
+import logging
+import time
+from bisect import bisect_left, insort
+from collections import OrderedDict
+from collections.abc import Hashable
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from typing import Any
+
+from sqlalchemy import text
+
+from db.timestamps import epoch_ms, from_epoch_day
+
+logger = logging.getLogger(__name__)
+
+MS_TOLERANCE = 1000
+HOUR_MS = 3_600_000
+BATCH_SIZE = 5000
+DIMENSION_CACHE_SIZE = 200_000
+
+
+# Not frozen: frozen dataclasses pay an object.__setattr__ per field, and imports build millions.
+@dataclass(slots=True)
+class ListenRecord:
+    played_at: datetime
+    ms_played: int
+    track_id: str
+    track_name: str
+    album_id: str
+    album_name: str
+    artist_ids: tuple[str, ...]
+    artist_names: tuple[str, ...]
+    duration_ms: int | None = None
+    explicit: bool | None = None
+    popularity: int | None = None
+    context_type: str | None = None
+    context_id: str | None = None
+    device_name: str | None = None
+
+
+@dataclass
+class IngestStats:
+    processed: int = 0
+    inserted: int = 0
+    elapsed_s: float = 0.0
+    touched_days: set[date] = field(default_factory=set)
+
+    @property
+    def rows_per_sec(self) -> float:
+        return self.processed / self.elapsed_s if self.elapsed_s else 0.0
+
+
+_STAGING_DDL = (
+    """
+    CREATE TEMP TABLE IF NOT EXISTS _stage_albums(
+        id TEXT PRIMARY KEY,
+        name TEXT NOT NULL
+    )
+    """,
+    """
+    CREATE TEMP TABLE IF NOT EXISTS _stage_tracks(
+        id TEXT PRIMARY KEY,
+        name TEXT NOT NULL,
+        album_id TEXT,
+        duration_ms INTEGER,
+        explicit BOOLEAN,
+        popularity INTEGER
+    )
+    """,
+    """
+    CREATE TEMP TABLE IF NOT EXISTS _stage_artists(
+        id TEXT PRIMARY KEY,
+        name TEXT NOT NULL
+    )
+    """,
+    """
+    CREATE TEMP TABLE IF NOT EXISTS _stage_track_artists(
+        track_id TEXT NOT NULL,
+        artist_id TEXT NOT NULL,
+        PRIMARY KEY(track_id, artist_id)
+    )
+    """,
+    """
+    CREATE TEMP TABLE IF NOT EXISTS _stage_listens(
+        seq INTEGER PRIMARY KEY,
+        played_at INTEGER NOT NULL,
+        ms_played INTEGER NOT NULL,
+        track_id TEXT NOT NULL,
+        context_type TEXT,
+        context_id TEXT,
+        device_name TEXT,
+        keep INTEGER NOT NULL DEFAULT 1
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS temp.ix_stage_listens_dedupe "
+    "ON _stage_listens(played_at, track_id)",
+)
+
+_STAGING_TABLES = (
+    "_stage_albums",
+    "_stage_tracks",
+    "_stage_artists",
+    "_stage_track_artists",
+    "_stage_listens",
+)
+
+_UPSERT_DIMENSIONS = (
+    """
+    INSERT INTO albums(id, name)
+    SELECT id, name FROM _stage_albums WHERE true
+    ON CONFLICT(id) DO UPDATE SET name=excluded.name
+    """,
+    """
+    INSERT INTO tracks(id, name, album_id, duration_ms, explicit, popularity)
+    SELECT id, name, album_id, duration_ms, explicit, popularity FROM _stage_tracks WHERE true
+    ON CONFLICT(id) DO UPDATE SET
+        name=excluded.name,
+        album_id=excluded.album_id,
+        duration_ms=excluded.duration_ms,
+        explicit=excluded.explicit,
+        popularity=excluded.popularity
+    """,
+    """
+    INSERT INTO artists(id, name)
+    SELECT id, name FROM _stage_artists WHERE true
+    ON CONFLICT(id) DO UPDATE SET name=excluded.name
+    """,
+    """
+    INSERT OR IGNORE INTO track_artists(track_id, artist_id)
+    SELECT track_id, artist_id FROM _stage_track_artists
+    """,
+)
+
+# Rows already filtered by DedupeIndex can still collide with listens written by a concurrent
+# sync, so staged rows are checked against the table (and earlier rows of the batch) once more.
+_MARK_DUPLICATES = """
+    UPDATE _stage_listens SET keep = 0
+    WHERE EXISTS (
+        SELECT 1
+        FROM listens l
+        WHERE l.played_at = _stage_listens.played_at
+          AND l.track_id = _stage_listens.track_id
+          AND l.ms_played BETWEEN MAX(0, _stage_listens.ms_played - :tolerance)
+                              AND _stage_listens.ms_played + :tolerance
+    )
+    OR EXISTS (
+        SELECT 1
+        FROM _stage_listens s
+        WHERE s.played_at = _stage_listens.played_at
+          AND s.track_id = _stage_listens.track_id
+          AND s.seq < _stage_listens.seq
+          AND s.ms_played BETWEEN MAX(0, _stage_listens.ms_played - :tolerance)
+                              AND _stage_listens.ms_played + :tolerance
+    )
+"""
+
+_INSERT_LISTENS = """
+    INSERT INTO listens(played_at, ms_played, track_id, context_type, context_id, device_name)
+    SELECT played_at, ms_played, track_id, context_type, context_id, device_name
+    FROM _stage_listens
+    WHERE keep = 1
+    ORDER BY seq
+"""
+
+
+_DEDUPE_WINDOWS_DDL = """
+    CREATE TEMP TABLE IF NOT EXISTS _dedupe_windows(
+        lo INTEGER NOT NULL,
+        hi INTEGER NOT NULL
+    )
+"""
+
+
+class DedupeIndex:
+    # Keyed by (played_at epoch ms, track_id), the same values listens stores. Keys read from the
+    # table are kept only until the next commit; keys added by this run survive it, so a listen
+    # repeated across files is still caught after its first copy was checkpointed.
+    def __init__(self, tolerance: int = MS_TOLERANCE) -> None:
+        self.tolerance = tolerance
+        self._loaded: dict[tuple[int, str], list[int]] = {}
+        self._added: dict[tuple[int, str], list[int]] = {}
+        self._windows: list[tuple[int, int]] = []
+
+    def __len__(self) -> int:
+        return len(self._loaded.keys() | self._added.keys())
+
+    def load_window(self, session: Any, start: int, end: int) -> None:
+        self._load(session, self._missing(start, end + 1))
+        self._add_windows([(start, end + 1)])
+
+    def load_hours(self, session: Any, stamps: list[int]) -> None:
+        # Only the hours a batch touches are read, so a batch spanning years of history does not
+        # pull every listen in between.
+        spans: list[list[int]] = []
+        for hour in sorted({stamp // HOUR_MS for stamp in stamps}):
+            if spans and hour == spans[-1][1] + 1:
+                spans[-1][1] = hour
+            else:
+                spans.append([hour, hour])
+        windows = [(first * HOUR_MS, (last + 1) * HOUR_MS) for first, last in spans]
+        self._load(session, [gap for lo, hi in windows for gap in self._missing(lo, hi)])
+        self._add_windows(windows)
+
+    def release_loaded(self) -> None:
+        self._loaded.clear()
+        self._windows = []
+
+    def contains(self, played_at: int, track_id: str, ms_played: int) -> bool:
+        key = (played_at, track_id)
+        return self._matches(self._added.get(key), ms_played) or self._matches(
+            self._loaded.get(key), ms_played
+        )
+
+    def add(self, played_at: int, track_id: str, ms_played: int) -> None:
+        insort(self._added.setdefault((played_at, track_id), []), ms_played)
+
+    def _matches(self, values: list[int] | None, ms_played: int) -> bool:
+        if not values:
+            return False
+        idx = bisect_left(values, ms_played - self.tolerance)
+        return idx < len(values) and values[idx] <= ms_played + self.tolerance
+
+    def _load(self, session: Any, windows: list[tuple[int, int]]) -> None:
+        if not windows:
+            return
+        session.execute(text(_DEDUPE_WINDOWS_DDL))
+        session.execute(text("DELETE FROM _dedupe_windows"))
+        session.execute(
+            text("INSERT INTO _dedupe_windows(lo, hi) VALUES(:lo, :hi)"),
+            [{"lo": lo, "hi": hi} for lo, hi in windows],
+        )
+        rows = session.execute(
+            text(
+                """
+                SELECT l.played_at, l.track_id, l.ms_played
+                FROM _dedupe_windows w
+                JOIN listens l ON l.played_at >= w.lo AND l.played_at < w.hi
+                """
+            )
+        )
+        for played_at, track_id, ms_played in rows:
+            insort(self._loaded.setdefault((played_at, track_id), []), int(ms_played))
+
+    def _missing(self, start: int, end: int) -> list[tuple[int, int]]:
+        gaps: list[tuple[int, int]] = []
+        cursor = start
+        # Windows are sorted and disjoint; only the one before `start` can reach into the range.
+        first = max(bisect_left(self._windows, (start, start)) - 1, 0)
+        for lo, hi in self._windows[first:]:
+            if hi <= cursor:
+                continue
+            if lo >= end:
+                break
+            if lo > cursor:
+                gaps.append((cursor, lo))
+            cursor = max(cursor, hi)
+        if cursor < end:
+            gaps.append((cursor, end))
+        return gaps
+
+    def _add_windows(self, windows: list[tuple[int, int]]) -> None:
+        merged: list[tuple[int, int]] = []
+        for lo, hi in sorted([*self._windows, *windows]):
+            if merged and lo <= merged[-1][1]:
+                merged[-1] = (merged[-1][0], max(merged[-1][1], hi))
+            else:
+                merged.append((lo, hi))
+        self._windows = merged
+
+
+class DimensionCache:
+    def __init__(self, max_entries: int = DIMENSION_CACHE_SIZE) -> None:
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._digests: OrderedDict[tuple[str, Hashable], int] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._digests)
+
+    def changed(self, kind: str, key: Hashable, values: tuple[Any, ...] = ()) -> bool:
+        entry = (kind, key)
+        digest = hash(values)
+        if self._digests.get(entry) == digest:
+            self._digests.move_to_end(entry)
+            self.hits += 1
+            return False
+
+        self.misses += 1
+        self._digests[entry] = digest
+        self._digests.move_to_end(entry)
+        while len(self._digests) > self.max_entries:
+            self._digests.popitem(last=False)
+        return True
+
+
+class ListenWriter:
+    def __init__(
+        self,
+        session: Any,
+        batch_size: int = BATCH_SIZE,
+        dedupe: DedupeIndex | None = None,
+        dimensions: DimensionCache | None = None,
+    ) -> None:
+        self.session = session
+        self.batch_size = batch_size
+        self.dedupe = dedupe if dedupe is not None else DedupeIndex()
+        self.dimensions = dimensions if dimensions is not None else DimensionCache()
+        self.stats = IngestStats()
+        self._pending: list[ListenRecord] = []
+        self._unrefreshed_days: set[date] = set()
+        self._started = time.perf_counter()
+
+    def add(self, record: ListenRecord) -> None:
+        self._pending.append(record)
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        if not self._pending:
+            return
+        records = self._pending
+        self._pending = []
+        self.stats.processed += len(records)
+
+        played_at = [epoch_ms(record.played_at) for record in records]
+        self.dedupe.load_hours(self.session, played_at)
+        fresh: list[tuple[int, ListenRecord]] = []
+        for stamp, record in zip(played_at, records, strict=True):
+            if self.dedupe.contains(stamp, record.track_id, record.ms_played):
+                continue
+            self.dedupe.add(stamp, record.track_id, record.ms_played)
+            fresh.append((stamp, record))
+        if not fresh:
+            return
+
+        for ddl in _STAGING_DDL:
+            self.session.execute(text(ddl))
+        self._stage(fresh)
+
+        for sql in _UPSERT_DIMENSIONS:
+            self.session.execute(text(sql))
+        self.session.execute(text(_MARK_DUPLICATES), {"tolerance": MS_TOLERANCE})
+        result = self.session.execute(text(_INSERT_LISTENS))
+        days = self.session.execute(
+            text("SELECT DISTINCT played_at / 86400000 FROM _stage_listens WHERE keep = 1")
+        ).scalars()
+        touched = {from_epoch_day(day) for day in days}
+        self.stats.touched_days.update(touched)
+        self._unrefreshed_days.update(touched)
+
+        for table in _STAGING_TABLES:
+            self.session.execute(text(f"DELETE FROM {table}"))
+
+        self.stats.inserted += max(result.rowcount or 0, 0)
+
+    def take_touched_days(self) -> set[date]:
+        # Days that gained listens since the previous call, for checkpointed aggregate refreshes.
+        self.flush()
+        days, self._unrefreshed_days = self._unrefreshed_days, set()
+        return days
+
+    def close(self) -> IngestStats:
+        self.flush()
+        self.stats.elapsed_s = time.perf_counter() - self._started
+        logger.info(
+            "Ingested %d listens (%d new) in %.2fs, %.0f rows/sec",
+            self.stats.processed,
+            self.stats.inserted,
+            self.stats.elapsed_s,
+            self.stats.rows_per_sec,
+        )
+        return self.stats
+
+    def _stage(self, records: list[tuple[int, ListenRecord]]) -> None:
+        albums: dict[str, dict[str, Any]] = {}
+        tracks: dict[str, dict[str, Any]] = {}
+        artists: dict[str, dict[str, Any]] = {}
+        track_artists: set[tuple[str, str]] = set()
+        listens: list[dict[str, Any]] = []
+
+        for played_at, record in records:
+            albums[record.album_id] = {"id": record.album_id, "name": record.album_name}
+            tracks[record.track_id] = {
+                "id": record.track_id,
+                "name": record.track_name,
+                "album_id": record.album_id,
+                "duration_ms": record.duration_ms,
+                "explicit": record.explicit,
+                "popularity": record.popularity,
+            }
+            for artist_id, artist_name in zip(record.artist_ids, record.artist_names, strict=False):
+                artists[artist_id] = {"id": artist_id, "name": artist_name}
+                track_artists.add((record.track_id, artist_id))
+            listens.append(
+                {
+                    "played_at": played_at,
+                    "ms_played": record.ms_played,
+                    "track_id": record.track_id,
+                    "context_type": record.context_type,
+                    "context_id": record.context_id,
+                    "device_name": record.device_name,
+                }
+            )
+
+        self._executemany(
+            "INSERT INTO _stage_albums(id, name) VALUES(:id, :name)",
+            self._changed("album", albums),
+        )
+        self._executemany(
+            """
+            INSERT INTO _stage_tracks(id, name, album_id, duration_ms, explicit, popularity)
+            VALUES(:id, :name, :album_id, :duration_ms, :explicit, :popularity)
+            """,
+            self._changed("track", tracks),
+        )
+        self._executemany(
+            "INSERT INTO _stage_artists(id, name) VALUES(:id, :name)",
+            self._changed("artist", artists),
+        )
+        self._executemany(
+            "INSERT INTO _stage_track_artists(track_id, artist_id) VALUES(:track_id, :artist_id)",
+            [
+                {"track_id": track_id, "artist_id": artist_id}
+                for track_id, artist_id in track_artists
+                if self.dimensions.changed("track_artist", (track_id, artist_id))
+            ],
+        )
+        self._executemany(
+            """
+            INSERT INTO _stage_listens(
+                played_at, ms_played, track_id, context_type, context_id, device_name
+            )
+            VALUES(:played_at, :ms_played, :track_id, :context_type, :context_id, :device_name)
+            """,
+            listens,
+        )
+
+    def _changed(self, kind: str, rows: dict[str, dict[str, Any]]) -> list[dict[str, Any]]:
+        return [
+            row
+            for key, row in rows.items()
+            if self.dimensions.changed(kind, key, tuple(row.values()))
+        ]
+
+    def _executemany(self, sql: str, rows: list[dict[str, Any]]) -> None:
+        if rows:
+            self.session.execute(text(sql), rows)
@@ -0,0 +1,32 @@
+"""Add track resolution cache table
+
+Revision ID: 0004_track_resolutions
+Revises: 0003_app_settings
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0004_track_resolutions"
+down_revision = "0003_app_settings"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "track_resolutions",
+        sa.Column("track_key", sa.String(length=500), nullable=False),
+        sa.Column("artist_key", sa.String(length=500), nullable=False),
+        sa.Column("track_id", sa.String(length=64), nullable=True),
+        sa.Column("resolved_at", sa.DateTime(timezone=True), nullable=False),
+        sa.PrimaryKeyConstraint("track_key", "artist_key"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("track_resolutions")
@@ -0,0 +1,38 @@
+"""Add slow query log table
+
+Revision ID: 0006_slow_queries
+Revises: 0005_import_files
+Create Date: 2026-10-17 00:20:00.000000
+
+"""
+
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0006_slow_queries"
+down_revision = "0005_import_files"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "slow_queries",
+        sa.Column("id", sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column("recorded_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("query_name", sa.String(length=128), nullable=False),
+        sa.Column("duration_ms", sa.Float(), nullable=False),
+        sa.Column("sql_text", sa.Text(), nullable=False),
+        sa.Column("params", sa.Text(), nullable=False),
+        sa.Column("query_plan", sa.Text(), nullable=False),
+        sa.Column("full_scan", sa.Boolean(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_slow_queries_query_name", "slow_queries", ["query_name"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_slow_queries_query_name", table_name="slow_queries")
+    op.drop_table("slow_queries")
@@ -0,0 +1,37 @@
+"""Add covering indexes for track-first and artist-first listen lookups
+
+Revision ID: 0007_covering_indexes
+Revises: 0006_slow_queries
+Create Date: 2026-10-17 00:30:00.000000
+
+"""
+
+from __future__ import annotations
+
+from alembic import op
+
+revision = "0007_covering_indexes"
+down_revision = "0006_slow_queries"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # uq_listen_dedupe already covers (played_at, track_id, ms_played) for range scans.
+    op.create_index(
+        "ix_listens_track_played",
+        "listens",
+        ["track_id", "played_at", "ms_played"],
+        unique=False,
+    )
+    op.drop_index("ix_listens_track_id", table_name="listens")
+    op.create_index(
+        "ix_track_artists_artist_track", "track_artists", ["artist_id", "track_id"], unique=False
+    )
+    op.execute("ANALYZE")
+
+
+def downgrade() -> None:
+    op.drop_index("ix_track_artists_artist_track", table_name="track_artists")
+    op.create_index("ix_listens_track_id", "listens", ["track_id"], unique=False)
+    op.drop_index("ix_listens_track_played", table_name="listens")
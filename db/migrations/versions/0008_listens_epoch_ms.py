@@ -0,0 +1,91 @@
+"""Store listens.played_at as integer epoch milliseconds
+
+Revision ID: 0008_listens_epoch_ms
+Revises: 0007_covering_indexes
+Create Date: 2026-10-17 00:40:00.000000
+
+"""
+
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0008_listens_epoch_ms"
+down_revision = "0007_covering_indexes"
+branch_labels = None
+depends_on = None
+
+# Exact for the text SQLAlchemy wrote ('2026-02-14 09:00:00[.ffffff]+00:00'): whole seconds
+# from %s plus the millisecond digits of %f.
+_TEXT_TO_MS = (
+    "CAST(strftime('%s', played_at) AS INTEGER) * 1000"
+    " + CAST(substr(strftime('%f', played_at), 4, 3) AS INTEGER)"
+)
+_MS_TO_TEXT = (
+    "CASE WHEN played_at % 1000 = 0"
+    " THEN datetime(played_at / 1000, 'unixepoch') || '+00:00'"
+    " ELSE datetime(played_at / 1000, 'unixepoch') || '.'"
+    " || printf('%03d', played_at % 1000) || '000+00:00' END"
+)
+
+
+def _rebuild_listens(played_at_type: sa.types.TypeEngine, played_at_expr: str) -> None:
+    # SQLite cannot change a column type in place, so listens is copied into a new table.
+    op.create_table(
+        "_listens_new",
+        sa.Column("id", sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column("played_at", played_at_type, nullable=False),
+        sa.Column("ms_played", sa.Integer(), nullable=False),
+        sa.Column("track_id", sa.String(length=64), nullable=False),
+        sa.Column("context_type", sa.String(length=40), nullable=True),
+        sa.Column("context_id", sa.String(length=128), nullable=True),
+        sa.Column("device_name", sa.String(length=255), nullable=True),
+        sa.ForeignKeyConstraint(["track_id"], ["tracks.id"]),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("played_at", "track_id", "ms_played", name="uq_listen_dedupe"),
+    )
+    op.execute(
+        f"""
+        INSERT INTO _listens_new(
+            id, played_at, ms_played, track_id, context_type, context_id, device_name
+        )
+        SELECT id, {played_at_expr}, ms_played, track_id, context_type, context_id, device_name
+        FROM listens
+        """
+    )
+    op.drop_table("listens")
+    op.rename_table("_listens_new", "listens")
+    op.create_index("ix_listens_context", "listens", ["context_type", "context_id"], unique=False)
+    op.create_index("ix_listens_played_at", "listens", ["played_at"], unique=False)
+    op.create_index(
+        "ix_listens_track_played",
+        "listens",
+        ["track_id", "played_at", "ms_played"],
+        unique=False,
+    )
+    op.execute("ANALYZE")
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name == "sqlite":
+        _rebuild_listens(sa.BigInteger(), _TEXT_TO_MS)
+    else:
+        op.alter_column(
+            "listens",
+            "played_at",
+            type_=sa.BigInteger(),
+            postgresql_using="(EXTRACT(EPOCH FROM played_at) * 1000)::bigint",
+        )
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == "sqlite":
+        _rebuild_listens(sa.DateTime(timezone=True), _MS_TO_TEXT)
+    else:
+        op.alter_column(
+            "listens",
+            "played_at",
+            type_=sa.DateTime(timezone=True),
+            postgresql_using="to_timestamp(played_at / 1000.0)",
+        )
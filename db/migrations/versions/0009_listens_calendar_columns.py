@@ -0,0 +1,103 @@
+"""Add stored calendar columns to listens
+
+Revision ID: 0009_listens_calendar_columns
+Revises: 0008_listens_epoch_ms
+Create Date: 2026-10-17 00:50:00.000000
+
+"""
+
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0009_listens_calendar_columns"
+down_revision = "0008_listens_epoch_ms"
+branch_labels = None
+depends_on = None
+
+_CALENDAR_COLUMNS = {
+    "played_day": "played_at / 86400000",
+    "played_hour": "played_at / 3600000 % 24",
+    "played_weekday": "(played_at / 86400000 + 3) % 7",
+    "played_week": "played_at / 86400000 - (played_at / 86400000 + 3) % 7",
+}
+_BASE_COLUMNS = "id, played_at, ms_played, track_id, context_type, context_id, device_name"
+
+
+def _calendar_columns() -> list[sa.Column]:
+    return [
+        sa.Column(name, sa.Integer(), sa.Computed(expr, persisted=True))
+        for name, expr in _CALENDAR_COLUMNS.items()
+    ]
+
+
+def _create_calendar_indexes() -> None:
+    op.create_index(
+        "ix_listens_calendar",
+        "listens",
+        [*_CALENDAR_COLUMNS, "track_id", "ms_played", "played_at"],
+        unique=False,
+    )
+    op.create_index(
+        "ix_listens_track_day", "listens", ["track_id", "played_day", "ms_played"], unique=False
+    )
+
+
+def _rebuild_listens(calendar: bool) -> None:
+    # SQLite cannot add stored generated columns with ALTER TABLE, so listens is copied into a new
+    # table; the generated values are computed as the rows are inserted.
+    op.create_table(
+        "_listens_new",
+        sa.Column("id", sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column("played_at", sa.BigInteger(), nullable=False),
+        sa.Column("ms_played", sa.Integer(), nullable=False),
+        sa.Column("track_id", sa.String(length=64), nullable=False),
+        sa.Column("context_type", sa.String(length=40), nullable=True),
+        sa.Column("context_id", sa.String(length=128), nullable=True),
+        sa.Column("device_name", sa.String(length=255), nullable=True),
+        *(_calendar_columns() if calendar else []),
+        sa.ForeignKeyConstraint(["track_id"], ["tracks.id"]),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("played_at", "track_id", "ms_played", name="uq_listen_dedupe"),
+    )
+    op.execute(f"INSERT INTO _listens_new({_BASE_COLUMNS}) SELECT {_BASE_COLUMNS} FROM listens")
+    op.drop_table("listens")
+    op.rename_table("_listens_new", "listens")
+    op.create_index("ix_listens_context", "listens", ["context_type", "context_id"], unique=False)
+    if calendar:
+        _create_calendar_indexes()
+    else:
+        op.create_index("ix_listens_played_at", "listens", ["played_at"], unique=False)
+        op.create_index(
+            "ix_listens_track_played",
+            "listens",
+            ["track_id", "played_at", "ms_played"],
+            unique=False,
+        )
+    op.execute("ANALYZE")
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name == "sqlite":
+        _rebuild_listens(calendar=True)
+        return
+    for column in _calendar_columns():
+        op.add_column("listens", column)
+    op.drop_index("ix_listens_track_played", table_name="listens")
+    op.drop_index("ix_listens_played_at", table_name="listens")
+    _create_calendar_indexes()
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == "sqlite":
+        _rebuild_listens(calendar=False)
+        return
+    op.drop_index("ix_listens_track_day", table_name="listens")
+    op.drop_index("ix_listens_calendar", table_name="listens")
+    op.create_index("ix_listens_played_at", "listens", ["played_at"], unique=False)
+    op.create_index(
+        "ix_listens_track_played", "listens", ["track_id", "played_at", "ms_played"], unique=False
+    )
+    for name in reversed(list(_CALENDAR_COLUMNS)):
+        op.drop_column("listens", name)
@@ -0,0 +1,96 @@
+"""Add per-entity daily rollups for tracks, artists, albums and genres
+
+Revision ID: 0010_entity_daily_rollups
+Revises: 0009_listens_calendar_columns
+Create Date: 2026-10-17 01:00:00.000000
+
+"""
+
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0010_entity_daily_rollups"
+down_revision = "0009_listens_calendar_columns"
+branch_labels = None
+depends_on = None
+
+_ENTITIES = (
+    ("track_daily", "track_id", sa.String(length=64)),
+    ("artist_daily", "artist_id", sa.String(length=64)),
+    ("album_daily", "album_id", sa.String(length=64)),
+)
+
+# Same statements as db.repository's per-day refresh, over every listen at once.
+_BACKFILL = (
+    """
+    INSERT INTO track_daily(day, track_id, plays, ms_played, last_played_at)
+    SELECT played_day, track_id, COUNT(*), SUM(ms_played), MAX(played_at)
+    FROM listens
+    GROUP BY played_day, track_id
+    """,
+    """
+    INSERT INTO artist_daily(day, artist_id, plays, ms_played, last_played_at)
+    SELECT td.day, ta.artist_id, SUM(td.plays), SUM(td.ms_played), MAX(td.last_played_at)
+    FROM track_daily td
+    JOIN track_artists ta ON ta.track_id = td.track_id
+    GROUP BY td.day, ta.artist_id
+    """,
+    """
+    INSERT INTO album_daily(day, album_id, plays, ms_played, last_played_at)
+    SELECT td.day, t.album_id, SUM(td.plays), SUM(td.ms_played), MAX(td.last_played_at)
+    FROM track_daily td
+    JOIN tracks t ON t.id = td.track_id
+    WHERE t.album_id IS NOT NULL
+    GROUP BY td.day, t.album_id
+    """,
+    """
+    INSERT INTO genre_daily(day, genre_id, plays, ms_played)
+    SELECT ad.day, ag.genre_id, SUM(ad.plays), SUM(ad.ms_played)
+    FROM artist_daily ad
+    JOIN artist_genres ag ON ag.artist_id = ad.artist_id
+    GROUP BY ad.day, ag.genre_id
+    """,
+)
+
+
+def upgrade() -> None:
+    for table, column, column_type in _ENTITIES:
+        op.create_table(
+            table,
+            sa.Column("day", sa.Integer(), nullable=False),
+            sa.Column(column, column_type, nullable=False),
+            sa.Column("plays", sa.Integer(), nullable=False),
+            sa.Column("ms_played", sa.BigInteger(), nullable=False),
+            sa.Column("last_played_at", sa.BigInteger(), nullable=False),
+            sa.PrimaryKeyConstraint("day", column),
+            sqlite_with_rowid=False,
+        )
+        entity = table.removesuffix("_daily")
+        op.create_index(
+            f"ix_{table}_{entity}_day",
+            table,
+            [column, "day", "plays", "ms_played"],
+            unique=False,
+        )
+    op.create_table(
+        "genre_daily",
+        sa.Column("day", sa.Integer(), nullable=False),
+        sa.Column("genre_id", sa.Integer(), nullable=False),
+        sa.Column("plays", sa.Integer(), nullable=False),
+        sa.Column("ms_played", sa.BigInteger(), nullable=False),
+        sa.PrimaryKeyConstraint("day", "genre_id"),
+        sqlite_with_rowid=False,
+    )
+    for statement in _BACKFILL:
+        op.execute(statement)
+    op.execute("ANALYZE")
+
+
+def downgrade() -> None:
+    op.drop_table("genre_daily")
+    for table, _column, _type in reversed(_ENTITIES):
+        entity = table.removesuffix("_daily")
+        op.drop_index(f"ix_{table}_{entity}_day", table_name=table)
+        op.drop_table(table)
@@ -0,0 +1,73 @@
+"""Store exact ms_played totals in aggregates_daily
+
+Revision ID: 0011_aggregates_daily_ms_played
+Revises: 0010_entity_daily_rollups
+Create Date: 2026-10-17 01:10:00.000000
+
+"""
+
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0011_aggregates_daily_ms_played"
+down_revision = "0010_entity_daily_rollups"
+branch_labels = None
+depends_on = None
+
+
+def _day_date(column: str) -> str:
+    if op.get_bind().dialect.name == "sqlite":
+        return f"date({column} * 86400, 'unixepoch')"
+    return f"(DATE '1970-01-01' + {column})"
+
+
+def upgrade() -> None:
+    with op.batch_alter_table("aggregates_daily") as batch_op:
+        batch_op.add_column(
+            sa.Column("ms_played", sa.BigInteger(), nullable=False, server_default="0")
+        )
+        batch_op.drop_column("minutes")
+    # Rows written before the rollups truncated minutes, counted plays once per track artist and
+    # were missing for days never refreshed, so every day is recomputed from the rollups (which
+    # 0010 built from listens) and days left without listens are zeroed.
+    op.execute(
+        """
+        UPDATE aggregates_daily
+        SET ms_played = 0, plays = 0, unique_tracks = 0, unique_artists = 0, unique_albums = 0
+        """
+    )
+    op.execute(
+        f"""
+        INSERT INTO aggregates_daily(
+            day, ms_played, plays, unique_tracks, unique_artists, unique_albums
+        )
+        SELECT
+            {_day_date("td.day")},
+            SUM(td.ms_played),
+            SUM(td.plays),
+            COUNT(*),
+            (SELECT COUNT(*) FROM artist_daily ad WHERE ad.day = td.day),
+            (SELECT COUNT(*) FROM album_daily bd WHERE bd.day = td.day)
+        FROM track_daily td
+        WHERE true
+        GROUP BY td.day
+        ON CONFLICT(day) DO UPDATE SET
+            ms_played = excluded.ms_played,
+            plays = excluded.plays,
+            unique_tracks = excluded.unique_tracks,
+            unique_artists = excluded.unique_artists,
+            unique_albums = excluded.unique_albums
+        """
+    )
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("aggregates_daily") as batch_op:
+        batch_op.add_column(
+            sa.Column("minutes", sa.BigInteger(), nullable=False, server_default="0")
+        )
+    op.execute("UPDATE aggregates_daily SET minutes = ms_played / 60000")
+    with op.batch_alter_table("aggregates_daily") as batch_op:
+        batch_op.drop_column("ms_played")
@@ -0,0 +1,41 @@
+"""Add an hour-of-day rollup for the hour chart, weekday split and heatmap
+
+Revision ID: 0012_hour_daily_rollup
+Revises: 0011_aggregates_daily_ms_played
+Create Date: 2026-10-17 01:20:00.000000
+
+"""
+
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0012_hour_daily_rollup"
+down_revision = "0011_aggregates_daily_ms_played"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "hour_daily",
+        sa.Column("day", sa.Integer(), nullable=False),
+        sa.Column("hour", sa.Integer(), nullable=False),
+        sa.Column("plays", sa.Integer(), nullable=False),
+        sa.Column("ms_played", sa.BigInteger(), nullable=False),
+        sa.PrimaryKeyConstraint("day", "hour"),
+        sqlite_with_rowid=False,
+    )
+    op.execute(
+        """
+        INSERT INTO hour_daily(day, hour, plays, ms_played)
+        SELECT played_day, played_hour, COUNT(*), SUM(ms_played)
+        FROM listens
+        GROUP BY played_day, played_hour
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("hour_daily")
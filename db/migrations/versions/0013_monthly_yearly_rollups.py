@@ -0,0 +1,86 @@
+"""Add monthly and yearly tiers of the track, artist, album and genre rollups
+
+Revision ID: 0013_monthly_yearly_rollups
+Revises: 0012_hour_daily_rollup
+Create Date: 2026-10-17 01:30:00.000000
+
+"""
+
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0013_monthly_yearly_rollups"
+down_revision = "0012_hour_daily_rollup"
+branch_labels = None
+depends_on = None
+
+_ENTITIES = (
+    ("track", "track_id", sa.String(length=64)),
+    ("artist", "artist_id", sa.String(length=64)),
+    ("album", "album_id", sa.String(length=64)),
+    ("genre", "genre_id", sa.Integer()),
+)
+
+
+def _period_start(unit: str, column: str) -> str:
+    # Epoch day number of the first day of the month or year containing an epoch day.
+    if op.get_bind().dialect.name == "sqlite":
+        modifier = "start of month" if unit == "month" else "start of year"
+        return (
+            f"CAST(strftime('%s', date({column} * 86400, 'unixepoch', '{modifier}')) AS INTEGER)"
+            " / 86400"
+        )
+    return f"(date_trunc('{unit}', DATE '1970-01-01' + {column})::date - DATE '1970-01-01')"
+
+
+def upgrade() -> None:
+    for entity, column, column_type in _ENTITIES:
+        for tier, period in (("monthly", "month_start"), ("yearly", "year_start")):
+            columns = [
+                sa.Column(period, sa.Integer(), nullable=False),
+                sa.Column(column, column_type, nullable=False),
+                sa.Column("plays", sa.Integer(), nullable=False),
+                sa.Column("ms_played", sa.BigInteger(), nullable=False),
+            ]
+            if entity != "genre":
+                columns.append(sa.Column("last_played_at", sa.BigInteger(), nullable=False))
+            op.create_table(
+                f"{entity}_{tier}",
+                *columns,
+                sa.PrimaryKeyConstraint(period, column),
+                sqlite_with_rowid=False,
+            )
+
+        values = "plays, ms_played" if entity == "genre" else "plays, ms_played, last_played_at"
+        aggregates = (
+            "SUM(plays), SUM(ms_played)"
+            if entity == "genre"
+            else "SUM(plays), SUM(ms_played), MAX(last_played_at)"
+        )
+        month_start = _period_start("month", "day")
+        year_start = _period_start("year", "month_start")
+        op.execute(
+            f"""
+            INSERT INTO {entity}_monthly(month_start, {column}, {values})
+            SELECT {month_start}, {column}, {aggregates}
+            FROM {entity}_daily
+            GROUP BY {month_start}, {column}
+            """
+        )
+        op.execute(
+            f"""
+            INSERT INTO {entity}_yearly(year_start, {column}, {values})
+            SELECT {year_start}, {column}, {aggregates}
+            FROM {entity}_monthly
+            GROUP BY {year_start}, {column}
+            """
+        )
+    op.execute("ANALYZE")
+
+
+def downgrade() -> None:
+    for entity, _column, _type in reversed(_ENTITIES):
+        op.drop_table(f"{entity}_yearly")
+        op.drop_table(f"{entity}_monthly")
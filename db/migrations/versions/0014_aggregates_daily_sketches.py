@@ -0,0 +1,93 @@
+"""Store per-day distinct-count sketches in aggregates_daily
+
+Revision ID: 0014_aggregates_daily_sketches
+Revises: 0013_monthly_yearly_rollups
+Create Date: 2026-10-17 01:40:00.000000
+
+"""
+
+from __future__ import annotations
+
+import hashlib
+from collections.abc import Iterable
+from itertools import groupby
+from operator import itemgetter
+
+from alembic import op
+import numpy as np
+import sqlalchemy as sa
+
+revision = "0014_aggregates_daily_sketches"
+down_revision = "0013_monthly_yearly_rollups"
+branch_labels = None
+depends_on = None
+
+_SOURCES = (
+    ("track_sketch", "track_daily", "track_id"),
+    ("artist_sketch", "artist_daily", "artist_id"),
+    ("album_sketch", "album_daily", "album_id"),
+)
+
+# A frozen copy of the sketch format as of this revision (analytics.sketches), so later changes
+# to that module cannot change what this migration writes.
+_PRECISION = 14
+_REGISTERS = 1 << _PRECISION
+_SPARSE_LIMIT = _REGISTERS // 8
+_HASH_BITS = 64 - _PRECISION
+
+
+def build_sketch(ids: Iterable[str]) -> bytes:
+    hashes = np.unique(
+        np.array(
+            [
+                int.from_bytes(hashlib.blake2b(value.encode(), digest_size=8).digest(), "little")
+                for value in ids
+            ],
+            dtype=np.uint64,
+        )
+    )
+    if hashes.size <= _SPARSE_LIMIT:
+        return b"S" + hashes.astype("<u8").tobytes()
+    registers = np.zeros(_REGISTERS, dtype=np.uint8)
+    index = (hashes >> np.uint64(_HASH_BITS)).astype(np.intp)
+    rest = hashes & np.uint64((1 << _HASH_BITS) - 1)
+    rank = _HASH_BITS + 1 - np.frexp(rest.astype(np.float64))[1]
+    np.maximum.at(registers, index, rank.astype(np.uint8))
+    return b"D" + registers.tobytes()
+
+
+def _day_date(column: str) -> str:
+    if op.get_bind().dialect.name == "sqlite":
+        return f"date({column} * 86400, 'unixepoch')"
+    return f"(DATE '1970-01-01' + {column})"
+
+
+def upgrade() -> None:
+    with op.batch_alter_table("aggregates_daily") as batch_op:
+        for column, _table, _key in _SOURCES:
+            batch_op.add_column(sa.Column(column, sa.LargeBinary(), nullable=True))
+
+    bind = op.get_bind()
+    for column, table, key in _SOURCES:
+        rows = bind.execute(sa.text(f"SELECT day, {key} FROM {table} ORDER BY day")).all()
+        sketches = [
+            {"day": day, "sketch": build_sketch(row[1] for row in group)}
+            for day, group in groupby(rows, key=itemgetter(0))
+        ]
+        if not sketches:
+            continue
+        bind.execute(
+            sa.text(
+                f"""
+                UPDATE aggregates_daily SET {column} = :sketch
+                WHERE day = {_day_date("CAST(:day AS INTEGER)")}
+                """
+            ),
+            sketches,
+        )
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("aggregates_daily") as batch_op:
+        for column, _table, _key in reversed(_SOURCES):
+            batch_op.drop_column(column)
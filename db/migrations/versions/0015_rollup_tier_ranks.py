@@ -0,0 +1,63 @@
+"""Rank monthly and yearly rollup rows by ms_played for top-K candidate reads
+
+Revision ID: 0015_rollup_tier_ranks
+Revises: 0014_aggregates_daily_sketches
+Create Date: 2026-10-17 01:50:00.000000
+
+"""
+
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0015_rollup_tier_ranks"
+down_revision = "0014_aggregates_daily_sketches"
+branch_labels = None
+depends_on = None
+
+_ENTITIES = (
+    ("track", "track_id", ("plays", "ms_played", "last_played_at")),
+    ("artist", "artist_id", ("plays", "ms_played", "last_played_at")),
+    ("album", "album_id", ("plays", "ms_played", "last_played_at")),
+)
+_TIERS = (("monthly", "month_start"), ("yearly", "year_start"))
+
+
+def upgrade() -> None:
+    for entity, key, values in _ENTITIES:
+        for tier, period in _TIERS:
+            table = f"{entity}_{tier}"
+            with op.batch_alter_table(table) as batch_op:
+                batch_op.add_column(
+                    sa.Column("ms_rank", sa.Integer(), nullable=False, server_default="0")
+                )
+            op.execute(
+                f"""
+                UPDATE {table}
+                SET ms_rank = ranked.ms_rank
+                FROM (
+                  SELECT {period}, {key},
+                         ROW_NUMBER() OVER (
+                           PARTITION BY {period} ORDER BY ms_played DESC, plays DESC
+                         ) AS ms_rank
+                  FROM {table}
+                ) AS ranked
+                WHERE ranked.{period} = {table}.{period} AND ranked.{key} = {table}.{key}
+                """
+            )
+            op.create_index(f"ix_{table}_rank", table, [period, "ms_rank"], unique=False)
+            op.create_index(
+                f"ix_{table}_{entity}", table, [key, period, *values], unique=False
+            )
+    op.execute("ANALYZE")
+
+
+def downgrade() -> None:
+    for entity, _key, _values in reversed(_ENTITIES):
+        for tier, _period in reversed(_TIERS):
+            table = f"{entity}_{tier}"
+            op.drop_index(f"ix_{table}_{entity}", table_name=table)
+            op.drop_index(f"ix_{table}_rank", table_name=table)
+            with op.batch_alter_table(table) as batch_op:
+                batch_op.drop_column("ms_rank")
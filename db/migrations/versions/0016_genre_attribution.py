@@ -0,0 +1,81 @@
+"""Credit each listen once per distinct genre in the genre rollups
+
+Revision ID: 0016_genre_attribution
+Revises: 0015_rollup_tier_ranks
+Create Date: 2026-10-17 02:00:00.000000
+
+"""
+
+from __future__ import annotations
+
+from alembic import op
+
+revision = "0016_genre_attribution"
+down_revision = "0015_rollup_tier_ranks"
+branch_labels = None
+depends_on = None
+
+# genre_daily counted a listen once per artist holding the genre; rebuild it and its tiers
+# from the track rows with each (track, genre) pair counted once.
+_GENRE_DAILY = """
+    INSERT INTO genre_daily(day, genre_id, plays, ms_played)
+    SELECT day, genre_id, SUM(plays), SUM(ms_played)
+    FROM (
+      SELECT DISTINCT td.day, td.track_id, ag.genre_id, td.plays, td.ms_played
+      FROM track_daily td
+      JOIN track_artists ta ON ta.track_id = td.track_id
+      JOIN artist_genres ag ON ag.artist_id = ta.artist_id
+    ) AS track_genres
+    GROUP BY day, genre_id
+"""
+
+_PER_ARTIST_GENRE_DAILY = """
+    INSERT INTO genre_daily(day, genre_id, plays, ms_played)
+    SELECT ad.day, ag.genre_id, SUM(ad.plays), SUM(ad.ms_played)
+    FROM artist_daily ad
+    JOIN artist_genres ag ON ag.artist_id = ad.artist_id
+    GROUP BY ad.day, ag.genre_id
+"""
+
+
+def _period_start(unit: str, column: str) -> str:
+    # Epoch day number of the first day of the month or year containing an epoch day.
+    if op.get_bind().dialect.name == "sqlite":
+        modifier = "start of month" if unit == "month" else "start of year"
+        return (
+            f"CAST(strftime('%s', date({column} * 86400, 'unixepoch', '{modifier}')) AS INTEGER)"
+            " / 86400"
+        )
+    return f"(date_trunc('{unit}', DATE '1970-01-01' + {column})::date - DATE '1970-01-01')"
+
+
+def _rebuild(genre_daily: str) -> None:
+    for table in ("genre_yearly", "genre_monthly", "genre_daily"):
+        op.execute(f"DELETE FROM {table}")
+    op.execute(genre_daily)
+    month_start = _period_start("month", "day")
+    year_start = _period_start("year", "month_start")
+    op.execute(
+        f"""
+        INSERT INTO genre_monthly(month_start, genre_id, plays, ms_played)
+        SELECT {month_start}, genre_id, SUM(plays), SUM(ms_played)
+        FROM genre_daily
+        GROUP BY {month_start}, genre_id
+        """
+    )
+    op.execute(
+        f"""
+        INSERT INTO genre_yearly(year_start, genre_id, plays, ms_played)
+        SELECT {year_start}, genre_id, SUM(plays), SUM(ms_played)
+        FROM genre_monthly
+        GROUP BY {year_start}, genre_id
+        """
+    )
+
+
+def upgrade() -> None:
+    _rebuild(_GENRE_DAILY)
+
+
+def downgrade() -> None:
+    _rebuild(_PER_ARTIST_GENRE_DAILY)
@@ -0,0 +1,36 @@
+"""Drop the weekday and week columns from the listens calendar index
+
+Revision ID: 0017_listens_calendar_index
+Revises: 0016_genre_attribution
+Create Date: 2026-10-17 02:20:00.000000
+
+"""
+
+from __future__ import annotations
+
+from alembic import op
+
+revision = "0017_listens_calendar_index"
+down_revision = "0016_genre_attribution"
+branch_labels = None
+depends_on = None
+
+_TRAILING = ["track_id", "ms_played", "played_at"]
+
+
+def upgrade() -> None:
+    # Weekday and week views read hour_daily now; nothing searches listens on those columns.
+    op.drop_index("ix_listens_calendar", table_name="listens")
+    op.create_index(
+        "ix_listens_calendar", "listens", ["played_day", "played_hour", *_TRAILING], unique=False
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_listens_calendar", table_name="listens")
+    op.create_index(
+        "ix_listens_calendar",
+        "listens",
+        ["played_day", "played_hour", "played_weekday", "played_week", *_TRAILING],
+        unique=False,
+    )
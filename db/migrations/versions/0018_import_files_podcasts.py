@@ -0,0 +1,29 @@
+"""Record the podcast setting each import file was imported with
+
+Revision ID: 0018_import_files_podcasts
+Revises: 0017_listens_calendar_index
+Create Date: 2026-10-17 02:30:00.000000
+
+"""
+
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0018_import_files_podcasts"
+down_revision = "0017_listens_calendar_index"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Existing rows stay NULL: the setting they were imported with is unknown, so the next import
+    # of those files starts over (dedupe keeps listens already stored from doubling).
+    with op.batch_alter_table("import_files") as batch_op:
+        batch_op.add_column(sa.Column("include_podcasts", sa.Boolean(), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("import_files") as batch_op:
+        batch_op.drop_column("include_podcasts")
@@ -5,11 +5,14 @@ from datetime import date, datetime
 from sqlalchemy import (
     BigInteger,
     Boolean,
+    Computed,
     Date,
     DateTime,
+    Float,
     ForeignKey,
     Index,
     Integer,
+    LargeBinary,
     String,
     Text,
     UniqueConstraint,
@@ -25,15 +28,40 @@ class Listen(Base):
     __tablename__ = "listens"
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
-    played_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, index=True)
+    # Milliseconds since the Unix epoch, UTC; see db.timestamps.
+    played_at: Mapped[int] = mapped_column(BigInteger, nullable=False)
     ms_played: Mapped[int] = mapped_column(Integer, nullable=False)
-    track_id: Mapped[str] = mapped_column(ForeignKey("tracks.id"), nullable=False, index=True)
+    track_id: Mapped[str] = mapped_column(ForeignKey("tracks.id"), nullable=False)
     context_type: Mapped[str | None] = mapped_column(String(40), nullable=True)
     context_id: Mapped[str | None] = mapped_column(String(128), nullable=True)
     device_name: Mapped[str | None] = mapped_column(String(255), nullable=True)
+    # UTC calendar attributes, stored when the row is written. Days and weeks are epoch day
+    # numbers; played_week is the Monday that starts the ISO week, played_weekday 0 is Monday.
+    played_day: Mapped[int] = mapped_column(
+        Integer, Computed("played_at / 86400000", persisted=True)
+    )
+    played_hour: Mapped[int] = mapped_column(
+        Integer, Computed("played_at / 3600000 % 24", persisted=True)
+    )
+    played_weekday: Mapped[int] = mapped_column(
+        Integer, Computed("(played_at / 86400000 + 3) % 7", persisted=True)
+    )
+    played_week: Mapped[int] = mapped_column(
+        Integer, Computed("played_at / 86400000 - (played_at / 86400000 + 3) % 7", persisted=True)
+    )
 
     __table_args__ = (
         Index("ix_listens_context", "context_type", "context_id"),
+        # Covers every day-range query; the dedupe constraint still serves played_at lookups.
+        Index(
+            "ix_listens_calendar",
+            "played_day",
+            "played_hour",
+            "track_id",
+            "ms_played",
+            "played_at",
+        ),
+        Index("ix_listens_track_day", "track_id", "played_day", "ms_played"),
         UniqueConstraint("played_at", "track_id", "ms_played", name="uq_listen_dedupe"),
     )
 
@@ -72,7 +100,10 @@ class TrackArtist(Base):
     track_id: Mapped[str] = mapped_column(ForeignKey("tracks.id"), primary_key=True)
     artist_id: Mapped[str] = mapped_column(ForeignKey("artists.id"), primary_key=True)
 
-    __table_args__ = (Index("ix_track_artists_track_id", "track_id"),)
+    __table_args__ = (
+        Index("ix_track_artists_track_id", "track_id"),
+        Index("ix_track_artists_artist_track", "artist_id", "track_id"),
+    )
 
 
 class Genre(Base):
@@ -113,15 +144,296 @@ class AggregateDaily(Base):
     __tablename__ = "aggregates_daily"
 
     day: Mapped[date] = mapped_column(Date, primary_key=True)
-    minutes: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+    ms_played: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
     plays: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
     unique_tracks: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
     unique_artists: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
     unique_albums: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    # Distinct-count sketches of the day's ids (analytics.sketches), merged for range KPIs.
+    track_sketch: Mapped[bytes | None] = mapped_column(LargeBinary, nullable=True)
+    artist_sketch: Mapped[bytes | None] = mapped_column(LargeBinary, nullable=True)
+    album_sketch: Mapped[bytes | None] = mapped_column(LargeBinary, nullable=True)
 
     __table_args__ = (Index("ix_aggregates_daily_day", "day"),)
 
 
+# Per-entity daily rollups, rebuilt for every day whose listens change (see
+# db.repository.refresh_daily_aggregates). day is the epoch day number, like listens.played_day,
+# and rows are clustered by (day, entity) so range reads never touch listens.
+class TrackDaily(Base):
+    __tablename__ = "track_daily"
+
+    day: Mapped[int] = mapped_column(Integer, primary_key=True)
+    track_id: Mapped[str] = mapped_column(String(64), primary_key=True)
+    plays: Mapped[int] = mapped_column(Integer, nullable=False)
+    ms_played: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    last_played_at: Mapped[int] = mapped_column(BigInteger, nullable=False)
+
+    __table_args__ = (
+        Index("ix_track_daily_track_day", "track_id", "day", "plays", "ms_played"),
+        {"sqlite_with_rowid": False},
+    )
+
+
+class ArtistDaily(Base):
+    __tablename__ = "artist_daily"
+
+    day: Mapped[int] = mapped_column(Integer, primary_key=True)
+    artist_id: Mapped[str] = mapped_column(String(64), primary_key=True)
+    plays: Mapped[int] = mapped_column(Integer, nullable=False)
+    ms_played: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    last_played_at: Mapped[int] = mapped_column(BigInteger, nullable=False)
+
+    __table_args__ = (
+        Index("ix_artist_daily_artist_day", "artist_id", "day", "plays", "ms_played"),
+        {"sqlite_with_rowid": False},
+    )
+
+
+class AlbumDaily(Base):
+    __tablename__ = "album_daily"
+
+    day: Mapped[int] = mapped_column(Integer, primary_key=True)
+    album_id: Mapped[str] = mapped_column(String(64), primary_key=True)
+    plays: Mapped[int] = mapped_column(Integer, nullable=False)
+    ms_played: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    last_played_at: Mapped[int] = mapped_column(BigInteger, nullable=False)
+
+    __table_args__ = (
+        Index("ix_album_daily_album_day", "album_id", "day", "plays", "ms_played"),
+        {"sqlite_with_rowid": False},
+    )
+
+
+class HourDaily(Base):
+    __tablename__ = "hour_daily"
+
+    day: Mapped[int] = mapped_column(Integer, primary_key=True)
+    hour: Mapped[int] = mapped_column(Integer, primary_key=True)
+    plays: Mapped[int] = mapped_column(Integer, nullable=False)
+    ms_played: Mapped[int] = mapped_column(BigInteger, nullable=False)
+
+    __table_args__ = ({"sqlite_with_rowid": False},)
+
+
+class GenreDaily(Base):
+    __tablename__ = "genre_daily"
+
+    day: Mapped[int] = mapped_column(Integer, primary_key=True)
+    genre_id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    plays: Mapped[int] = mapped_column(Integer, nullable=False)
+    ms_played: Mapped[int] = mapped_column(BigInteger, nullable=False)
+
+    __table_args__ = ({"sqlite_with_rowid": False},)
+
+
+# Coarser tiers of the same rollups, rebuilt from the daily rows for every month and year a
+# refresh touches. month_start and year_start are the epoch day number of the period's first day,
+# so a span of analytics.date_ranges.plan_range() filters every tier the same way. ms_rank orders
+# a period's rows by ms_played (1 is the most played), so its top-K list is an index range; genres
+# are few enough to rank in full and have none.
+class TrackMonthly(Base):
+    __tablename__ = "track_monthly"
+
+    month_start: Mapped[int] = mapped_column(Integer, primary_key=True)
+    track_id: Mapped[str] = mapped_column(String(64), primary_key=True)
+    plays: Mapped[int] = mapped_column(Integer, nullable=False)
+    ms_played: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    last_played_at: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    ms_rank: Mapped[int] = mapped_column(Integer, nullable=False)
+
+    __table_args__ = (
+        Index("ix_track_monthly_rank", "month_start", "ms_rank"),
+        Index(
+            "ix_track_monthly_track",
+            "track_id",
+            "month_start",
+            "plays",
+            "ms_played",
+            "last_played_at",
+        ),
+        {"sqlite_with_rowid": False},
+    )
+
+
+class TrackYearly(Base):
+    __tablename__ = "track_yearly"
+
+    year_start: Mapped[int] = mapped_column(Integer, primary_key=True)
+    track_id: Mapped[str] = mapped_column(String(64), primary_key=True)
+    plays: Mapped[int] = mapped_column(Integer, nullable=False)
+    ms_played: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    last_played_at: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    ms_rank: Mapped[int] = mapped_column(Integer, nullable=False)
+
+    __table_args__ = (
+        Index("ix_track_yearly_rank", "year_start", "ms_rank"),
+        Index(
+            "ix_track_yearly_track",
+            "track_id",
+            "year_start",
+            "plays",
+            "ms_played",
+            "last_played_at",
+        ),
+        {"sqlite_with_rowid": False},
+    )
+
+
+class ArtistMonthly(Base):
+    __tablename__ = "artist_monthly"
+
+    month_start: Mapped[int] = mapped_column(Integer, primary_key=True)
+    artist_id: Mapped[str] = mapped_column(String(64), primary_key=True)
+    plays: Mapped[int] = mapped_column(Integer, nullable=False)
+    ms_played: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    last_played_at: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    ms_rank: Mapped[int] = mapped_column(Integer, nullable=False)
+
+    __table_args__ = (
+        Index("ix_artist_monthly_rank", "month_start", "ms_rank"),
+        Index(
+            "ix_artist_monthly_artist",
+            "artist_id",
+            "month_start",
+            "plays",
+            "ms_played",
+            "last_played_at",
+        ),
+        {"sqlite_with_rowid": False},
+    )
+
+
+class ArtistYearly(Base):
+    __tablename__ = "artist_yearly"
+
+    year_start: Mapped[int] = mapped_column(Integer, primary_key=True)
+    artist_id: Mapped[str] = mapped_column(String(64), primary_key=True)
+    plays: Mapped[int] = mapped_column(Integer, nullable=False)
+    ms_played: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    last_played_at: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    ms_rank: Mapped[int] = mapped_column(Integer, nullable=False)
+
+    __table_args__ = (
+        Index("ix_artist_yearly_rank", "year_start", "ms_rank"),
+        Index(
+            "ix_artist_yearly_artist",
+            "artist_id",
+            "year_start",
+            "plays",
+            "ms_played",
+            "last_played_at",
+        ),
+        {"sqlite_with_rowid": False},
+    )
+
+
+class AlbumMonthly(Base):
+    __tablename__ = "album_monthly"
+
+    month_start: Mapped[int] = mapped_column(Integer, primary_key=True)
+    album_id: Mapped[str] = mapped_column(String(64), primary_key=True)
+    plays: Mapped[int] = mapped_column(Integer, nullable=False)
+    ms_played: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    last_played_at: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    ms_rank: Mapped[int] = mapped_column(Integer, nullable=False)
+
+    __table_args__ = (
+        Index("ix_album_monthly_rank", "month_start", "ms_rank"),
+        Index(
+            "ix_album_monthly_album",
+            "album_id",
+            "month_start",
+            "plays",
+            "ms_played",
+            "last_played_at",
+        ),
+        {"sqlite_with_rowid": False},
+    )
+
+
+class AlbumYearly(Base):
+    __tablename__ = "album_yearly"
+
+    year_start: Mapped[int] = mapped_column(Integer, primary_key=True)
+    album_id: Mapped[str] = mapped_column(String(64), primary_key=True)
+    plays: Mapped[int] = mapped_column(Integer, nullable=False)
+    ms_played: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    last_played_at: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    ms_rank: Mapped[int] = mapped_column(Integer, nullable=False)
+
+    __table_args__ = (
+        Index("ix_album_yearly_rank", "year_start", "ms_rank"),
+        Index(
+            "ix_album_yearly_album",
+            "album_id",
+            "year_start",
+            "plays",
+            "ms_played",
+            "last_played_at",
+        ),
+        {"sqlite_with_rowid": False},
+    )
+
+
+class GenreMonthly(Base):
+    __tablename__ = "genre_monthly"
+
+    month_start: Mapped[int] = mapped_column(Integer, primary_key=True)
+    genre_id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    plays: Mapped[int] = mapped_column(Integer, nullable=False)
+    ms_played: Mapped[int] = mapped_column(BigInteger, nullable=False)
+
+    __table_args__ = ({"sqlite_with_rowid": False},)
+
+
+class GenreYearly(Base):
+    __tablename__ = "genre_yearly"
+
+    year_start: Mapped[int] = mapped_column(Integer, primary_key=True)
+    genre_id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    plays: Mapped[int] = mapped_column(Integer, nullable=False)
+    ms_played: Mapped[int] = mapped_column(BigInteger, nullable=False)
+
+    __table_args__ = ({"sqlite_with_rowid": False},)
+
+
+class TrackResolution(Base):
+    __tablename__ = "track_resolutions"
+
+    track_key: Mapped[str] = mapped_column(String(500), primary_key=True)
+    artist_key: Mapped[str] = mapped_column(String(500), primary_key=True)
+    track_id: Mapped[str | None] = mapped_column(String(64), nullable=True)
+    resolved_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+
+
+class ImportFile(Base):
+    __tablename__ = "import_files"
+
+    content_hash: Mapped[str] = mapped_column(String(64), primary_key=True)
+    name: Mapped[str] = mapped_column(String(500), nullable=False)
+    status: Mapped[str] = mapped_column(String(16), nullable=False)
+    items_done: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    # NULL for files registered before the setting was recorded; they are imported again.
+    include_podcasts: Mapped[bool | None] = mapped_column(Boolean, nullable=True)
+    started_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    completed_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+
+
+class SlowQuery(Base):
+    __tablename__ = "slow_queries"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    recorded_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    query_name: Mapped[str] = mapped_column(String(128), nullable=False, index=True)
+    duration_ms: Mapped[float] = mapped_column(Float, nullable=False)
+    sql_text: Mapped[str] = mapped_column(Text, nullable=False)
+    params: Mapped[str] = mapped_column(Text, nullable=False)
+    query_plan: Mapped[str] = mapped_column(Text, nullable=False)
+    full_scan: Mapped[bool] = mapped_column(Boolean, nullable=False, default=False)
+
+
 class OAuthToken(Base):
     __tablename__ = "oauth_tokens"
 
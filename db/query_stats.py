@@ -0,0 +1,152 @@
+from __future__ import annotations
+
+import threading
+from collections import deque
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from functools import wraps
+from typing import Any, TypeVar
+
+import pandas as pd
+
+# Percentiles cover the most recent calls only, so a slow page shows up while it is slow.
+ROLLING_WINDOW = 512
+PERCENTILES = (50, 95, 99)
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+
+@dataclass
+class QueryStats:
+    calls: int = 0
+    total_s: float = 0.0
+    max_s: float = 0.0
+    rows: int = 0
+    bytes: int = 0
+    cache_hits: int = 0
+    cache_misses: int = 0
+    recent_s: deque[float] = field(default_factory=lambda: deque(maxlen=ROLLING_WINDOW))
+
+
+_lock = threading.Lock()
+_stats: dict[str, QueryStats] = {}
+_local = threading.local()
+
+
+def _entry(name: str) -> QueryStats:
+    stats = _stats.get(name)
+    if stats is None:
+        stats = _stats.setdefault(name, QueryStats())
+    return stats
+
+
+def record_query(name: str, seconds: float, rows: int, nbytes: int) -> None:
+    _local.fetches = getattr(_local, "fetches", 0) + 1
+    pending = getattr(_local, "lookup", None)
+    if pending is not None:
+        pending.append((seconds, rows, nbytes))
+        return
+    _record(name, seconds, rows, nbytes)
+
+
+@contextmanager
+def lookup(name: str) -> Iterator[None]:
+    # Every fetch inside counts as one call under `name`, so a ranking that retries its query, or
+    # a dashboard helper built from several repository calls, is one row. Nested lookups join the
+    # outermost one.
+    if getattr(_local, "lookup", None) is not None:
+        yield
+        return
+    pending: list[tuple[float, int, int]] = []
+    _local.lookup = pending
+    try:
+        yield
+    finally:
+        _local.lookup = None
+        if pending:
+            _record(
+                name,
+                sum(seconds for seconds, _, _ in pending),
+                sum(rows for _, rows, _ in pending),
+                sum(nbytes for _, _, nbytes in pending),
+            )
+
+
+def _record(name: str, seconds: float, rows: int, nbytes: int) -> None:
+    with _lock:
+        stats = _entry(name)
+        stats.calls += 1
+        stats.total_s += seconds
+        stats.max_s = max(stats.max_s, seconds)
+        stats.rows += rows
+        stats.bytes += nbytes
+        stats.recent_s.append(seconds)
+
+
+def record_cache(name: str, hit: bool) -> None:
+    with _lock:
+        stats = _entry(name)
+        if hit:
+            stats.cache_hits += 1
+        else:
+            stats.cache_misses += 1
+
+
+def track_cache(name: str) -> Callable[[F], F]:
+    # Wraps a cached function; a call that reached the database on this thread was a miss.
+    def decorate(func: F) -> F:
+        @wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            before = getattr(_local, "fetches", 0)
+            result = func(*args, **kwargs)
+            record_cache(name, hit=getattr(_local, "fetches", 0) == before)
+            return result
+
+        return wrapper  # type: ignore[return-value]
+
+    return decorate
+
+
+def _percentile(ordered: list[float], pct: int) -> float:
+    if not ordered:
+        return 0.0
+    rank = round(pct / 100 * (len(ordered) - 1))
+    return ordered[rank]
+
+
+def snapshot() -> pd.DataFrame:
+    with _lock:
+        items = [(name, stats, sorted(stats.recent_s)) for name, stats in _stats.items()]
+    records = []
+    for name, stats, ordered in items:
+        lookups = stats.cache_hits + stats.cache_misses
+        record = {
+            "query": name,
+            "calls": stats.calls,
+            "total_ms": stats.total_s * 1000,
+            "mean_ms": stats.total_s * 1000 / stats.calls if stats.calls else 0.0,
+        }
+        for pct in PERCENTILES:
+            record[f"p{pct}_ms"] = _percentile(ordered, pct) * 1000
+        record.update(
+            {
+                "max_ms": stats.max_s * 1000,
+                "rows": stats.rows,
+                "avg_rows": stats.rows / stats.calls if stats.calls else 0.0,
+                "memory_kb": stats.bytes / 1024,
+                "cache_hits": stats.cache_hits,
+                "cache_misses": stats.cache_misses,
+                "cache_hit_rate": stats.cache_hits / lookups if lookups else None,
+            }
+        )
+        records.append(record)
+    df = pd.DataFrame.from_records(records)
+    if df.empty:
+        return df
+    return df.sort_values("total_ms", ascending=False, ignore_index=True)
+
+
+def reset() -> None:
+    with _lock:
+        _stats.clear()
@@ -0,0 +1,12 @@
+from __future__ import annotations
+
+from db.repository import refresh_daily_aggregates
+
+
+def main() -> None:
+    days = refresh_daily_aggregates()
+    print(f"Rebuilt daily aggregates and entity rollups for {days} days")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,21 @@
 from __future__ import annotations
 
+import time
+from collections.abc import Iterable
 from dataclasses import dataclass
 from datetime import UTC, date, datetime, timedelta
+from itertools import groupby
+from operator import itemgetter
 from typing import Any
 
 import pandas as pd
 from sqlalchemy import text
 
-from analytics.date_ranges import DateRange, to_datetime_bounds
+from analytics.date_ranges import DateRange, plan_range
+from analytics.sketches import build_sketch, merged_count
+from db import query_stats, slow_queries
 from db.session import SessionLocal
+from db.timestamps import epoch_day, from_epoch_day
 
 
 @dataclass(frozen=True)
@@ -17,159 +24,357 @@ class Pagination:
     offset: int = 0
 
 
-def _fetch_df(sql: str, params: dict[str, Any]) -> pd.DataFrame:
+def _fetch_df(name: str, sql: str, params: dict[str, Any]) -> pd.DataFrame:
+    # Stats and the slow-query log are keyed by the repository function that issued the query.
+    started = time.perf_counter()
     with SessionLocal() as session:
         conn = session.connection()
-        return pd.read_sql_query(text(sql), conn, params=params)
+        df = pd.read_sql_query(text(sql), conn, params=params)
+        elapsed = time.perf_counter() - started
+    if slow_queries.enabled(elapsed):
+        slow_queries.log_slow_query(name, sql, params, elapsed)
+    query_stats.record_query(
+        name, elapsed, len(df), int(df.memory_usage(index=True, deep=True).sum())
+    )
+    return df
 
 
 def _range_params(date_range: DateRange) -> dict[str, Any]:
-    start_dt, end_dt = to_datetime_bounds(date_range)
-    return {"start": start_dt, "end": end_dt}
+    # Ranges are whole UTC days, so they filter on listens.played_day (inclusive bounds).
+    return {"first_day": epoch_day(date_range.start), "last_day": epoch_day(date_range.end)}
+
+
+def _date_params(date_range: DateRange) -> dict[str, Any]:
+    # aggregates_daily is keyed by ISO date strings rather than epoch day numbers.
+    return {"first_date": date_range.start.isoformat(), "last_date": date_range.end.isoformat()}
+
+
+# Ranked rollups read the fewest rows that cover a range: whole years, then whole months, then the
+# edge days (see plan_range). Each span gets its own branch; unused spans bind an empty range.
+_PLAN_SLOTS = (
+    ("years", "yearly", "year_start", 1),
+    ("months", "monthly", "month_start", 2),
+    ("days", "daily", "day", 2),
+)
+
+
+def _plan_params(date_range: DateRange) -> dict[str, Any]:
+    plan = plan_range(date_range)
+    params: dict[str, Any] = {}
+    for attr, _tier, column, slots in _PLAN_SLOTS:
+        spans = getattr(plan, attr)
+        for slot in range(slots):
+            bounds = (
+                (epoch_day(spans[slot].start), epoch_day(spans[slot].end))
+                if slot < len(spans)
+                else (0, -1)
+            )
+            params[f"{column}_{slot}_first"], params[f"{column}_{slot}_last"] = bounds
+    return params
+
+
+def _tiered_rows(entity: str, columns: str, where: str = "") -> str:
+    return "\n          UNION ALL\n          ".join(
+        f"SELECT {columns} FROM {entity}_{tier} "
+        f"WHERE {column} BETWEEN :{column}_{slot}_first AND :{column}_{slot}_last"
+        + (f" AND {where}" if where else "")
+        for _attr, tier, column, slots in _PLAN_SLOTS
+        for slot in range(slots)
+    )
 
 
-def get_kpis(date_range: DateRange) -> dict[str, float]:
-    params = _range_params(date_range)
-    df = _fetch_df(
-        """
-        SELECT
-          COALESCE(SUM(l.ms_played), 0) / 60000.0 AS total_minutes,
-          COUNT(*) AS plays,
-          COUNT(DISTINCT t.id) AS unique_songs,
-          COUNT(DISTINCT a.id) AS unique_artists,
-          COUNT(DISTINCT al.id) AS unique_albums
-        FROM listens l
-        JOIN tracks t ON t.id = l.track_id
-        LEFT JOIN track_artists ta ON ta.track_id = t.id
-        LEFT JOIN artists a ON a.id = ta.artist_id
-        LEFT JOIN albums al ON al.id = t.album_id
-        WHERE l.played_at >= :start AND l.played_at < :end
-        """,
-        params,
+# Rankings that only need their head read each month's and year's top TOP_K ids (by ms_rank)
+# plus every id on the edge days, and re-score just those candidates from the rollups. An id
+# outside a period's top K played at most that period's (K+1)th ms_played, so the head is exact
+# once its last row beats the sum of those; otherwise the ranking is recomputed in full.
+TOP_K = 100
+
+
+def _top_k_candidates(entity: str, key: str) -> str:
+    branches = [
+        f"SELECT {key} FROM {entity}_{tier} "
+        f"WHERE {column} BETWEEN :{column}_{slot}_first AND :{column}_{slot}_last"
+        + ("" if tier == "daily" else " AND ms_rank <= :top_k")
+        for _attr, tier, column, slots in _PLAN_SLOTS
+        for slot in range(slots)
+    ]
+    union = "\n          UNION\n          ".join(branches)
+    return f"candidates AS (\n          {union}\n        ),"
+
+
+def _top_k_unlisted(entity: str) -> str:
+    # NULL when no period has an id outside its top K, i.e. the candidates are every id.
+    branches = [
+        f"SELECT ms_played FROM {entity}_{tier} "
+        f"WHERE {column} BETWEEN :{column}_{slot}_first AND :{column}_{slot}_last "
+        "AND ms_rank = :top_k + 1"
+        for _attr, tier, column, slots in _PLAN_SLOTS
+        if tier != "daily"
+        for slot in range(slots)
+    ]
+    return "(SELECT SUM(ms_played) FROM (" + " UNION ALL ".join(branches) + "))"
+
+
+def _top_k_sql(entity: str, key: str, top_k: bool) -> tuple[str, str, str]:
+    # (candidates CTE, filter for _tiered_rows, unlisted bound) for one pass of a ranking.
+    if not top_k:
+        return "", "", "NULL"
+    return (
+        _top_k_candidates(entity, key),
+        f"{key} IN (SELECT {key} FROM candidates)",
+        _top_k_unlisted(entity),
     )
-    if df.empty:
-        return {"total_minutes": 0.0, "plays": 0, "unique_songs": 0, "unique_artists": 0, "unique_albums": 0}
-    row = df.iloc[0]
+
+
+def _top_k_passes(params: dict[str, Any], search: str, pagination: Pagination) -> tuple[bool, ...]:
+    # Ranges of edge days only have no ranked periods to narrow the read.
+    ranked_periods = any(
+        params[f"{column}_{slot}_first"] <= params[f"{column}_{slot}_last"]
+        for _attr, tier, column, slots in _PLAN_SLOTS
+        if tier != "daily"
+        for slot in range(slots)
+    )
+    if not ranked_periods or search or pagination.offset + pagination.limit > TOP_K:
+        return (False,)
+    return (True, False)
+
+
+def _top_k_settled(df: pd.DataFrame, pagination: Pagination) -> bool:
+    unlisted = df["unlisted_ms"].iloc[0] if not df.empty else None
+    if unlisted is None or pd.isna(unlisted):
+        return not df.empty or pagination.offset == 0
+    return len(df) == pagination.limit and df["ms_played"].iloc[-1] > unlisted
+
+
+# Calendar buckets over a rollup's epoch-day column; weeks start on the ISO Monday and months
+# are labelled from the day.
+_ROLLUP_BUCKETS = {"day": "gd.day", "week": "gd.day - (gd.day + 3) % 7", "month": "gd.day"}
+
+
+def _bucket_label(bucket: str, column: str) -> str:
+    if bucket == "month":
+        return f"strftime('%Y-%m-01', {column} * 86400, 'unixepoch')"
+    return f"date({column} * 86400, 'unixepoch')"
+
+
+def _with_timestamps(df: pd.DataFrame, *columns: str) -> pd.DataFrame:
+    # played_at values come back as epoch milliseconds; callers get UTC timestamps.
+    for column in columns:
+        df[column] = pd.to_datetime(df[column], unit="ms", utc=True)
+    return df
+
+
+def get_kpis(date_range: DateRange, exact: bool = False) -> dict[str, float]:
+    # Unique counts merge the per-day sketches: exact for small sets, within about 1% for large
+    # ones. exact=True counts distinct ids over the rollup tiers instead, for exports.
+    if exact:
+        # Every rollup row has plays > 0; the filter keeps SQLite reading ids off the primary key
+        # rather than the ms_rank index, whose order is slower to de-duplicate.
+        ids = {
+            entity: _tiered_rows(entity, f"{entity}_id", "plays > 0")
+            for entity in ("track", "artist", "album")
+        }
+        df = _fetch_df(
+            "get_kpis",
+            f"""
+            SELECT
+              COALESCE(SUM(ms_played), 0) AS ms_played,
+              COALESCE(SUM(plays), 0) AS plays,
+              (
+                SELECT COUNT(DISTINCT track_id) FROM ({ids["track"]})
+              ) AS unique_songs,
+              (
+                SELECT COUNT(DISTINCT artist_id) FROM ({ids["artist"]})
+              ) AS unique_artists,
+              (
+                SELECT COUNT(DISTINCT album_id) FROM ({ids["album"]})
+              ) AS unique_albums
+            FROM aggregates_daily
+            WHERE day BETWEEN :first_date AND :last_date
+            """,
+            _plan_params(date_range) | _date_params(date_range),
+        )
+        uniques = df.iloc[0][["unique_songs", "unique_artists", "unique_albums"]].to_dict()
+    else:
+        df = _fetch_df(
+            "get_kpis",
+            """
+            SELECT ms_played, plays, track_sketch, artist_sketch, album_sketch
+            FROM aggregates_daily
+            WHERE day BETWEEN :first_date AND :last_date
+              AND plays > 0
+            """,
+            _date_params(date_range),
+        )
+        uniques = {
+            "unique_songs": merged_count(df["track_sketch"]),
+            "unique_artists": merged_count(df["artist_sketch"]),
+            "unique_albums": merged_count(df["album_sketch"]),
+        }
     return {
-        "total_minutes": float(row["total_minutes"] or 0.0),
-        "plays": int(row["plays"] or 0),
-        "unique_songs": int(row["unique_songs"] or 0),
-        "unique_artists": int(row["unique_artists"] or 0),
-        "unique_albums": int(row["unique_albums"] or 0),
+        "total_minutes": float(df["ms_played"].sum()) / 60000.0,
+        "plays": int(df["plays"].sum()),
+        **{key: int(value) for key, value in uniques.items()},
     }
 
 
 def listened_days(date_range: DateRange) -> list[date]:
     df = _fetch_df(
+        "listened_days",
         """
-        SELECT DISTINCT date(played_at) AS day
-        FROM listens
-        WHERE played_at >= :start AND played_at < :end
+        SELECT day
+        FROM aggregates_daily
+        WHERE day BETWEEN :first_date AND :last_date
+          AND plays > 0
         ORDER BY day ASC
         """,
-        _range_params(date_range),
+        _date_params(date_range),
     )
-    return [pd.to_datetime(v).date() for v in df["day"].tolist()] if not df.empty else []
+    return [date.fromisoformat(str(v)) for v in df["day"].tolist()] if not df.empty else []
 
 
 def top_songs(date_range: DateRange, search: str = "", pagination: Pagination = Pagination()) -> pd.DataFrame:
-    params = _range_params(date_range) | {
+    params = _plan_params(date_range) | {
         "search": f"%{search.lower()}%",
         "limit": pagination.limit,
         "offset": pagination.offset,
+        "top_k": TOP_K,
     }
-    return _fetch_df(
-        """
-        SELECT
-          t.id,
-          t.name,
-          COALESCE(al.name, '') AS album_name,
-          GROUP_CONCAT(ar.name, ', ') AS artists,
-          COUNT(*) AS plays,
-          COALESCE(SUM(l.ms_played), 0) / 60000.0 AS minutes,
-          MAX(l.played_at) AS last_played
-        FROM listens l
-        JOIN tracks t ON t.id = l.track_id
-        LEFT JOIN albums al ON al.id = t.album_id
-        LEFT JOIN track_artists ta ON ta.track_id = t.id
-        LEFT JOIN artists ar ON ar.id = ta.artist_id
-        WHERE l.played_at >= :start AND l.played_at < :end
-          AND lower(t.name) LIKE :search
-        GROUP BY t.id, t.name, al.name
-        ORDER BY minutes DESC, plays DESC
-        LIMIT :limit OFFSET :offset
-        """,
-        params,
-    )
+    with query_stats.lookup("top_songs"):
+        for top_k in _top_k_passes(params, search, pagination):
+            candidates, where, unlisted = _top_k_sql("track", "track_id", top_k)
+            rows = _tiered_rows("track", "track_id, plays, ms_played, last_played_at", where)
+            df = _fetch_df(
+                "top_songs",
+                f"""
+                WITH {candidates} per_track AS (
+                  SELECT track_id, SUM(plays) AS plays, SUM(ms_played) AS ms_played,
+                         MAX(last_played_at) AS last_played
+                  FROM ({rows})
+                  GROUP BY track_id
+                )
+                SELECT
+                  t.id,
+                  t.name,
+                  COALESCE(al.name, '') AS album_name,
+                  (
+                    SELECT GROUP_CONCAT(ar.name, ', ')
+                    FROM track_artists ta
+                    JOIN artists ar ON ar.id = ta.artist_id
+                    WHERE ta.track_id = t.id
+                  ) AS artists,
+                  p.plays,
+                  p.ms_played / 60000.0 AS minutes,
+                  p.last_played,
+                  p.ms_played,
+                  {unlisted} AS unlisted_ms
+                FROM per_track p
+                JOIN tracks t ON t.id = p.track_id
+                LEFT JOIN albums al ON al.id = t.album_id
+                WHERE lower(t.name) LIKE :search
+                ORDER BY minutes DESC, plays DESC
+                LIMIT :limit OFFSET :offset
+                """,
+                params,
+            )
+            if _top_k_settled(df, pagination):
+                break
+    return _with_timestamps(df.drop(columns=["ms_played", "unlisted_ms"]), "last_played")
 
 
 def top_artists(date_range: DateRange, search: str = "", pagination: Pagination = Pagination()) -> pd.DataFrame:
-    params = _range_params(date_range) | {
+    params = _plan_params(date_range) | {
         "search": f"%{search.lower()}%",
         "limit": pagination.limit,
         "offset": pagination.offset,
+        "top_k": TOP_K,
     }
-    return _fetch_df(
-        """
-        SELECT
-          ar.id,
-          ar.name,
-          COUNT(*) AS plays,
-          COALESCE(SUM(l.ms_played), 0) / 60000.0 AS minutes,
-          MAX(l.played_at) AS last_played
-        FROM listens l
-        JOIN track_artists ta ON ta.track_id = l.track_id
-        JOIN artists ar ON ar.id = ta.artist_id
-        WHERE l.played_at >= :start AND l.played_at < :end
-          AND lower(ar.name) LIKE :search
-        GROUP BY ar.id, ar.name
-        ORDER BY minutes DESC, plays DESC
-        LIMIT :limit OFFSET :offset
-        """,
-        params,
-    )
+    with query_stats.lookup("top_artists"):
+        for top_k in _top_k_passes(params, search, pagination):
+            candidates, where, unlisted = _top_k_sql("artist", "artist_id", top_k)
+            rows = _tiered_rows("artist", "artist_id, plays, ms_played, last_played_at", where)
+            df = _fetch_df(
+                "top_artists",
+                f"""
+                WITH {candidates} per_artist AS (
+                  SELECT artist_id, SUM(plays) AS plays, SUM(ms_played) AS ms_played,
+                         MAX(last_played_at) AS last_played
+                  FROM ({rows})
+                  GROUP BY artist_id
+                )
+                SELECT
+                  ar.id,
+                  ar.name,
+                  p.plays,
+                  p.ms_played / 60000.0 AS minutes,
+                  p.last_played,
+                  p.ms_played,
+                  {unlisted} AS unlisted_ms
+                FROM per_artist p
+                JOIN artists ar ON ar.id = p.artist_id
+                WHERE lower(ar.name) LIKE :search
+                ORDER BY minutes DESC, plays DESC
+                LIMIT :limit OFFSET :offset
+                """,
+                params,
+            )
+            if _top_k_settled(df, pagination):
+                break
+    return _with_timestamps(df.drop(columns=["ms_played", "unlisted_ms"]), "last_played")
 
 
 def top_albums(date_range: DateRange, search: str = "", pagination: Pagination = Pagination()) -> pd.DataFrame:
-    params = _range_params(date_range) | {
+    params = _plan_params(date_range) | {
         "search": f"%{search.lower()}%",
         "limit": pagination.limit,
         "offset": pagination.offset,
+        "top_k": TOP_K,
     }
-    return _fetch_df(
-        """
-        SELECT
-          al.id,
-          al.name,
-          COUNT(*) AS plays,
-          COALESCE(SUM(l.ms_played), 0) / 60000.0 AS minutes,
-          MAX(l.played_at) AS last_played
-        FROM listens l
-        JOIN tracks t ON t.id = l.track_id
-        JOIN albums al ON al.id = t.album_id
-        WHERE l.played_at >= :start AND l.played_at < :end
-          AND lower(al.name) LIKE :search
-        GROUP BY al.id, al.name
-        ORDER BY minutes DESC, plays DESC
-        LIMIT :limit OFFSET :offset
-        """,
-        params,
-    )
+    with query_stats.lookup("top_albums"):
+        for top_k in _top_k_passes(params, search, pagination):
+            candidates, where, unlisted = _top_k_sql("album", "album_id", top_k)
+            rows = _tiered_rows("album", "album_id, plays, ms_played, last_played_at", where)
+            df = _fetch_df(
+                "top_albums",
+                f"""
+                WITH {candidates} per_album AS (
+                  SELECT album_id, SUM(plays) AS plays, SUM(ms_played) AS ms_played,
+                         MAX(last_played_at) AS last_played
+                  FROM ({rows})
+                  GROUP BY album_id
+                )
+                SELECT
+                  al.id,
+                  al.name,
+                  p.plays,
+                  p.ms_played / 60000.0 AS minutes,
+                  p.last_played,
+                  p.ms_played,
+                  {unlisted} AS unlisted_ms
+                FROM per_album p
+                JOIN albums al ON al.id = p.album_id
+                WHERE lower(al.name) LIKE :search
+                ORDER BY minutes DESC, plays DESC
+                LIMIT :limit OFFSET :offset
+                """,
+                params,
+            )
+            if _top_k_settled(df, pagination):
+                break
+    return _with_timestamps(df.drop(columns=["ms_played", "unlisted_ms"]), "last_played")
 
 
 def top_genres(date_range: DateRange, pagination: Pagination = Pagination()) -> pd.DataFrame:
-    params = _range_params(date_range) | {"limit": pagination.limit, "offset": pagination.offset}
+    params = _plan_params(date_range) | {"limit": pagination.limit, "offset": pagination.offset}
     return _fetch_df(
-        """
+        "top_genres",
+        f"""
         SELECT
           g.name,
-          COUNT(*) AS plays,
-          COALESCE(SUM(l.ms_played), 0) / 60000.0 AS minutes
-        FROM listens l
-        JOIN track_artists ta ON ta.track_id = l.track_id
-        JOIN artist_genres ag ON ag.artist_id = ta.artist_id
-        JOIN genres g ON g.id = ag.genre_id
-        WHERE l.played_at >= :start AND l.played_at < :end
+          SUM(gd.plays) AS plays,
+          COALESCE(SUM(gd.ms_played), 0) / 60000.0 AS minutes
+        FROM ({_tiered_rows("genre", "genre_id, plays, ms_played")}) gd
+        JOIN genres g ON g.id = gd.genre_id
         GROUP BY g.name
         ORDER BY minutes DESC, plays DESC
         LIMIT :limit OFFSET :offset
@@ -180,26 +385,30 @@ def top_genres(date_range: DateRange, pagination: Pagination = Pagination()) ->
 
 def daily_minutes(date_range: DateRange) -> pd.DataFrame:
     return _fetch_df(
+        "daily_minutes",
         """
-        SELECT date(played_at) AS day, COALESCE(SUM(ms_played),0)/60000.0 AS minutes, COUNT(*) AS plays
-        FROM listens
-        WHERE played_at >= :start AND played_at < :end
-        GROUP BY date(played_at)
+        SELECT day,
+               ms_played/60000.0 AS minutes,
+               plays
+        FROM aggregates_daily
+        WHERE day BETWEEN :first_date AND :last_date
+          AND plays > 0
         ORDER BY day ASC
         """,
-        _range_params(date_range),
+        _date_params(date_range),
     )
 
 
 def hourly_distribution(date_range: DateRange) -> pd.DataFrame:
     return _fetch_df(
+        "hourly_distribution",
         """
-        SELECT CAST(strftime('%H', played_at) AS INTEGER) AS hour,
+        SELECT hour,
                COALESCE(SUM(ms_played),0)/60000.0 AS minutes,
-               COUNT(*) AS plays
-        FROM listens
-        WHERE played_at >= :start AND played_at < :end
-        GROUP BY CAST(strftime('%H', played_at) AS INTEGER)
+               SUM(plays) AS plays
+        FROM hour_daily
+        WHERE day BETWEEN :first_day AND :last_day
+        GROUP BY hour
         ORDER BY hour ASC
         """,
         _range_params(date_range),
@@ -208,12 +417,13 @@ def hourly_distribution(date_range: DateRange) -> pd.DataFrame:
 
 def weekday_weekend(date_range: DateRange) -> dict[str, float]:
     df = _fetch_df(
+        "weekday_weekend",
         """
         SELECT
-          SUM(CASE WHEN CAST(strftime('%w', played_at) AS INTEGER) BETWEEN 1 AND 5 THEN ms_played ELSE 0 END)/60000.0 AS weekday_minutes,
-          SUM(CASE WHEN CAST(strftime('%w', played_at) AS INTEGER) IN (0,6) THEN ms_played ELSE 0 END)/60000.0 AS weekend_minutes
-        FROM listens
-        WHERE played_at >= :start AND played_at < :end
+          SUM(CASE WHEN (day + 3) % 7 < 5 THEN ms_played ELSE 0 END)/60000.0 AS weekday_minutes,
+          SUM(CASE WHEN (day + 3) % 7 >= 5 THEN ms_played ELSE 0 END)/60000.0 AS weekend_minutes
+        FROM hour_daily
+        WHERE day BETWEEN :first_day AND :last_day
         """,
         _range_params(date_range),
     )
@@ -226,13 +436,31 @@ def weekday_weekend(date_range: DateRange) -> dict[str, float]:
     }
 
 
+def weekday_week_matrix(date_range: DateRange) -> pd.DataFrame:
+    # Weeks are labelled by their Monday, so ISO week numbers from different years stay apart.
+    return _fetch_df(
+        "weekday_week_matrix",
+        f"""
+        SELECT {_bucket_label("week", "(day - (day + 3) % 7)")} AS week,
+               (day + 3) % 7 AS weekday,
+               COALESCE(SUM(ms_played),0)/60000.0 AS minutes
+        FROM hour_daily
+        WHERE day BETWEEN :first_day AND :last_day
+        GROUP BY day
+        ORDER BY day ASC
+        """,
+        _range_params(date_range),
+    )
+
+
 def repeat_ratio(date_range: DateRange) -> float:
     df = _fetch_df(
+        "repeat_ratio",
         """
         WITH counts AS (
           SELECT track_id, COUNT(*) AS c
           FROM listens
-          WHERE played_at >= :start AND played_at < :end
+          WHERE played_day BETWEEN :first_day AND :last_day
           GROUP BY track_id
         )
         SELECT
@@ -251,39 +479,31 @@ def repeat_ratio(date_range: DateRange) -> float:
 
 
 def playlists(search: str = "") -> pd.DataFrame:
-    with SessionLocal() as session:
-        conn = session.connection()
-        return pd.read_sql_query(
-            text(
-                """
-                SELECT id, name, owner, snapshot_at
-                FROM playlists
-                WHERE lower(name) LIKE :search
-                ORDER BY name ASC
-                """
-            ),
-            conn,
-            params={"search": f"%{search.lower()}%"},
-        )
+    return _fetch_df(
+        "playlists",
+        """
+        SELECT id, name, owner, snapshot_at
+        FROM playlists
+        WHERE lower(name) LIKE :search
+        ORDER BY name ASC
+        """,
+        {"search": f"%{search.lower()}%"},
+    )
 
 
 def playlist_tracks(playlist_id: str) -> pd.DataFrame:
-    with SessionLocal() as session:
-        conn = session.connection()
-        return pd.read_sql_query(
-            text(
-                """
-                SELECT t.id, t.name, COALESCE(al.name,'') AS album_name
-                FROM playlist_tracks pt
-                JOIN tracks t ON t.id = pt.track_id
-                LEFT JOIN albums al ON al.id = t.album_id
-                WHERE pt.playlist_id = :playlist_id
-                ORDER BY pt.added_at DESC
-                """
-            ),
-            conn,
-            params={"playlist_id": playlist_id},
-        )
+    return _fetch_df(
+        "playlist_tracks",
+        """
+        SELECT t.id, t.name, COALESCE(al.name,'') AS album_name
+        FROM playlist_tracks pt
+        JOIN tracks t ON t.id = pt.track_id
+        LEFT JOIN albums al ON al.id = t.album_id
+        WHERE pt.playlist_id = :playlist_id
+        ORDER BY pt.added_at DESC
+        """,
+        {"playlist_id": playlist_id},
+    )
 
 
 def set_setting(key: str, value: str) -> None:
@@ -307,73 +527,319 @@ def get_setting(key: str) -> str | None:
     return row[0] if row else None
 
 
-def refresh_daily_aggregate_for_day(target_day: date) -> None:
-    start = datetime.combine(target_day, datetime.min.time())
-    end = start + timedelta(days=1)
-    with SessionLocal() as session:
-        row = session.execute(
-            text(
-                """
-                SELECT
-                    COALESCE(SUM(l.ms_played),0) / 60000.0 AS minutes,
-                    COUNT(*) AS plays,
-                    COUNT(DISTINCT l.track_id) AS unique_tracks,
-                    COUNT(DISTINCT ta.artist_id) AS unique_artists,
-                    COUNT(DISTINCT t.album_id) AS unique_albums
-                FROM listens l
-                LEFT JOIN track_artists ta ON ta.track_id = l.track_id
-                LEFT JOIN tracks t ON t.id = l.track_id
-                WHERE l.played_at >= :start AND l.played_at < :end
-                """
-            ),
-            {"start": start, "end": end},
-        ).first()
+_REFRESH_DAYS_DDL = """
+CREATE TEMP TABLE IF NOT EXISTS _refresh_days (
+    day DATE PRIMARY KEY,
+    day_number INTEGER NOT NULL
+)
+"""
 
-        minutes = int(row[0] or 0.0)
-        plays = int(row[1] or 0)
-        unique_tracks = int(row[2] or 0)
-        unique_artists = int(row[3] or 0)
-        unique_albums = int(row[4] or 0)
+# Entity rollups are replaced wholesale for each refreshed day, so inserted and removed listens
+# are both picked up. Artist, album and genre rows are derived from the fresh track rows.
+_ROLLUP_TABLES = ("track_daily", "artist_daily", "album_daily", "genre_daily", "hour_daily")
 
-        session.execute(
+_REFRESH_ROLLUPS = (
+    """
+    INSERT INTO track_daily(day, track_id, plays, ms_played, last_played_at)
+    SELECT l.played_day, l.track_id, COUNT(*), SUM(l.ms_played), MAX(l.played_at)
+    FROM listens l
+    WHERE l.played_day IN (SELECT day_number FROM _refresh_days)
+    GROUP BY l.played_day, l.track_id
+    """,
+    """
+    INSERT INTO hour_daily(day, hour, plays, ms_played)
+    SELECT l.played_day, l.played_hour, COUNT(*), SUM(l.ms_played)
+    FROM listens l
+    WHERE l.played_day IN (SELECT day_number FROM _refresh_days)
+    GROUP BY l.played_day, l.played_hour
+    """,
+    """
+    INSERT INTO artist_daily(day, artist_id, plays, ms_played, last_played_at)
+    SELECT td.day, ta.artist_id, SUM(td.plays), SUM(td.ms_played), MAX(td.last_played_at)
+    FROM track_daily td
+    JOIN track_artists ta ON ta.track_id = td.track_id
+    WHERE td.day IN (SELECT day_number FROM _refresh_days)
+    GROUP BY td.day, ta.artist_id
+    """,
+    """
+    INSERT INTO album_daily(day, album_id, plays, ms_played, last_played_at)
+    SELECT td.day, t.album_id, SUM(td.plays), SUM(td.ms_played), MAX(td.last_played_at)
+    FROM track_daily td
+    JOIN tracks t ON t.id = td.track_id
+    WHERE td.day IN (SELECT day_number FROM _refresh_days) AND t.album_id IS NOT NULL
+    GROUP BY td.day, t.album_id
+    """,
+    # A listen counts once for each distinct genre of its track's artists, however many of the
+    # artists share that genre.
+    """
+    INSERT INTO genre_daily(day, genre_id, plays, ms_played)
+    SELECT day, genre_id, SUM(plays), SUM(ms_played)
+    FROM (
+      SELECT DISTINCT td.day, td.track_id, ag.genre_id, td.plays, td.ms_played
+      FROM track_daily td
+      JOIN track_artists ta ON ta.track_id = td.track_id
+      JOIN artist_genres ag ON ag.artist_id = ta.artist_id
+      WHERE td.day IN (SELECT day_number FROM _refresh_days)
+    )
+    GROUP BY day, genre_id
+    """,
+)
+
+
+_REFRESH_PERIODS_DDL = (
+    """
+    CREATE TEMP TABLE IF NOT EXISTS _refresh_months (
+        month_start INTEGER PRIMARY KEY,
+        next_start INTEGER NOT NULL
+    )
+    """,
+    """
+    CREATE TEMP TABLE IF NOT EXISTS _refresh_years (
+        year_start INTEGER PRIMARY KEY,
+        next_start INTEGER NOT NULL
+    )
+    """,
+)
+
+# Rollups with monthly and yearly tiers: (entity, key column, value columns, ranked). Ranked tiers
+# carry each row's ms_rank within its period for the top-K reads.
+_TIERED_ROLLUPS = (
+    ("track", "track_id", ("plays", "ms_played", "last_played_at"), True),
+    ("artist", "artist_id", ("plays", "ms_played", "last_played_at"), True),
+    ("album", "album_id", ("plays", "ms_played", "last_played_at"), True),
+    ("genre", "genre_id", ("plays", "ms_played"), False),
+)
+
+_TIER_TABLES = tuple(
+    f"{entity}_{tier}"
+    for entity, _key, _values, _ranked in _TIERED_ROLLUPS
+    for tier in ("monthly", "yearly")
+)
+
+
+def _refresh_tier(
+    entity: str, key: str, values: tuple[str, ...], ranked: bool, tier: str
+) -> tuple[str, str]:
+    # Months are summed from the daily rows and years from the months. The period table drives
+    # the join so each period is a range search on the source's primary key. Only rows whose
+    # totals or rank changed are rewritten, then ids no longer in the source are dropped.
+    period, source, source_column = (
+        ("month", "daily", "day") if tier == "monthly" else ("year", "monthly", "month_start")
+    )
+    table = f"{entity}_{tier}"
+    aggregates = ", ".join(
+        f"MAX(r.{value}) AS {value}" if value == "last_played_at" else f"SUM(r.{value}) AS {value}"
+        for value in values
+    )
+    stored = (*values, "ms_rank") if ranked else values
+    rank = (
+        f", ROW_NUMBER() OVER (PARTITION BY {period}_start ORDER BY ms_played DESC, plays DESC)"
+        if ranked
+        else ""
+    )
+    assignments = ", ".join(f"{column}=excluded.{column}" for column in stored)
+    changed = " OR ".join(f"{table}.{column} != excluded.{column}" for column in stored)
+    upsert = f"""
+    INSERT INTO {table}({period}_start, {key}, {", ".join(stored)})
+    SELECT {period}_start, {key}, {", ".join(values)}{rank}
+    FROM (
+      SELECT p.{period}_start, r.{key}, {aggregates}
+      FROM _refresh_{period}s p
+      CROSS JOIN {entity}_{source} r
+      WHERE r.{source_column} >= p.{period}_start AND r.{source_column} < p.next_start
+      GROUP BY p.{period}_start, r.{key}
+    )
+    WHERE true
+    ON CONFLICT({period}_start, {key}) DO UPDATE SET {assignments}
+    WHERE {changed}
+    """
+    stale = f"""
+    DELETE FROM {table}
+    WHERE {period}_start IN (SELECT {period}_start FROM _refresh_{period}s)
+      AND NOT EXISTS (
+        SELECT 1
+        FROM _refresh_{period}s p
+        CROSS JOIN {entity}_{source} r
+        WHERE p.{period}_start = {table}.{period}_start
+          AND r.{key} = {table}.{key}
+          AND r.{source_column} >= p.{period}_start AND r.{source_column} < p.next_start
+      )
+    """
+    return upsert, stale
+
+
+_REFRESH_TIERS = tuple(
+    statement
+    for tier in ("monthly", "yearly")
+    for rollup in _TIERED_ROLLUPS
+    for statement in _refresh_tier(*rollup, tier)
+)
+
+
+def _touched_periods(target_days: list[date]) -> tuple[list[dict], list[dict]]:
+    month_starts = sorted({day.replace(day=1) for day in target_days})
+    year_starts = sorted({day.replace(month=1, day=1) for day in target_days})
+    months = [
+        {
+            "start": epoch_day(start),
+            "next": epoch_day((start + timedelta(days=31)).replace(day=1)),
+        }
+        for start in month_starts
+    ]
+    years = [
+        {"start": epoch_day(start), "next": epoch_day(start.replace(year=start.year + 1))}
+        for start in year_starts
+    ]
+    return months, years
+
+
+# Per-day totals are read off the freshly refreshed rollups rather than listens. Days without
+# listens keep a zero row so a refreshed range reflects removed listens too.
+_REFRESH_DAILY_AGGREGATES = """
+INSERT INTO aggregates_daily(day, ms_played, plays, unique_tracks, unique_artists, unique_albums)
+SELECT
+    d.day,
+    COALESCE(SUM(td.ms_played), 0),
+    COALESCE(SUM(td.plays), 0),
+    COUNT(td.track_id),
+    (SELECT COUNT(*) FROM artist_daily ad WHERE ad.day = d.day_number),
+    (SELECT COUNT(*) FROM album_daily bd WHERE bd.day = d.day_number)
+FROM _refresh_days d
+LEFT JOIN track_daily td ON td.day = d.day_number
+GROUP BY d.day, d.day_number
+ON CONFLICT(day) DO UPDATE SET
+    ms_played=excluded.ms_played,
+    plays=excluded.plays,
+    unique_tracks=excluded.unique_tracks,
+    unique_artists=excluded.unique_artists,
+    unique_albums=excluded.unique_albums
+"""
+
+
+# Distinct-count sketches per day, built from the refreshed rollup rows. Days left without
+# listens get NULL sketches.
+_SKETCH_SOURCES = (
+    ("track_sketch", "track_daily", "track_id"),
+    ("artist_sketch", "artist_daily", "artist_id"),
+    ("album_sketch", "album_daily", "album_id"),
+)
+
+
+def _refresh_sketches(session: Any, target_days: list[date]) -> None:
+    sketches: dict[str, dict[str, bytes]] = {}
+    for column, table, key in _SKETCH_SOURCES:
+        rows = session.execute(
             text(
+                f"""
+                SELECT d.day, r.{key}
+                FROM _refresh_days d
+                CROSS JOIN {table} r
+                WHERE r.day = d.day_number
+                ORDER BY d.day
                 """
-                INSERT INTO aggregates_daily(day, minutes, plays, unique_tracks, unique_artists, unique_albums)
-                VALUES(:day, :minutes, :plays, :unique_tracks, :unique_artists, :unique_albums)
-                ON CONFLICT(day) DO UPDATE SET
-                    minutes=excluded.minutes,
-                    plays=excluded.plays,
-                    unique_tracks=excluded.unique_tracks,
-                    unique_artists=excluded.unique_artists,
-                    unique_albums=excluded.unique_albums
-                """
-            ),
-            {
-                "day": target_day,
-                "minutes": minutes,
-                "plays": plays,
-                "unique_tracks": unique_tracks,
-                "unique_artists": unique_artists,
-                "unique_albums": unique_albums,
-            },
+            )
         )
-        session.commit()
+        for day, group in groupby(rows, key=itemgetter(0)):
+            sketches.setdefault(str(day), {})[column] = build_sketch(row[1] for row in group)
+    empty = dict.fromkeys(column for column, _table, _key in _SKETCH_SOURCES)
+    session.execute(
+        text(
+            """
+            UPDATE aggregates_daily
+            SET track_sketch=:track_sketch, artist_sketch=:artist_sketch, album_sketch=:album_sketch
+            WHERE day=:day
+            """
+        ),
+        [
+            {"day": day.isoformat(), **empty, **sketches.get(day.isoformat(), {})}
+            for day in target_days
+        ],
+    )
 
 
-def top_entities_for_dashboard(date_range: DateRange) -> tuple[pd.DataFrame, pd.DataFrame]:
-    return top_artists(date_range, pagination=Pagination(limit=10)), top_songs(
-        date_range, pagination=Pagination(limit=10)
+def refresh_daily_aggregates(
+    days: Iterable[date] | DateRange | None = None, session: Any | None = None
+) -> int:
+    # days=None rebuilds aggregates_daily and the entity rollups from scratch. Pass the ingest
+    # session to refresh inside the same transaction as the listens that changed.
+    if session is None:
+        with SessionLocal() as own_session:
+            refreshed = refresh_daily_aggregates(days, session=own_session)
+            own_session.commit()
+        return refreshed
+
+    if days is None:
+        session.execute(text("DELETE FROM aggregates_daily"))
+        for table in _ROLLUP_TABLES + _TIER_TABLES:
+            session.execute(text(f"DELETE FROM {table}"))
+        target_days = [
+            from_epoch_day(day)
+            for day in session.execute(
+                text("SELECT DISTINCT played_day FROM listens")
+            ).scalars()
+        ]
+    elif not isinstance(days, Iterable):
+        # Any DateRange-like value (analytics or app.types) with start/end dates.
+        span = (days.end - days.start).days + 1
+        target_days = [days.start + timedelta(days=offset) for offset in range(span)]
+    else:
+        target_days = sorted(set(days))
+    if not target_days:
+        return 0
+
+    session.execute(text(_REFRESH_DAYS_DDL))
+    session.execute(
+        text("INSERT INTO _refresh_days(day, day_number) VALUES(:day, :day_number)"),
+        [{"day": day, "day_number": epoch_day(day)} for day in target_days],
+    )
+    if days is not None:
+        for table in _ROLLUP_TABLES:
+            session.execute(
+                text(f"DELETE FROM {table} WHERE day IN (SELECT day_number FROM _refresh_days)")
+            )
+    for statement in _REFRESH_ROLLUPS:
+        session.execute(text(statement))
+
+    months, years = _touched_periods(target_days)
+    for statement in _REFRESH_PERIODS_DDL:
+        session.execute(text(statement))
+    session.execute(
+        text("INSERT INTO _refresh_months(month_start, next_start) VALUES(:start, :next)"), months
     )
+    session.execute(
+        text("INSERT INTO _refresh_years(year_start, next_start) VALUES(:start, :next)"), years
+    )
+    for statement in _REFRESH_TIERS:
+        session.execute(text(statement))
+
+    session.execute(text(_REFRESH_DAILY_AGGREGATES))
+    _refresh_sketches(session, target_days)
+    for table in ("_refresh_days", "_refresh_months", "_refresh_years"):
+        session.execute(text(f"DELETE FROM {table}"))
+    return len(target_days)
+
+
+def refresh_daily_aggregate_for_day(target_day: date) -> None:
+    refresh_daily_aggregates([target_day])
+
+
+def top_entities_for_dashboard(date_range: DateRange) -> tuple[pd.DataFrame, pd.DataFrame]:
+    with query_stats.lookup("top_entities_for_dashboard"):
+        return top_artists(date_range, pagination=Pagination(limit=10)), top_songs(
+            date_range, pagination=Pagination(limit=10)
+        )
 
 
 def song_daily_trend(track_id: str, date_range: DateRange) -> pd.DataFrame:
     return _fetch_df(
-        """
-        SELECT date(played_at) AS day, COUNT(*) AS plays, COALESCE(SUM(ms_played),0)/60000.0 AS minutes
-        FROM listens
+        "song_daily_trend",
+        f"""
+        SELECT {_bucket_label("day", "day")} AS day,
+               plays,
+               ms_played/60000.0 AS minutes
+        FROM track_daily
         WHERE track_id = :track_id
-          AND played_at >= :start AND played_at < :end
-        GROUP BY date(played_at)
+          AND day BETWEEN :first_day AND :last_day
         ORDER BY day ASC
         """,
         _range_params(date_range) | {"track_id": track_id},
@@ -382,13 +848,14 @@ def song_daily_trend(track_id: str, date_range: DateRange) -> pd.DataFrame:
 
 def artist_daily_trend(artist_id: str, date_range: DateRange) -> pd.DataFrame:
     return _fetch_df(
-        """
-        SELECT date(l.played_at) AS day, COUNT(*) AS plays, COALESCE(SUM(l.ms_played),0)/60000.0 AS minutes
-        FROM listens l
-        JOIN track_artists ta ON ta.track_id = l.track_id
-        WHERE ta.artist_id = :artist_id
-          AND l.played_at >= :start AND l.played_at < :end
-        GROUP BY date(l.played_at)
+        "artist_daily_trend",
+        f"""
+        SELECT {_bucket_label("day", "day")} AS day,
+               plays,
+               ms_played/60000.0 AS minutes
+        FROM artist_daily
+        WHERE artist_id = :artist_id
+          AND day BETWEEN :first_day AND :last_day
         ORDER BY day ASC
         """,
         _range_params(date_range) | {"artist_id": artist_id},
@@ -397,13 +864,14 @@ def artist_daily_trend(artist_id: str, date_range: DateRange) -> pd.DataFrame:
 
 def album_daily_trend(album_id: str, date_range: DateRange) -> pd.DataFrame:
     return _fetch_df(
-        """
-        SELECT date(l.played_at) AS day, COUNT(*) AS plays, COALESCE(SUM(l.ms_played),0)/60000.0 AS minutes
-        FROM listens l
-        JOIN tracks t ON t.id = l.track_id
-        WHERE t.album_id = :album_id
-          AND l.played_at >= :start AND l.played_at < :end
-        GROUP BY date(l.played_at)
+        "album_daily_trend",
+        f"""
+        SELECT {_bucket_label("day", "day")} AS day,
+               plays,
+               ms_played/60000.0 AS minutes
+        FROM album_daily
+        WHERE album_id = :album_id
+          AND day BETWEEN :first_day AND :last_day
         ORDER BY day ASC
         """,
         _range_params(date_range) | {"album_id": album_id},
@@ -411,112 +879,121 @@ def album_daily_trend(album_id: str, date_range: DateRange) -> pd.DataFrame:
 
 
 def genre_evolution(date_range: DateRange, bucket: str) -> pd.DataFrame:
-    if bucket == "month":
-        group_expr = "strftime('%Y-%m-01', l.played_at)"
-    elif bucket == "week":
-        group_expr = "date(l.played_at, '-' || ((strftime('%w', l.played_at) + 6) % 7) || ' days')"
-    else:
-        group_expr = "date(l.played_at)"
-
+    bucket_day = _ROLLUP_BUCKETS.get(bucket, "gd.day")
     sql = f"""
-        SELECT {group_expr} AS bucket, g.name AS genre, COALESCE(SUM(l.ms_played),0)/60000.0 AS minutes
-        FROM listens l
-        JOIN track_artists ta ON ta.track_id = l.track_id
-        JOIN artist_genres ag ON ag.artist_id = ta.artist_id
-        JOIN genres g ON g.id = ag.genre_id
-        WHERE l.played_at >= :start AND l.played_at < :end
+        WITH per_bucket AS (
+          SELECT {bucket_day} AS bucket_day, gd.genre_id, SUM(gd.ms_played) AS ms_played
+          FROM genre_daily gd
+          WHERE gd.day BETWEEN :first_day AND :last_day
+          GROUP BY bucket_day, gd.genre_id
+        )
+        SELECT {_bucket_label(bucket, "p.bucket_day")} AS bucket, g.name AS genre,
+               COALESCE(SUM(p.ms_played),0)/60000.0 AS minutes
+        FROM per_bucket p
+        JOIN genres g ON g.id = p.genre_id
         GROUP BY bucket, g.name
         ORDER BY bucket ASC, minutes DESC
     """
-    return _fetch_df(sql, _range_params(date_range))
+    return _fetch_df("genre_evolution", sql, _range_params(date_range))
 
 
+# Obsession candidates add up the daily rollups, one row per active day, and only the 200 heaviest
+# ids are joined to their names.
 def obsession_candidates_songs(date_range: DateRange) -> pd.DataFrame:
-    return _fetch_df(
+    df = _fetch_df(
+        "obsession_candidates_songs",
         """
-        SELECT
-          t.id,
-          t.name,
-          COUNT(*) AS plays,
-          COALESCE(SUM(l.ms_played),0) AS total_ms,
-          COUNT(DISTINCT date(l.played_at)) AS active_days,
-          MAX(l.played_at) AS last_played
-        FROM listens l
-        JOIN tracks t ON t.id = l.track_id
-        WHERE l.played_at >= :start AND l.played_at < :end
-        GROUP BY t.id, t.name
-        HAVING COUNT(*) > 0
-        ORDER BY total_ms DESC
-        LIMIT 200
+        WITH per_track AS (
+          SELECT track_id, SUM(plays) AS plays, SUM(ms_played) AS total_ms,
+                 COUNT(*) AS active_days, MAX(last_played_at) AS last_played
+          FROM track_daily
+          WHERE day BETWEEN :first_day AND :last_day
+          GROUP BY track_id
+          ORDER BY total_ms DESC
+          LIMIT 200
+        )
+        SELECT t.id, t.name, p.plays, p.total_ms, p.active_days, p.last_played
+        FROM per_track p
+        JOIN tracks t ON t.id = p.track_id
+        ORDER BY p.total_ms DESC
         """,
         _range_params(date_range),
     )
+    return _with_timestamps(df, "last_played")
 
 
 def obsession_candidates_artists(date_range: DateRange) -> pd.DataFrame:
-    return _fetch_df(
+    df = _fetch_df(
+        "obsession_candidates_artists",
         """
-        SELECT
-          a.id,
-          a.name,
-          COUNT(*) AS plays,
-          COALESCE(SUM(l.ms_played),0) AS total_ms,
-          COUNT(DISTINCT date(l.played_at)) AS active_days,
-          MAX(l.played_at) AS last_played
-        FROM listens l
-        JOIN track_artists ta ON ta.track_id = l.track_id
-        JOIN artists a ON a.id = ta.artist_id
-        WHERE l.played_at >= :start AND l.played_at < :end
-        GROUP BY a.id, a.name
-        HAVING COUNT(*) > 0
-        ORDER BY total_ms DESC
-        LIMIT 200
+        WITH per_artist AS (
+          SELECT artist_id, SUM(plays) AS plays, SUM(ms_played) AS total_ms,
+                 COUNT(*) AS active_days, MAX(last_played_at) AS last_played
+          FROM artist_daily
+          WHERE day BETWEEN :first_day AND :last_day
+          GROUP BY artist_id
+          ORDER BY total_ms DESC
+          LIMIT 200
+        )
+        SELECT a.id, a.name, p.plays, p.total_ms, p.active_days, p.last_played
+        FROM per_artist p
+        JOIN artists a ON a.id = p.artist_id
+        ORDER BY p.total_ms DESC
         """,
         _range_params(date_range),
     )
+    return _with_timestamps(df, "last_played")
 
 
 def obsession_candidates_albums(date_range: DateRange) -> pd.DataFrame:
-    return _fetch_df(
+    df = _fetch_df(
+        "obsession_candidates_albums",
         """
-        SELECT
-          al.id,
-          al.name,
-          COUNT(*) AS plays,
-          COALESCE(SUM(l.ms_played),0) AS total_ms,
-          COUNT(DISTINCT date(l.played_at)) AS active_days,
-          MAX(l.played_at) AS last_played
-        FROM listens l
-        JOIN tracks t ON t.id = l.track_id
-        JOIN albums al ON al.id = t.album_id
-        WHERE l.played_at >= :start AND l.played_at < :end
-        GROUP BY al.id, al.name
-        HAVING COUNT(*) > 0
-        ORDER BY total_ms DESC
-        LIMIT 200
+        WITH per_album AS (
+          SELECT album_id, SUM(plays) AS plays, SUM(ms_played) AS total_ms,
+                 COUNT(*) AS active_days, MAX(last_played_at) AS last_played
+          FROM album_daily
+          WHERE day BETWEEN :first_day AND :last_day
+          GROUP BY album_id
+          ORDER BY total_ms DESC
+          LIMIT 200
+        )
+        SELECT al.id, al.name, p.plays, p.total_ms, p.active_days, p.last_played
+        FROM per_album p
+        JOIN albums al ON al.id = p.album_id
+        ORDER BY p.total_ms DESC
         """,
         _range_params(date_range),
     )
+    return _with_timestamps(df, "last_played")
 
 
 def latest_listen() -> dict[str, Any] | None:
+    # Picks the listen off the played_at index first, then resolves its names.
     df = _fetch_df(
+        "latest_listen",
         """
+        WITH latest AS (
+          SELECT track_id, played_at
+          FROM listens
+          ORDER BY played_at DESC
+          LIMIT 1
+        )
         SELECT t.name AS track_name,
                COALESCE(al.name,'') AS album_name,
-               GROUP_CONCAT(ar.name, ', ') AS artists,
+               (
+                 SELECT GROUP_CONCAT(ar.name, ', ')
+                 FROM track_artists ta
+                 JOIN artists ar ON ar.id = ta.artist_id
+                 WHERE ta.track_id = t.id
+               ) AS artists,
                l.played_at
-        FROM listens l
+        FROM latest l
         JOIN tracks t ON t.id = l.track_id
         LEFT JOIN albums al ON al.id = t.album_id
-        LEFT JOIN track_artists ta ON ta.track_id = t.id
-        LEFT JOIN artists ar ON ar.id = ta.artist_id
-        GROUP BY l.id, t.name, al.name, l.played_at
-        ORDER BY l.played_at DESC
-        LIMIT 1
         """,
         {},
     )
     if df.empty:
         return None
-    return df.iloc[0].to_dict()
+    return _with_timestamps(df, "played_at").iloc[0].to_dict()
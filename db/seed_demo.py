@@ -1,13 +1,19 @@
 from __future__ import annotations
 
+import argparse
 import json
-from datetime import UTC, datetime
+from datetime import UTC, date, datetime
 from pathlib import Path
 
-from sqlalchemy import text
-
-from db.repository import refresh_daily_aggregate_for_day
+from db.ingest import ListenRecord, ListenWriter
+from db.repository import refresh_daily_aggregates
 from db.session import SessionLocal
+from db.synthetic_history import (
+    DEFAULT_SEED,
+    generate_history,
+    insert_history,
+    write_history_files,
+)
 
 
 def seed_from_demo_file(path: str = "data/demo_streaming_history.json") -> int:
@@ -16,58 +22,75 @@ def seed_from_demo_file(path: str = "data/demo_streaming_history.json") -> int:
         return 0
 
     items = json.loads(source.read_text(encoding="utf-8"))
-    inserted = 0
 
     with SessionLocal() as session:
+        writer = ListenWriter(session)
         for item in items:
             uri = item.get("spotify_track_uri") or "spotify:track:demo_unknown"
-            track_id = uri.split(":")[-1]
             track_name = item.get("master_metadata_track_name") or "Unknown Track"
             artist_name = item.get("master_metadata_album_artist_name") or "Unknown Artist"
             album_name = item.get("master_metadata_album_album_name") or "Unknown Album"
-
-            session.execute(
-                text("INSERT OR IGNORE INTO albums(id, name) VALUES(:id, :name)"),
-                {"id": f"alb_{album_name}".replace(" ", "_"), "name": album_name},
-            )
-            session.execute(
-                text("INSERT OR IGNORE INTO artists(id, name) VALUES(:id, :name)"),
-                {"id": f"art_{artist_name}".replace(" ", "_"), "name": artist_name},
-            )
-            session.execute(
-                text("INSERT OR IGNORE INTO tracks(id, name, album_id) VALUES(:id, :name, :album_id)"),
-                {
-                    "id": track_id,
-                    "name": track_name,
-                    "album_id": f"alb_{album_name}".replace(" ", "_"),
-                },
+            writer.add(
+                ListenRecord(
+                    played_at=datetime.fromisoformat(
+                        item["ts"].replace("Z", "+00:00")
+                    ).astimezone(UTC),
+                    ms_played=int(item.get("ms_played", 0)),
+                    track_id=uri.split(":")[-1],
+                    track_name=track_name,
+                    album_id=f"alb_{album_name}".replace(" ", "_"),
+                    album_name=album_name,
+                    artist_ids=(f"art_{artist_name}".replace(" ", "_"),),
+                    artist_names=(artist_name,),
+                )
             )
-            session.execute(
-                text("INSERT OR IGNORE INTO track_artists(track_id, artist_id) VALUES(:track_id, :artist_id)"),
-                {"track_id": track_id, "artist_id": f"art_{artist_name}".replace(" ", "_")},
-            )
-            played_at = datetime.fromisoformat(item["ts"].replace("Z", "+00:00")).astimezone(UTC)
-            session.execute(
-                text(
-                    """
-                INSERT OR IGNORE INTO listens(played_at, ms_played, track_id, context_type, context_id, device_name)
-                VALUES(:played_at, :ms_played, :track_id, :context_type, :context_id, :device_name)
-                """
-                ),
-                {
-                    "played_at": played_at,
-                    "ms_played": int(item.get("ms_played", 0)),
-                    "track_id": track_id,
-                    "context_type": None,
-                    "context_id": None,
-                    "device_name": None,
-                },
-            )
-            inserted += 1
+        stats = writer.close()
+        refresh_daily_aggregates(stats.touched_days, session=session)
         session.commit()
 
-    for item in items:
-        day = datetime.fromisoformat(item["ts"].replace("Z", "+00:00")).date()
-        refresh_daily_aggregate_for_day(day)
+    return stats.processed
+
+
+def seed_synthetic_history(
+    listens: int,
+    seed: int = DEFAULT_SEED,
+    json_dir: str | Path | None = None,
+    end: date | None = None,
+    days: int | None = None,
+) -> int:
+    catalog, history = generate_history(listens, seed=seed, end=end, days=days)
+    if json_dir is not None:
+        write_history_files(catalog, history, json_dir)
+        return len(history)
 
+    with SessionLocal() as session:
+        inserted = insert_history(session, catalog, history)
+        session.commit()
     return inserted
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Seed demo listening history.")
+    parser.add_argument(
+        "--listens",
+        type=int,
+        help="generate a synthetic history of this many listens (10k-10M) instead of the demo file",
+    )
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument("--days", type=int, help="history span in days, ending today")
+    parser.add_argument(
+        "--json-dir", help="write Extended Streaming History files here instead of the database"
+    )
+    args = parser.parse_args(argv)
+
+    if args.listens is None:
+        count = seed_from_demo_file()
+    else:
+        count = seed_synthetic_history(
+            args.listens, seed=args.seed, json_dir=args.json_dir, days=args.days
+        )
+    print(f"Seeded {count} listens")
+
+
+if __name__ == "__main__":
+    main()
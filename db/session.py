@@ -5,6 +5,7 @@ import os
 from dotenv import load_dotenv
 from sqlalchemy import event
 from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import NullPool
 
@@ -12,21 +13,28 @@ load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///spotify_stats.db")
 
-is_sqlite = DATABASE_URL.startswith("sqlite")
-connect_args = {"check_same_thread": False, "timeout": 30} if is_sqlite else {}
-engine_kwargs = {"future": True, "pool_pre_ping": True, "connect_args": connect_args}
-if is_sqlite:
-    engine_kwargs["poolclass"] = NullPool
 
-engine = create_engine(DATABASE_URL, **engine_kwargs)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine, future=True)
+def create_db_engine(database_url: str) -> Engine:
+    is_sqlite = database_url.startswith("sqlite")
+    connect_args = {"check_same_thread": False, "timeout": 30} if is_sqlite else {}
+    engine_kwargs = {"future": True, "pool_pre_ping": True, "connect_args": connect_args}
+    if is_sqlite:
+        engine_kwargs["poolclass"] = NullPool
+
+    db_engine = create_engine(database_url, **engine_kwargs)
+
+    if is_sqlite:
+        @event.listens_for(db_engine, "connect")
+        def _apply_sqlite_pragmas(dbapi_connection, _connection_record) -> None:  # type: ignore[no-untyped-def]
+            cursor = dbapi_connection.cursor()
+            cursor.execute("PRAGMA journal_mode=WAL;")
+            cursor.execute("PRAGMA synchronous=NORMAL;")
+            cursor.execute("PRAGMA foreign_keys=ON;")
+            cursor.execute("PRAGMA busy_timeout=30000;")
+            cursor.close()
 
-if is_sqlite:
-    @event.listens_for(engine, "connect")
-    def _apply_sqlite_pragmas(dbapi_connection, _connection_record) -> None:  # type: ignore[no-untyped-def]
-        cursor = dbapi_connection.cursor()
-        cursor.execute("PRAGMA journal_mode=WAL;")
-        cursor.execute("PRAGMA synchronous=NORMAL;")
-        cursor.execute("PRAGMA foreign_keys=ON;")
-        cursor.execute("PRAGMA busy_timeout=30000;")
-        cursor.close()
+    return db_engine
+
+
+engine = create_db_engine(DATABASE_URL)
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine, future=True)
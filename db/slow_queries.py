@@ -0,0 +1,185 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+import queue
+import re
+import threading
+from datetime import UTC, datetime
+from typing import Any
+
+import pandas as pd
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from db.session import SessionLocal
+from db.timestamps import from_epoch_day
+
+logger = logging.getLogger(__name__)
+
+# Queries at or above this many milliseconds are logged with their plan; set SLOW_QUERY_MS=0
+# to capture every query, or a negative value to turn the log off.
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "250"))
+SLOW_QUERY_LOG_SIZE = int(os.getenv("SLOW_QUERY_LOG_SIZE", "500"))
+SLOW_QUERY_QUEUE_SIZE = 100
+SLOW_QUERY_BUSY_MS = 100
+
+_LISTENS_ALIAS = re.compile(r"\blistens\s+(?:AS\s+)?([A-Za-z_]\w*)", re.IGNORECASE)
+_NOT_ALIASES = {"on", "where", "join", "left", "inner", "group", "order", "limit", "using"}
+
+_pending: queue.Queue[tuple[datetime, str, str, dict[str, Any], float]] = queue.Queue(
+    maxsize=SLOW_QUERY_QUEUE_SIZE
+)
+_writer: threading.Thread | None = None
+_writer_lock = threading.Lock()
+
+
+def enabled(seconds: float) -> bool:
+    return SLOW_QUERY_MS >= 0 and seconds * 1000 >= SLOW_QUERY_MS
+
+
+def explain_query_plan(session: Session, sql: str, params: dict[str, Any]) -> list[str]:
+    rows = session.execute(text(f"EXPLAIN QUERY PLAN {sql}"), params).all()
+    depth: dict[int, int] = {0: -1}
+    lines = []
+    for node_id, parent, _unused, detail in rows:
+        depth[node_id] = depth.get(parent, -1) + 1
+        lines.append("  " * depth[node_id] + detail)
+    return lines
+
+
+def scans_listens(sql: str, plan: list[str]) -> bool:
+    # SQLite names the table by its alias in plans, so `FROM listens l` scans show as `SCAN l`.
+    names = {"listens"}
+    names.update(
+        alias for alias in _LISTENS_ALIAS.findall(sql) if alias.lower() not in _NOT_ALIASES
+    )
+    for line in plan:
+        parts = line.split()
+        if len(parts) >= 2 and parts[0] == "SCAN" and parts[1] in names:
+            return True
+    return False
+
+
+def _readable(key: str, value: Any) -> Any:
+    # Range and tier-plan bounds (first_day, year_start_0_first, ...) are epoch day numbers.
+    if isinstance(value, int) and key.endswith(("_first", "_last", "first_day", "last_day")):
+        return from_epoch_day(value).isoformat()
+    return value
+
+
+def _readable_params(params: dict[str, Any]) -> str:
+    # Log day bounds as dates so the range is readable.
+    shown = {key: _readable(key, value) for key, value in params.items()}
+    return json.dumps(shown, default=str, sort_keys=True)
+
+
+def log_slow_query(name: str, sql: str, params: dict[str, Any], seconds: float) -> None:
+    # Runs on the page's query path, so the entry is only queued; EXPLAIN and the insert happen on
+    # the writer thread. When the writer falls behind, entries are dropped instead of waiting.
+    _start_writer()
+    try:
+        _pending.put_nowait((datetime.now(UTC), name, sql, dict(params), seconds))
+    except queue.Full:
+        logger.warning("Slow-query log is backed up; dropped %s", name)
+
+
+def flush() -> None:
+    # Waits until every queued entry has been written or dropped.
+    _pending.join()
+
+
+def _start_writer() -> None:
+    global _writer
+    with _writer_lock:
+        if _writer is None or not _writer.is_alive():
+            _writer = threading.Thread(target=_write_pending, name="slow-query-log", daemon=True)
+            _writer.start()
+
+
+def _write_pending() -> None:
+    while True:
+        entry = _pending.get()
+        try:
+            _write(*entry)
+        finally:
+            _pending.task_done()
+
+
+def _write(
+    recorded_at: datetime, name: str, sql: str, params: dict[str, Any], seconds: float
+) -> None:
+    # The log is best effort; a write that cannot get the database lock quickly is dropped rather
+    # than queueing behind an import.
+    try:
+        with SessionLocal() as session:
+            sqlite = session.get_bind().dialect.name == "sqlite"
+            busy_ms: int | None = None
+            try:
+                if sqlite:
+                    busy_ms = int(session.execute(text("PRAGMA busy_timeout")).scalar_one())
+                    session.execute(text(f"PRAGMA busy_timeout={SLOW_QUERY_BUSY_MS}"))
+                plan = explain_query_plan(session, sql, params) if sqlite else []
+                session.execute(
+                    text(
+                        """
+                        INSERT INTO slow_queries(
+                            recorded_at, query_name, duration_ms, sql_text, params, query_plan,
+                            full_scan
+                        )
+                        VALUES(
+                            :recorded_at, :query_name, :duration_ms, :sql_text, :params, :plan,
+                            :scan
+                        )
+                        """
+                    ),
+                    {
+                        "recorded_at": recorded_at,
+                        "query_name": name,
+                        "duration_ms": round(seconds * 1000, 3),
+                        "sql_text": sql.strip(),
+                        "params": _readable_params(params),
+                        "plan": "\n".join(plan),
+                        "scan": scans_listens(sql, plan),
+                    },
+                )
+                session.execute(
+                    text(
+                        """
+                        DELETE FROM slow_queries
+                        WHERE id <= (SELECT MAX(id) FROM slow_queries) - :keep
+                        """
+                    ),
+                    {"keep": SLOW_QUERY_LOG_SIZE},
+                )
+                session.commit()
+            finally:
+                if busy_ms is not None:
+                    session.rollback()
+                    session.execute(text(f"PRAGMA busy_timeout={busy_ms}"))
+    except Exception:  # noqa: BLE001
+        logger.warning("Could not record slow query %s", name, exc_info=True)
+
+
+def recent_slow_queries(limit: int = 100) -> pd.DataFrame:
+    with SessionLocal() as session:
+        conn = session.connection()
+        return pd.read_sql_query(
+            text(
+                """
+                SELECT recorded_at, query_name, duration_ms, full_scan, params, query_plan, sql_text
+                FROM slow_queries
+                ORDER BY id DESC
+                LIMIT :limit
+                """
+            ),
+            conn,
+            params={"limit": limit},
+        )
+
+
+def clear_slow_queries() -> None:
+    with SessionLocal() as session:
+        session.execute(text("DELETE FROM slow_queries"))
+        session.commit()
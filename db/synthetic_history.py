@@ -0,0 +1,382 @@
+from __future__ import annotations
+
+import json
+from collections import Counter
+from dataclasses import dataclass
+from datetime import UTC, date, datetime, timedelta
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+from sqlalchemy import text
+
+from db.repository import refresh_daily_aggregates
+
+DEFAULT_SEED = 42
+ZIPF_EXPONENT = 1.07
+MULTI_ARTIST_SHARE = 0.15
+SKIP_SHARE = 0.22
+TRACKS_PER_ALBUM = 10
+ITEMS_PER_FILE = 15_000
+INSERT_BATCH = 50_000
+MAX_DAYS = 3650
+
+GENRES = (
+    "pop",
+    "rock",
+    "hip hop",
+    "indie",
+    "electronic",
+    "house",
+    "techno",
+    "r&b",
+    "soul",
+    "jazz",
+    "classical",
+    "metal",
+    "punk",
+    "folk",
+    "country",
+    "reggae",
+    "latin",
+    "k-pop",
+    "ambient",
+    "lo-fi",
+    "drum and bass",
+    "dubstep",
+    "trap",
+    "blues",
+    "funk",
+    "disco",
+    "synthwave",
+    "shoegaze",
+    "afrobeats",
+    "singer-songwriter",
+)
+
+_ADJECTIVES = (
+    "Golden", "Velvet", "Electric", "Silent", "Neon", "Wild", "Paper", "Crystal", "Midnight",
+    "Broken", "Lucky", "Hollow", "Burning", "Frozen", "Secret", "Lonely", "Bright", "Northern",
+    "Restless", "Gentle", "Violet", "Distant", "Savage", "Honey", "Glass", "Crimson", "Quiet",
+    "Faded", "Endless", "Silver",
+)
+_NOUNS = (
+    "Foxes", "Harbor", "Satellite", "Garden", "Echo", "Avenue", "Tides", "Lanterns", "Rivers",
+    "Machines", "Summer", "Ghosts", "Wolves", "Skyline", "Mirrors", "Dreams", "Comets", "Parade",
+    "Signal", "Horizon", "Engines", "Letters", "Islands", "Static", "Orchard", "Cathedral",
+    "Runaways", "Weather", "Motel", "Hearts",
+)
+
+# Relative listening weight per UTC hour, workdays and weekends.
+_WORKDAY_HOURS = (
+    0.6, 0.3, 0.15, 0.1, 0.1, 0.2, 0.6, 1.4, 2.0, 1.8, 1.5, 1.4,
+    1.6, 1.5, 1.4, 1.5, 1.7, 2.0, 2.2, 2.1, 1.9, 1.7, 1.3, 0.9,
+)
+_WEEKEND_HOURS = (
+    1.0, 0.7, 0.4, 0.25, 0.15, 0.1, 0.15, 0.3, 0.6, 1.0, 1.4, 1.7,
+    1.8, 1.8, 1.7, 1.7, 1.7, 1.8, 1.9, 2.0, 2.0, 1.9, 1.6, 1.3,
+)
+_WEEKDAY_WEIGHTS = (0.95, 0.95, 1.0, 1.0, 1.1, 1.3, 1.2)
+
+
+@dataclass(frozen=True)
+class SyntheticCatalog:
+    artist_ids: list[str]
+    artist_names: list[str]
+    artist_genres: list[tuple[int, ...]]
+    album_ids: list[str]
+    album_names: list[str]
+    track_ids: list[str]
+    track_names: list[str]
+    track_albums: np.ndarray
+    track_artists: list[tuple[int, ...]]
+    track_durations: np.ndarray
+
+
+@dataclass(frozen=True)
+class SyntheticListens:
+    played_at: np.ndarray
+    tracks: np.ndarray
+    ms_played: np.ndarray
+    skipped: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.played_at)
+
+
+def default_track_count(listens: int) -> int:
+    return int(min(max(listens // 25, 200), 250_000))
+
+
+def default_days(listens: int) -> int:
+    return int(min(max(listens // 40, 30), MAX_DAYS))
+
+
+def generate_history(
+    listens: int,
+    seed: int = DEFAULT_SEED,
+    end: date | None = None,
+    days: int | None = None,
+    tracks: int | None = None,
+) -> tuple[SyntheticCatalog, SyntheticListens]:
+    # The same seed, size and end date always produce the same catalog and listens.
+    rng = np.random.default_rng(seed)
+    catalog = build_catalog(rng, tracks or default_track_count(listens))
+    end = end or datetime.now(UTC).date()
+    start = end - timedelta(days=(days or default_days(listens)) - 1)
+    return catalog, generate_listens(rng, catalog, listens, start, end)
+
+
+def build_catalog(rng: np.random.Generator, track_count: int) -> SyntheticCatalog:
+    artist_count = max(20, track_count // 6)
+    artist_names = _unique_names(rng, artist_count)
+    artist_genres = [
+        tuple(sorted(set(_zipf_sample(rng, len(GENRES), int(rng.integers(1, 4))).tolist())))
+        for _ in range(artist_count)
+    ]
+
+    primary = _zipf_sample(rng, artist_count, track_count)
+    track_artists: list[tuple[int, ...]] = []
+    for artist in primary.tolist():
+        artists = [artist]
+        if rng.random() < MULTI_ARTIST_SHARE:
+            featured = _zipf_sample(rng, artist_count, 1 + int(rng.random() < 0.25)).tolist()
+            artists.extend(other for other in featured if other not in artists)
+        track_artists.append(tuple(artists))
+
+    # Albums belong to the primary artist and fill up in release order.
+    per_artist: Counter[int] = Counter()
+    album_keys: dict[tuple[int, int], int] = {}
+    track_albums = np.empty(track_count, dtype=np.int64)
+    for track, artist in enumerate(primary.tolist()):
+        key = (artist, per_artist[artist] // TRACKS_PER_ALBUM)
+        per_artist[artist] += 1
+        track_albums[track] = album_keys.setdefault(key, len(album_keys))
+
+    durations = rng.normal(210_000, 50_000, track_count).clip(45_000, 600_000).astype(np.int64)
+    return SyntheticCatalog(
+        artist_ids=[f"synth_art_{idx:06d}" for idx in range(artist_count)],
+        artist_names=artist_names,
+        artist_genres=artist_genres,
+        album_ids=[f"synth_alb_{idx:06d}" for idx in range(len(album_keys))],
+        album_names=_unique_names(rng, len(album_keys)),
+        track_ids=[f"synth_trk_{idx:07d}" for idx in range(track_count)],
+        track_names=_unique_names(rng, track_count),
+        track_albums=track_albums,
+        track_artists=track_artists,
+        track_durations=durations,
+    )
+
+
+def generate_listens(
+    rng: np.random.Generator, catalog: SyntheticCatalog, listens: int, start: date, end: date
+) -> SyntheticListens:
+    day_count = (end - start).days + 1
+    day_offsets = np.arange(day_count)
+    weekdays = (start.weekday() + day_offsets) % 7
+    day_of_year = np.array(
+        [(start + timedelta(days=int(offset))).timetuple().tm_yday for offset in day_offsets]
+    )
+    # Listening grows over the years, peaks on weekends and around the December holidays.
+    day_weights = (
+        np.linspace(0.6, 1.0, day_count)
+        * np.asarray(_WEEKDAY_WEIGHTS)[weekdays]
+        * (1 + 0.12 * np.cos(2 * np.pi * (day_of_year - 355) / 365.25))
+    )
+    days = _weighted_sample(rng, day_weights, listens)
+    weekend = weekdays[days] >= 5
+
+    hours = np.empty(listens, dtype=np.int64)
+    hours[~weekend] = _weighted_sample(rng, np.asarray(_WORKDAY_HOURS), int((~weekend).sum()))
+    hours[weekend] = _weighted_sample(rng, np.asarray(_WEEKEND_HOURS), int(weekend.sum()))
+
+    start_epoch = int(datetime.combine(start, datetime.min.time(), tzinfo=UTC).timestamp())
+    played_at = start_epoch + days * 86_400 + hours * 3_600 + rng.integers(0, 3_600, listens)
+    order = np.argsort(played_at, kind="stable")
+
+    tracks = _zipf_sample(rng, len(catalog.track_ids), listens)
+    durations = catalog.track_durations[tracks]
+    skipped = rng.random(listens) < SKIP_SHARE
+    ms_played = np.where(
+        skipped, (durations * rng.uniform(0.01, 0.6, listens)).astype(np.int64), durations
+    )
+    return SyntheticListens(
+        played_at=played_at[order],
+        tracks=tracks[order],
+        ms_played=ms_played[order],
+        skipped=skipped[order],
+    )
+
+
+def write_history_files(
+    catalog: SyntheticCatalog, history: SyntheticListens, directory: str | Path
+) -> list[Path]:
+    # Extended Streaming History only names the album artist, so featured artists and genres
+    # are lost on this path; insert_history keeps them.
+    target = Path(directory)
+    target.mkdir(parents=True, exist_ok=True)
+    paths: list[Path] = []
+    for number, offset in enumerate(range(0, len(history), ITEMS_PER_FILE)):
+        window = slice(offset, offset + ITEMS_PER_FILE)
+        stamps = np.datetime_as_string(history.played_at[window].astype("datetime64[s]"), "s")
+        items = [
+            {
+                "ts": f"{stamp}Z",
+                "platform": "android" if track % 3 else "osx",
+                "ms_played": ms_played,
+                "conn_country": "DE",
+                "master_metadata_track_name": catalog.track_names[track],
+                "master_metadata_album_artist_name": catalog.artist_names[
+                    catalog.track_artists[track][0]
+                ],
+                "master_metadata_album_album_name": catalog.album_names[
+                    catalog.track_albums[track]
+                ],
+                "spotify_track_uri": f"spotify:track:{catalog.track_ids[track]}",
+                "episode_name": None,
+                "spotify_episode_uri": None,
+                "reason_start": "clickrow" if skipped else "trackdone",
+                "reason_end": "fwdbtn" if skipped else "trackdone",
+                "shuffle": False,
+                "skipped": skipped,
+                "offline": False,
+                "incognito_mode": False,
+            }
+            for stamp, track, ms_played, skipped in zip(
+                stamps.tolist(),
+                history.tracks[window].tolist(),
+                history.ms_played[window].tolist(),
+                history.skipped[window].tolist(),
+                strict=True,
+            )
+        ]
+        years = f"{items[0]['ts'][:4]}-{items[-1]['ts'][:4]}"
+        path = target / f"Streaming_History_Audio_{years}_{number}.json"
+        path.write_text(json.dumps(items, ensure_ascii=False), encoding="utf-8")
+        paths.append(path)
+    return paths
+
+
+def insert_history(session: Any, catalog: SyntheticCatalog, history: SyntheticListens) -> int:
+    # Bulk path for query benchmarks: skips dedupe staging and writes dimensions, genres and
+    # listens directly, then refreshes the aggregates of every generated day.
+    _executemany(
+        session,
+        "INSERT INTO artists(id, name) VALUES(:id, :name) ON CONFLICT(id) DO NOTHING",
+        [
+            {"id": artist_id, "name": name}
+            for artist_id, name in zip(catalog.artist_ids, catalog.artist_names, strict=True)
+        ],
+    )
+    _executemany(
+        session,
+        "INSERT INTO albums(id, name) VALUES(:id, :name) ON CONFLICT(id) DO NOTHING",
+        [
+            {"id": album_id, "name": name}
+            for album_id, name in zip(catalog.album_ids, catalog.album_names, strict=True)
+        ],
+    )
+    _executemany(
+        session,
+        """
+        INSERT INTO tracks(id, name, album_id, duration_ms)
+        VALUES(:id, :name, :album_id, :duration_ms)
+        ON CONFLICT(id) DO NOTHING
+        """,
+        [
+            {
+                "id": catalog.track_ids[idx],
+                "name": catalog.track_names[idx],
+                "album_id": catalog.album_ids[album],
+                "duration_ms": duration,
+            }
+            for idx, (album, duration) in enumerate(
+                zip(catalog.track_albums.tolist(), catalog.track_durations.tolist(), strict=True)
+            )
+        ],
+    )
+    _executemany(
+        session,
+        """
+        INSERT INTO track_artists(track_id, artist_id) VALUES(:track_id, :artist_id)
+        ON CONFLICT(track_id, artist_id) DO NOTHING
+        """,
+        [
+            {"track_id": catalog.track_ids[track], "artist_id": catalog.artist_ids[artist]}
+            for track, artists in enumerate(catalog.track_artists)
+            for artist in artists
+        ],
+    )
+    _executemany(
+        session,
+        "INSERT INTO genres(name) VALUES(:name) ON CONFLICT(name) DO NOTHING",
+        [{"name": name} for name in GENRES],
+    )
+    genre_rows = session.execute(text("SELECT name, id FROM genres"))
+    genre_ids = {name: genre_id for name, genre_id in genre_rows}
+    _executemany(
+        session,
+        """
+        INSERT INTO artist_genres(artist_id, genre_id) VALUES(:artist_id, :genre_id)
+        ON CONFLICT(artist_id, genre_id) DO NOTHING
+        """,
+        [
+            {"artist_id": catalog.artist_ids[artist], "genre_id": genre_ids[GENRES[genre]]}
+            for artist, genres in enumerate(catalog.artist_genres)
+            for genre in genres
+        ],
+    )
+
+    # Listens go through the DBAPI cursor with positional rows; at 10M rows SQLAlchemy's
+    # per-row parameter processing costs about as much as SQLite itself.
+    connection = session.connection()
+    inserted = 0
+    for offset in range(0, len(history), INSERT_BATCH):
+        window = slice(offset, offset + INSERT_BATCH)
+        result = connection.exec_driver_sql(
+            """
+            INSERT INTO listens(played_at, ms_played, track_id) VALUES(?, ?, ?)
+            ON CONFLICT(played_at, track_id, ms_played) DO NOTHING
+            """,
+            [
+                (played_at * 1000, ms_played, catalog.track_ids[track])
+                for played_at, ms_played, track in zip(
+                    history.played_at[window].tolist(),
+                    history.ms_played[window].tolist(),
+                    history.tracks[window].tolist(),
+                    strict=True,
+                )
+            ],
+        )
+        inserted += max(result.rowcount or 0, 0)
+
+    days = np.unique(history.played_at // 86_400).tolist()
+    refresh_daily_aggregates(
+        [date(1970, 1, 1) + timedelta(days=day) for day in days], session=session
+    )
+    return inserted
+
+
+def _zipf_sample(rng: np.random.Generator, population: int, size: int) -> np.ndarray:
+    return _weighted_sample(rng, 1.0 / np.arange(1, population + 1) ** ZIPF_EXPONENT, size)
+
+
+def _weighted_sample(rng: np.random.Generator, weights: np.ndarray, size: int) -> np.ndarray:
+    cdf = np.cumsum(weights)
+    return np.searchsorted(cdf, rng.random(size) * cdf[-1], side="right").clip(max=len(cdf) - 1)
+
+
+def _unique_names(rng: np.random.Generator, count: int) -> list[str]:
+    combos = len(_ADJECTIVES) * len(_NOUNS)
+    names = []
+    for idx in rng.permutation(count).tolist():
+        adjective = _ADJECTIVES[idx % len(_ADJECTIVES)]
+        noun = _NOUNS[(idx // len(_ADJECTIVES)) % len(_NOUNS)]
+        suffix = f" {idx // combos + 1}" if idx >= combos else ""
+        names.append(f"{adjective} {noun}{suffix}")
+    return names
+
+
+def _executemany(session: Any, sql: str, rows: list[dict[str, Any]]) -> None:
+    for offset in range(0, len(rows), INSERT_BATCH):
+        session.execute(text(sql), rows[offset : offset + INSERT_BATCH])
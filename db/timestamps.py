@@ -0,0 +1,34 @@
+from __future__ import annotations
+
+from datetime import UTC, date, datetime, timedelta
+
+# listens.played_at is stored as integer milliseconds since the Unix epoch, UTC.
+MS_PER_HOUR = 3_600_000
+MS_PER_DAY = 86_400_000
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=UTC)
+_EPOCH_ORDINAL = _EPOCH.date().toordinal()
+_ONE_MS = timedelta(milliseconds=1)
+
+
+def epoch_ms(value: datetime) -> int:
+    # Naive datetimes are UTC, matching how date-range bounds have always been compared.
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=UTC)
+    return (value - _EPOCH) // _ONE_MS
+
+
+def from_epoch_ms(value: int) -> datetime:
+    return _EPOCH + timedelta(milliseconds=value)
+
+
+def epoch_day(value: date) -> int:
+    return value.toordinal() - _EPOCH_ORDINAL
+
+
+def from_epoch_day(value: int) -> date:
+    return date.fromordinal(value + _EPOCH_ORDINAL)
+
+
+def day_start_ms(value: date) -> int:
+    return epoch_day(value) * MS_PER_DAY
@@ -8,21 +8,28 @@ from reportlab.lib.styles import getSampleStyleSheet
 from reportlab.platypus import SimpleDocTemplate, Spacer, Paragraph, Table, TableStyle
 
 from analytics.date_ranges import DateRange
-from db.repository import top_albums, top_artists, top_genres, top_songs
+from db.repository import (
+    Pagination,
+    get_kpis,
+    top_albums,
+    top_artists,
+    top_genres,
+    top_songs,
+)
 
 
 def _table_for_entity(entity: str, date_range: DateRange) -> tuple[list[str], list[list[str]]]:
     if entity == "songs":
-        df = top_songs(date_range).head(20)
+        df = top_songs(date_range, pagination=Pagination(limit=20))
         cols = ["name", "artists", "plays", "minutes"]
     elif entity == "artists":
-        df = top_artists(date_range).head(20)
+        df = top_artists(date_range, pagination=Pagination(limit=20))
         cols = ["name", "plays", "minutes"]
     elif entity == "albums":
-        df = top_albums(date_range).head(20)
+        df = top_albums(date_range, pagination=Pagination(limit=20))
         cols = ["name", "plays", "minutes"]
     elif entity == "genres":
-        df = top_genres(date_range).head(20)
+        df = top_genres(date_range, pagination=Pagination(limit=20))
         cols = ["name", "plays", "minutes"]
     else:
         raise ValueError(f"Unsupported entity for PDF export: {entity}")
@@ -42,6 +49,15 @@ def export_rankings_pdf(entity: str, date_range: DateRange) -> bytes:
         styles["Normal"],
     )
 
+    # Exports report exact unique counts rather than the dashboard's sketch estimates.
+    kpis = get_kpis(date_range, exact=True)
+    summary = Paragraph(
+        f"{kpis['plays']} plays, {kpis['total_minutes'] / 60:.1f} hours, "
+        f"{kpis['unique_songs']} songs, {kpis['unique_artists']} artists, "
+        f"{kpis['unique_albums']} albums",
+        styles["Normal"],
+    )
+
     cols, rows = _table_for_entity(entity, date_range)
     data = [cols] + rows if rows else [cols, ["No data", "", "", ""][: len(cols)]]
     table = Table(data, hAlign="LEFT")
@@ -56,7 +72,7 @@ def export_rankings_pdf(entity: str, date_range: DateRange) -> bytes:
         )
     )
 
-    story = [title, Spacer(1, 8), subtitle, Spacer(1, 12), table]
+    story = [title, Spacer(1, 8), subtitle, summary, Spacer(1, 12), table]
     doc.build(story)
     buffer.seek(0)
     return buffer.read()
@@ -0,0 +1,141 @@
+from __future__ import annotations
+
+import codecs
+import hashlib
+import json
+import zipfile
+from collections.abc import Iterator
+from dataclasses import dataclass
+from pathlib import Path, PurePosixPath
+from typing import IO, Any
+
+CHUNK_SIZE = 1 << 16
+AUDIO_HISTORY_PREFIX = "Streaming_History_Audio_"
+VIDEO_HISTORY_PREFIX = "Streaming_History_Video_"
+
+
+@dataclass(frozen=True)
+class ZipMember:
+    archive: str | Path | IO[bytes]
+    member: str
+
+    @property
+    def name(self) -> str:
+        return PurePosixPath(self.member).name
+
+
+HistorySource = str | Path | IO[bytes] | ZipMember
+
+_DECODER = json.JSONDecoder()
+_WHITESPACE = " \t\n\r"
+
+
+def iter_history_items(
+    source: HistorySource, chunk_size: int = CHUNK_SIZE
+) -> Iterator[dict[str, Any]]:
+    if isinstance(source, ZipMember):
+        with zipfile.ZipFile(source.archive) as archive, archive.open(source.member) as handle:
+            yield from _iter_json_array(handle, chunk_size)
+    elif isinstance(source, (str, Path)):
+        with open(source, "rb") as handle:
+            yield from _iter_json_array(handle, chunk_size)
+    else:
+        yield from _iter_json_array(source, chunk_size)
+
+
+def content_hash(source: HistorySource, chunk_size: int = CHUNK_SIZE) -> str:
+    digest = hashlib.sha256()
+    if isinstance(source, ZipMember):
+        with zipfile.ZipFile(source.archive) as archive, archive.open(source.member) as handle:
+            _update_digest(digest, handle, chunk_size)
+    elif isinstance(source, (str, Path)):
+        with open(source, "rb") as handle:
+            _update_digest(digest, handle, chunk_size)
+    else:
+        start = source.tell()
+        _update_digest(digest, source, chunk_size)
+        source.seek(start)
+    return digest.hexdigest()
+
+
+def _update_digest(digest: Any, handle: IO[bytes], chunk_size: int) -> None:
+    while chunk := handle.read(chunk_size):
+        digest.update(chunk)
+
+
+def history_zip_members(
+    archive: str | Path | IO[bytes], include_video: bool = False
+) -> list[ZipMember]:
+    prefixes = (AUDIO_HISTORY_PREFIX,)
+    if include_video:
+        prefixes += (VIDEO_HISTORY_PREFIX,)
+    with zipfile.ZipFile(archive) as handle:
+        names = [
+            info.filename
+            for info in handle.infolist()
+            if not info.is_dir()
+            and PurePosixPath(info.filename).name.startswith(prefixes)
+            and info.filename.endswith(".json")
+        ]
+    return [ZipMember(archive=archive, member=name) for name in sorted(names)]
+
+
+def _iter_json_array(handle: IO[bytes], chunk_size: int) -> Iterator[dict[str, Any]]:
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    buffer = ""
+    pos = 0
+    eof = False
+
+    def fill() -> bool:
+        nonlocal buffer, pos, eof
+        if eof:
+            return False
+        chunk = handle.read(chunk_size)
+        if not chunk:
+            eof = True
+            buffer = buffer[pos:] + decoder.decode(b"", final=True)
+        else:
+            buffer = buffer[pos:] + decoder.decode(chunk)
+        pos = 0
+        return True
+
+    def skip_whitespace() -> bool:
+        nonlocal pos
+        while True:
+            while pos < len(buffer) and buffer[pos] in _WHITESPACE:
+                pos += 1
+            if pos < len(buffer):
+                return True
+            if not fill():
+                return False
+
+    if not skip_whitespace() or buffer[pos] != "[":
+        return
+    pos += 1
+
+    expect_item = True
+    while skip_whitespace():
+        char = buffer[pos]
+        if char == "]":
+            return
+        if char == "," and not expect_item:
+            pos += 1
+            expect_item = True
+            continue
+
+        try:
+            item, end = _DECODER.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            if fill():
+                continue
+            raise
+        if end == len(buffer) and fill():
+            # A scalar may have been cut at the chunk boundary; decode it again with more input.
+            continue
+
+        pos = end
+        expect_item = False
+        if isinstance(item, dict):
+            yield item
+
+    raise json.JSONDecodeError("Unterminated history array", buffer, pos)
@@ -0,0 +1,134 @@
+from __future__ import annotations
+
+import multiprocessing
+import os
+import queue as queue_module
+from collections import deque
+from collections.abc import Iterator
+from pathlib import Path
+from typing import Any
+
+from db.ingest import ListenRecord
+from spotify.history import HistorySource, ZipMember
+from spotify.normalize import iter_history_record_chunks
+
+QUEUE_CHUNKS_PER_WORKER = 4
+POLL_SECONDS = 1.0
+
+ParsedChunk = tuple[int, list[ListenRecord]]
+
+
+def default_workers(source_count: int) -> int:
+    return max(1, min(source_count, os.cpu_count() or 1))
+
+
+def source_name(source: HistorySource, index: int) -> str:
+    if isinstance(source, (str, Path)):
+        return Path(source).name
+    return str(getattr(source, "name", "") or f"file {index + 1}")
+
+
+def iter_parsed_chunks(
+    sources: list[HistorySource],
+    workers: int | None = None,
+    include_podcasts: bool = True,
+    skip_items: list[int] | None = None,
+) -> Iterator[tuple[int, ParsedChunk | None]]:
+    # Yields (source_index, (items, records)) per parsed chunk, then (source_index, None) when
+    # the source is done.
+    skips = skip_items or [0] * len(sources)
+    workers = default_workers(len(sources)) if workers is None else workers
+    # Only sources a worker can open by path go to the pool. Uploads and members of uploaded
+    # archives are parsed here in the writer process, straight from memory, while the pool runs.
+    pooled = [index for index, source in enumerate(sources) if _path_backed(source)]
+    if workers <= 1 or len(pooled) <= 1:
+        for index, source in enumerate(sources):
+            yield from _iter_source(index, source, include_podcasts, skips[index])
+        return
+
+    # Spawned workers do not inherit the Streamlit server's threads or open SQLite handles. Each
+    # source gets its own process so a crashed parser shows up as a dead process instead of a
+    # task that never completes.
+    context = multiprocessing.get_context("spawn")
+    queue = context.Queue(maxsize=workers * QUEUE_CHUNKS_PER_WORKER)
+    pending = deque(pooled)
+    running: dict[int, Any] = {}
+
+    def dispatch() -> None:
+        # Sources are handed out one per free worker.
+        while pending and len(running) < workers:
+            index = pending.popleft()
+            source = sources[index]
+            path = source if isinstance(source, ZipMember) else str(source)
+            process = context.Process(
+                target=_parse_into_queue,
+                args=(queue, index, path, include_podcasts, skips[index]),
+                daemon=True,
+            )
+            process.start()
+            running[index] = process
+
+    def collected(wait: bool) -> Iterator[tuple[int, ParsedChunk | None]]:
+        while running:
+            try:
+                index, payload = queue.get(timeout=POLL_SECONDS) if wait else queue.get_nowait()
+            except queue_module.Empty:
+                for index, process in running.items():
+                    if not process.is_alive() and process.exitcode != 0:
+                        raise RuntimeError(
+                            f"History parser for {source_name(sources[index], index)} "
+                            f"exited with code {process.exitcode}"
+                        ) from None
+                if not wait:
+                    return
+                continue
+            if isinstance(payload, BaseException):
+                raise payload
+            if payload is None:
+                running.pop(index).join()
+                dispatch()
+            yield index, payload
+
+    try:
+        dispatch()
+        for index, source in enumerate(sources):
+            if _path_backed(source):
+                continue
+            for item in _iter_source(index, source, include_podcasts, skips[index]):
+                yield item
+                yield from collected(wait=False)
+        yield from collected(wait=True)
+    finally:
+        for process in running.values():
+            process.terminate()
+            process.join()
+
+
+def _path_backed(source: HistorySource) -> bool:
+    if isinstance(source, ZipMember):
+        return isinstance(source.archive, (str, Path))
+    return isinstance(source, (str, Path))
+
+
+def _iter_source(
+    index: int, source: HistorySource, include_podcasts: bool, skip_items: int
+) -> Iterator[tuple[int, ParsedChunk | None]]:
+    for chunk in iter_history_record_chunks(
+        source, include_podcasts=include_podcasts, skip_items=skip_items
+    ):
+        yield index, chunk
+    yield index, None
+
+
+def _parse_into_queue(
+    queue: Any, index: int, source: str | ZipMember, include_podcasts: bool, skip_items: int
+) -> None:
+    try:
+        for chunk in iter_history_record_chunks(
+            source, include_podcasts=include_podcasts, skip_items=skip_items
+        ):
+            queue.put((index, chunk))
+    except Exception as exc:  # noqa: BLE001
+        queue.put((index, exc))
+        return
+    queue.put((index, None))
@@ -1,21 +1,161 @@
 from __future__ import annotations
 
+import threading
+import time
+from collections.abc import Iterable
+from concurrent.futures import ThreadPoolExecutor
+from datetime import UTC, datetime, timedelta
 from typing import Any
 
 from spotipy.exceptions import SpotifyException
+from sqlalchemy import text
 
+from db.session import SessionLocal
 from spotify.client import get_spotify_client
 
+ResolutionKey = tuple[str, str]
+
+RESOLUTION_TTL = timedelta(days=180)
+NEGATIVE_RESOLUTION_TTL = timedelta(days=14)
+MAX_CONCURRENT_LOOKUPS = 4
+MAX_LOOKUPS_PER_SECOND = 8.0
+_KEYS_PER_QUERY = 400
+
 
 def search_track_id(track_name: str, artist_name: str, client: Any | None = None) -> str | None:
-    query = f"track:{track_name} artist:{artist_name}"
     try:
         spotify_client = client or get_spotify_client()
-        result = spotify_client.search(q=query, type="track", limit=1)
+        return _search_track_id(spotify_client, track_name, artist_name)
     except (SpotifyException, RuntimeError):
         return None
 
+
+def _search_track_id(client: Any, track_name: str, artist_name: str) -> str | None:
+    query = f"track:{track_name} artist:{artist_name}"
+    result = client.search(q=query, type="track", limit=1)
     items: list[dict[str, Any]] = result.get("tracks", {}).get("items", [])
     if not items:
         return None
     return items[0].get("id")
+
+
+def resolution_key(track_name: str, artist_name: str) -> ResolutionKey:
+    return " ".join(track_name.casefold().split()), " ".join(artist_name.casefold().split())
+
+
+class _RateLimiter:
+    def __init__(self, per_second: float) -> None:
+        self.interval = 1.0 / per_second if per_second > 0 else 0.0
+        self._lock = threading.Lock()
+        self._next_at = 0.0
+
+    def wait(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            start_at = max(now, self._next_at)
+            self._next_at = start_at + self.interval
+        if start_at > now:
+            time.sleep(start_at - now)
+
+
+def resolve_track_ids(
+    pairs: Iterable[tuple[str, str]],
+    client: Any | None = None,
+    session: Any | None = None,
+    max_workers: int = MAX_CONCURRENT_LOOKUPS,
+    per_second: float = MAX_LOOKUPS_PER_SECOND,
+) -> dict[ResolutionKey, str | None]:
+    if session is None:
+        with SessionLocal() as own_session:
+            result = resolve_track_ids(
+                pairs,
+                client=client,
+                session=own_session,
+                max_workers=max_workers,
+                per_second=per_second,
+            )
+            own_session.commit()
+        return result
+
+    names_by_key: dict[ResolutionKey, tuple[str, str]] = {}
+    for track_name, artist_name in pairs:
+        names_by_key.setdefault(resolution_key(track_name, artist_name), (track_name, artist_name))
+    if not names_by_key:
+        return {}
+
+    resolved = _load_cached_resolutions(session, list(names_by_key))
+    missing = [key for key in names_by_key if key not in resolved]
+    if missing and client is not None:
+        limiter = _RateLimiter(per_second)
+
+        def lookup(key: ResolutionKey) -> tuple[ResolutionKey, str | None, bool]:
+            limiter.wait()
+            try:
+                return key, _search_track_id(client, *names_by_key[key]), True
+            except SpotifyException:
+                # Failed lookups are retried on the next import instead of being cached as misses.
+                return key, None, False
+
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+            results = list(executor.map(lookup, missing))
+        looked_up = [(key, track_id) for key, track_id, ok in results if ok]
+        _store_resolutions(session, looked_up)
+        resolved.update(looked_up)
+
+    return {key: resolved.get(key) for key in names_by_key}
+
+
+def _load_cached_resolutions(
+    session: Any, keys: list[ResolutionKey]
+) -> dict[ResolutionKey, str | None]:
+    now = datetime.now(UTC)
+    found: dict[ResolutionKey, str | None] = {}
+    for offset in range(0, len(keys), _KEYS_PER_QUERY):
+        batch = keys[offset : offset + _KEYS_PER_QUERY]
+        params: dict[str, Any] = {
+            "positive_after": now - RESOLUTION_TTL,
+            "negative_after": now - NEGATIVE_RESOLUTION_TTL,
+        }
+        values = []
+        for idx, (track_key, artist_key) in enumerate(batch):
+            params[f"t{idx}"] = track_key
+            params[f"a{idx}"] = artist_key
+            values.append(f"(:t{idx}, :a{idx})")
+        rows = session.execute(
+            text(
+                f"""
+                SELECT track_key, artist_key, track_id
+                FROM track_resolutions
+                WHERE (track_key, artist_key) IN (VALUES {", ".join(values)})
+                  AND (
+                    (track_id IS NOT NULL AND resolved_at >= :positive_after)
+                    OR (track_id IS NULL AND resolved_at >= :negative_after)
+                  )
+                """
+            ),
+            params,
+        )
+        for track_key, artist_key, track_id in rows:
+            found[(track_key, artist_key)] = track_id
+    return found
+
+
+def _store_resolutions(session: Any, resolutions: list[tuple[ResolutionKey, str | None]]) -> None:
+    if not resolutions:
+        return
+    now = datetime.now(UTC)
+    session.execute(
+        text(
+            """
+            INSERT INTO track_resolutions(track_key, artist_key, track_id, resolved_at)
+            VALUES(:track_key, :artist_key, :track_id, :resolved_at)
+            ON CONFLICT(track_key, artist_key) DO UPDATE SET
+                track_id=excluded.track_id,
+                resolved_at=excluded.resolved_at
+            """
+        ),
+        [
+            {"track_key": key[0], "artist_key": key[1], "track_id": track_id, "resolved_at": now}
+            for key, track_id in resolutions
+        ],
+    )
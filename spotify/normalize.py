@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+import hashlib
+from collections.abc import Iterator
+from datetime import UTC, datetime
+from functools import lru_cache
+from itertools import islice
+from typing import Any
+
+from db.ingest import ListenRecord
+from spotify.history import HistorySource, iter_history_items
+
+SYNTHETIC_TRACK_PREFIX = "local_"
+CHUNK_ROWS = 2000
+NAME_ID_CACHE_SIZE = 1 << 16
+
+
+@lru_cache(maxsize=NAME_ID_CACHE_SIZE)
+def synthetic_track_id(track_name: str, artist_name: str, album_name: str) -> str:
+    value = f"{track_name}|{artist_name}|{album_name}"
+    digest = hashlib.sha1(value.encode("utf-8")).hexdigest()
+    return f"{SYNTHETIC_TRACK_PREFIX}{digest[:20]}"
+
+
+def is_unresolved(record: ListenRecord) -> bool:
+    return record.track_id.startswith(SYNTHETIC_TRACK_PREFIX)
+
+
+def recently_played_record(item: dict[str, Any]) -> ListenRecord | None:
+    track = item.get("track") or {}
+    played_at_raw = item.get("played_at")
+    if not played_at_raw:
+        return None
+
+    played_at = datetime.fromisoformat(played_at_raw.replace("Z", "+00:00")).astimezone(UTC)
+    track_id = track.get("id")
+    if not track_id:
+        return None
+
+    album = track.get("album") or {}
+    artists = track.get("artists") or []
+    context = item.get("context") or {}
+    return ListenRecord(
+        played_at=played_at,
+        ms_played=int(track.get("duration_ms") or 0),
+        track_id=track_id,
+        track_name=track.get("name") or "Unknown Track",
+        album_id=album.get("id") or f"alb_{track_id}",
+        album_name=album.get("name") or "Unknown Album",
+        artist_ids=tuple(a.get("id") or f"art_{idx}_{track_id}" for idx, a in enumerate(artists)),
+        artist_names=tuple(a.get("name") or "Unknown Artist" for a in artists),
+        duration_ms=track.get("duration_ms"),
+        explicit=track.get("explicit"),
+        popularity=track.get("popularity"),
+        context_type=context.get("type"),
+        context_id=context.get("uri"),
+    )
+
+
+def is_podcast_item(item: dict[str, Any]) -> bool:
+    return bool(item.get("spotify_episode_uri")) and not item.get("spotify_track_uri")
+
+
+def history_records(
+    items: list[dict[str, Any]], include_podcasts: bool = True
+) -> list[ListenRecord]:
+    # Normalizes a chunk column by column: each field is pulled out in one pass and album, artist
+    # and synthetic track ids are hashed once per distinct name instead of once per row.
+    items = [
+        item for item in items if item.get("ts") and (include_podcasts or not is_podcast_item(item))
+    ]
+    played_at = [datetime.fromisoformat(item["ts"]).astimezone(UTC) for item in items]
+    ms_played = [int(item.get("ms_played") or 0) for item in items]
+    track_names = [item.get("master_metadata_track_name") or "Unknown Track" for item in items]
+    artist_names = [
+        item.get("master_metadata_album_artist_name") or "Unknown Artist" for item in items
+    ]
+    album_names = [
+        item.get("master_metadata_album_album_name") or "Unknown Album" for item in items
+    ]
+    uri_ids = [(item.get("spotify_track_uri") or "").rpartition(":")[2] for item in items]
+
+    columns = zip(
+        played_at, ms_played, uri_ids, track_names, album_names, artist_names, strict=True
+    )
+    return [
+        ListenRecord(
+            at,
+            ms,
+            uri_id or synthetic_track_id(track, artist, album),
+            track,
+            _name_id("alb_", album),
+            album,
+            (_name_id("art_", artist),),
+            (artist,),
+        )
+        for at, ms, uri_id, track, album, artist in columns
+    ]
+
+
+@lru_cache(maxsize=NAME_ID_CACHE_SIZE)
+def _name_id(prefix: str, name: str) -> str:
+    return f"{prefix}{hashlib.sha1(name.encode('utf-8')).hexdigest()[:16]}"
+
+
+def iter_history_record_chunks(
+    source: HistorySource,
+    chunk_rows: int = CHUNK_ROWS,
+    include_podcasts: bool = True,
+    skip_items: int = 0,
+) -> Iterator[tuple[int, list[ListenRecord]]]:
+    # Yields (items_consumed, records); items_consumed counts raw array items, skipped ones too,
+    # so callers can checkpoint a resumable offset into the file.
+    items = islice(iter_history_items(source), skip_items, None)
+    while chunk := list(islice(items, chunk_rows)):
+        yield len(chunk), history_records(chunk, include_podcasts=include_podcasts)
@@ -1,10 +1,24 @@
-from datetime import UTC, date, datetime
+import random
+from datetime import UTC, date, datetime, timedelta
 
 from sqlalchemy import create_engine, text
 from sqlalchemy.orm import sessionmaker
 
+from analytics.date_ranges import DateRange
 from db.models import Base
-from db.repository import refresh_daily_aggregate_for_day
+from db.repository import (
+    Pagination,
+    album_daily_trend,
+    get_kpis,
+    refresh_daily_aggregate_for_day,
+    refresh_daily_aggregates,
+    top_albums,
+    top_artists,
+    top_genres,
+    top_songs,
+)
+from db.synthetic_history import generate_history, insert_history
+from db.timestamps import epoch_day, epoch_ms, from_epoch_day
 
 
 def test_refresh_daily_aggregate_for_day(monkeypatch) -> None:
@@ -27,8 +41,8 @@ def test_refresh_daily_aggregate_for_day(monkeypatch) -> None:
                 """
             ),
             {
-                "played_at": datetime(2026, 2, 14, 9, 0, tzinfo=UTC),
-                "ms_played": 180000,
+                "played_at": epoch_ms(datetime(2026, 2, 14, 9, 0, tzinfo=UTC)),
+                "ms_played": 179999,
             },
         )
         session.commit()
@@ -39,7 +53,7 @@ def test_refresh_daily_aggregate_for_day(monkeypatch) -> None:
         row = session.execute(
             text(
                 """
-                SELECT minutes, plays, unique_tracks, unique_artists, unique_albums
+                SELECT ms_played, plays, unique_tracks, unique_artists, unique_albums
                 FROM aggregates_daily
                 WHERE day = '2026-02-14'
                 """
@@ -47,8 +61,281 @@ def test_refresh_daily_aggregate_for_day(monkeypatch) -> None:
         ).first()
 
     assert row is not None
-    assert row[0] == 3
+    assert row[0] == 179999
     assert row[1] == 1
     assert row[2] == 1
     assert row[3] == 1
     assert row[4] == 1
+
+
+def test_refresh_daily_aggregates_for_days_range_and_rebuild(monkeypatch) -> None:
+    engine = create_engine("sqlite+pysqlite:///:memory:", future=True)
+    TestingSessionLocal = sessionmaker(bind=engine, future=True)
+    Base.metadata.create_all(engine)
+
+    monkeypatch.setattr("db.repository.SessionLocal", TestingSessionLocal)
+
+    with TestingSessionLocal() as session:
+        session.execute(text("INSERT INTO albums(id, name) VALUES('alb1', 'Album 1')"))
+        session.execute(
+            text("INSERT INTO tracks(id, name, album_id) VALUES('trk1', 'Track 1', 'alb1')")
+        )
+        session.execute(
+            text("INSERT INTO artists(id, name) VALUES('art1', 'Artist 1'), ('art2', 'Artist 2')")
+        )
+        session.execute(
+            text(
+                "INSERT INTO track_artists(track_id, artist_id) "
+                "VALUES('trk1', 'art1'), ('trk1', 'art2')"
+            )
+        )
+        for played_at in (
+            datetime(2026, 2, 14, 9, 0, tzinfo=UTC),
+            datetime(2026, 2, 14, 23, 59, tzinfo=UTC),
+            datetime(2026, 2, 16, 0, 0, tzinfo=UTC),
+        ):
+            session.execute(
+                text(
+                    """
+                    INSERT INTO listens(
+                        played_at, ms_played, track_id, context_type, context_id, device_name
+                    )
+                    VALUES(:played_at, 120000, 'trk1', NULL, NULL, NULL)
+                    """
+                ),
+                {"played_at": epoch_ms(played_at)},
+            )
+        session.commit()
+
+    def aggregates() -> list[tuple]:
+        with TestingSessionLocal() as session:
+            return [
+                tuple(row)
+                for row in session.execute(
+                    text(
+                        "SELECT day, ms_played, plays, unique_artists "
+                        "FROM aggregates_daily ORDER BY day"
+                    )
+                )
+            ]
+
+    assert refresh_daily_aggregates([date(2026, 2, 14), date(2026, 2, 14)]) == 1
+    assert aggregates() == [("2026-02-14", 240000, 2, 2)]
+
+    refresh_daily_aggregates(DateRange(date(2026, 2, 15), date(2026, 2, 16)))
+    assert aggregates() == [
+        ("2026-02-14", 240000, 2, 2),
+        ("2026-02-15", 0, 0, 0),
+        ("2026-02-16", 120000, 1, 2),
+    ]
+
+    assert refresh_daily_aggregates() == 2
+    assert aggregates() == [("2026-02-14", 240000, 2, 2), ("2026-02-16", 120000, 1, 2)]
+
+
+def test_entity_rollups_follow_inserted_and_removed_listens(monkeypatch) -> None:
+    engine = create_engine("sqlite+pysqlite:///:memory:", future=True)
+    TestingSessionLocal = sessionmaker(bind=engine, future=True)
+    Base.metadata.create_all(engine)
+
+    monkeypatch.setattr("db.repository.SessionLocal", TestingSessionLocal)
+
+    with TestingSessionLocal() as session:
+        session.execute(text("INSERT INTO albums(id, name) VALUES('alb1', 'Album 1')"))
+        session.execute(
+            text("INSERT INTO tracks(id, name, album_id) VALUES('trk1', 'Track 1', 'alb1')")
+        )
+        session.execute(
+            text("INSERT INTO artists(id, name) VALUES('art1', 'Artist 1'), ('art2', 'Artist 2')")
+        )
+        session.execute(
+            text(
+                "INSERT INTO track_artists(track_id, artist_id) "
+                "VALUES('trk1', 'art1'), ('trk1', 'art2')"
+            )
+        )
+        session.execute(text("INSERT INTO genres(id, name) VALUES(1, 'indie'), (2, 'rock')"))
+        session.execute(
+            text(
+                "INSERT INTO artist_genres(artist_id, genre_id) "
+                "VALUES('art1', 1), ('art2', 1), ('art2', 2)"
+            )
+        )
+        for played_at in (
+            datetime(2026, 2, 14, 9, 0, tzinfo=UTC),
+            datetime(2026, 2, 14, 23, 59, tzinfo=UTC),
+            datetime(2026, 2, 16, 0, 0, tzinfo=UTC),
+        ):
+            session.execute(
+                text(
+                    "INSERT INTO listens(played_at, ms_played, track_id) "
+                    "VALUES(:played_at, 120000, 'trk1')"
+                ),
+                {"played_at": epoch_ms(played_at)},
+            )
+        session.commit()
+    refresh_daily_aggregates([date(2026, 2, 14), date(2026, 2, 16)])
+
+    february = DateRange(date(2026, 2, 1), date(2026, 2, 28))
+    songs = top_songs(february)[["plays", "minutes", "artists"]]
+    # A track with two artists is still one play per listen.
+    assert songs.values.tolist() == [[3, 6.0, "Artist 1, Artist 2"]]
+    assert top_artists(february)[["id", "plays"]].values.tolist() == [["art1", 3], ["art2", 3]]
+    # Both artists are indie, but each listen counts once per genre.
+    genres = top_genres(february)[["name", "plays", "minutes"]].values.tolist()
+    assert sorted(genres) == [["indie", 3, 6.0], ["rock", 3, 6.0]]
+    assert album_daily_trend("alb1", february)[["day", "plays"]].values.tolist() == [
+        ["2026-02-14", 2],
+        ["2026-02-16", 1],
+    ]
+
+    with TestingSessionLocal() as session:
+        session.execute(text("DELETE FROM listens WHERE played_day = 20500"))
+        session.commit()
+    refresh_daily_aggregates([date(2026, 2, 16)])
+    assert top_songs(february)["plays"].tolist() == [2]
+    assert album_daily_trend("alb1", february)["day"].tolist() == ["2026-02-14"]
+
+    def rollups() -> list[tuple]:
+        with TestingSessionLocal() as session:
+            return [
+                tuple(row)
+                for table in ("track_daily", "artist_daily", "album_daily", "genre_daily")
+                for row in session.execute(text(f"SELECT * FROM {table} ORDER BY 1, 2"))
+            ]
+
+    incremental = rollups()
+    refresh_daily_aggregates()
+    assert rollups() == incremental
+
+
+_RAW_RANKINGS = {
+    top_songs: """
+        SELECT l.track_id AS id, COUNT(*), SUM(l.ms_played), MAX(l.played_at)
+        FROM listens l
+        WHERE l.played_day BETWEEN :first_day AND :last_day
+        GROUP BY l.track_id
+    """,
+    top_artists: """
+        SELECT ta.artist_id AS id, COUNT(*), SUM(l.ms_played), MAX(l.played_at)
+        FROM listens l
+        JOIN track_artists ta ON ta.track_id = l.track_id
+        WHERE l.played_day BETWEEN :first_day AND :last_day
+        GROUP BY ta.artist_id
+    """,
+    top_albums: """
+        SELECT t.album_id AS id, COUNT(*), SUM(l.ms_played), MAX(l.played_at)
+        FROM listens l
+        JOIN tracks t ON t.id = l.track_id
+        WHERE l.played_day BETWEEN :first_day AND :last_day AND t.album_id IS NOT NULL
+        GROUP BY t.album_id
+    """,
+    top_genres: """
+        SELECT g.name AS id, COUNT(*), SUM(l.ms_played), NULL
+        FROM listens l
+        JOIN (
+          SELECT DISTINCT ta.track_id, ag.genre_id
+          FROM track_artists ta
+          JOIN artist_genres ag ON ag.artist_id = ta.artist_id
+        ) tg ON tg.track_id = l.track_id
+        JOIN genres g ON g.id = tg.genre_id
+        WHERE l.played_day BETWEEN :first_day AND :last_day
+        GROUP BY g.name
+    """,
+}
+
+
+_RAW_UNIQUES = """
+    SELECT COUNT(DISTINCT l.track_id), COUNT(DISTINCT ta.artist_id), COUNT(DISTINCT t.album_id)
+    FROM listens l
+    JOIN tracks t ON t.id = l.track_id
+    LEFT JOIN track_artists ta ON ta.track_id = l.track_id
+    WHERE l.played_day BETWEEN :first_day AND :last_day
+"""
+
+
+def test_tiered_rankings_and_kpis_match_listens_on_random_ranges(monkeypatch) -> None:
+    engine = create_engine("sqlite+pysqlite:///:memory:", future=True)
+    TestingSessionLocal = sessionmaker(bind=engine, future=True)
+    Base.metadata.create_all(engine)
+    monkeypatch.setattr("db.repository.SessionLocal", TestingSessionLocal)
+
+    catalog, history = generate_history(6_000, seed=5, end=date(2026, 2, 14), days=1_100)
+    with TestingSessionLocal() as session:
+        insert_history(session, catalog, history)
+        # Removed listens must leave the month and year tiers through an incremental refresh.
+        removed_days = session.execute(
+            text("SELECT DISTINCT played_day FROM listens WHERE id % 97 = 0")
+        ).scalars().all()
+        session.execute(text("DELETE FROM listens WHERE id % 97 = 0"))
+        refresh_daily_aggregates([from_epoch_day(day) for day in removed_days], session=session)
+        session.commit()
+
+    def ranked(function, date_range: DateRange, limit: int = 100_000) -> list[tuple]:
+        df = function(date_range, pagination=Pagination(limit=limit))
+        if function is top_genres:
+            keys, last = df["name"], [None] * len(df)
+        else:
+            keys = df["id"]
+            last = df["last_played"].map(lambda value: epoch_ms(value.to_pydatetime()))
+        return list(zip(keys, df["plays"], round(df["minutes"] * 60000), last, strict=True))
+
+    rng = random.Random(23)
+    first = date(2023, 2, 1)
+    for _ in range(25):
+        start = first + timedelta(days=rng.randrange(1_100))
+        date_range = DateRange(start, start + timedelta(days=rng.randrange(800)))
+        params = {"first_day": epoch_day(date_range.start), "last_day": epoch_day(date_range.end)}
+        with TestingSessionLocal() as session:
+            for function, sql in _RAW_RANKINGS.items():
+                expected = sorted(tuple(row) for row in session.execute(text(sql), params))
+                assert sorted(ranked(function, date_range)) == expected, (function, date_range)
+
+                # Short heads are re-scored from the top-K candidates.
+                by_score = sorted(expected, key=lambda row: (-row[2], -row[1]))
+                head = ranked(function, date_range, 10)
+                assert set(head) <= set(expected)
+                assert [row[1:3] for row in head] == [row[1:3] for row in by_score[:10]]
+            uniques = session.execute(text(_RAW_UNIQUES), params).one()
+
+        # Every day holds far fewer ids than the sketch's sparse limit, so both modes are exact.
+        kpis = get_kpis(date_range)
+        assert kpis == get_kpis(date_range, exact=True)
+        assert (kpis["unique_songs"], kpis["unique_artists"], kpis["unique_albums"]) == uniques
+
+
+def test_top_k_head_falls_back_when_an_unlisted_id_could_lead(monkeypatch) -> None:
+    engine = create_engine("sqlite+pysqlite:///:memory:", future=True)
+    TestingSessionLocal = sessionmaker(bind=engine, future=True)
+    Base.metadata.create_all(engine)
+    monkeypatch.setattr("db.repository.SessionLocal", TestingSessionLocal)
+    monkeypatch.setattr("db.repository.TOP_K", 2)
+
+    # trk_c is only third in each month but first over both.
+    listens = {
+        date(2026, 1, 10): [("trk_a", 10), ("trk_b", 9), ("trk_c", 8)],
+        date(2026, 2, 10): [("trk_d", 10), ("trk_e", 9), ("trk_c", 8)],
+    }
+    with TestingSessionLocal() as session:
+        for track_id in ("trk_a", "trk_b", "trk_c", "trk_d", "trk_e"):
+            session.execute(
+                text("INSERT INTO tracks(id, name) VALUES(:id, :id)"), {"id": track_id}
+            )
+        for day, plays in listens.items():
+            for hour, (track_id, minutes) in enumerate(plays):
+                session.execute(
+                    text(
+                        "INSERT INTO listens(played_at, ms_played, track_id) VALUES(:at, :ms, :id)"
+                    ),
+                    {
+                        "at": epoch_ms(datetime(day.year, day.month, day.day, hour, tzinfo=UTC)),
+                        "ms": minutes * 60000,
+                        "id": track_id,
+                    },
+                )
+        session.commit()
+    refresh_daily_aggregates(list(listens))
+
+    date_range = DateRange(date(2026, 1, 1), date(2026, 2, 28))
+    head = top_songs(date_range, pagination=Pagination(limit=2))
+    assert head[["id", "minutes"]].values.tolist() == [["trk_c", 16.0], ["trk_a", 10.0]]
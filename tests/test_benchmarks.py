@@ -0,0 +1,82 @@
+import pytest
+
+from benchmarks.datasets import dataset_path, use_database
+from benchmarks.ingest import prepare_inputs, run_scenario
+from benchmarks.repository_queries import (
+    QUERIES,
+    QueryTiming,
+    compare_to_baseline,
+    run_suite,
+    steps_suite,
+)
+from db import slow_queries
+from db.session import SessionLocal
+
+
+def test_repository_benchmark_runs_every_query(tmp_path) -> None:
+    bind, threshold = SessionLocal.kw["bind"], slow_queries.SLOW_QUERY_MS
+
+    timings = run_suite([3_000], data_dir=tmp_path, repeat=1)
+
+    assert dataset_path(3_000, tmp_path).exists()
+    assert {timing.query for timing in timings} == set(QUERIES)
+    assert all(timing.p95_ms >= timing.p50_ms > 0 for timing in timings)
+    kpis = [timing for timing in timings if timing.query == "get_kpis"]
+    presets = [timing.preset for timing in kpis]
+    assert presets == ["Today", "This Month", "This Year", "Last 3 Years"]
+    assert (SessionLocal.kw["bind"], slow_queries.SLOW_QUERY_MS) == (bind, threshold)
+
+
+def test_use_database_restores_session_and_slow_query_log_on_error(tmp_path) -> None:
+    bind, threshold = SessionLocal.kw["bind"], slow_queries.SLOW_QUERY_MS
+
+    with pytest.raises(RuntimeError):
+        with use_database(tmp_path / "broken.db", slow_query_ms=0) as engine:
+            assert SessionLocal.kw["bind"] is engine
+            assert slow_queries.SLOW_QUERY_MS == 0
+            raise RuntimeError("benchmark failed")
+
+    assert SessionLocal.kw["bind"] is bind
+    assert slow_queries.SLOW_QUERY_MS == threshold
+
+
+def test_steps_benchmark_counts_instructions_per_query(tmp_path) -> None:
+    counts = steps_suite([3_000], data_dir=tmp_path)["3000"]
+
+    assert {key.split("/")[0] for key in counts} == set(QUERIES)
+    assert counts["top_songs/Last 3 Years"] > 0
+    assert steps_suite([3_000], data_dir=tmp_path, queries=["top_songs"])["3000"] == {
+        key: count for key, count in counts.items() if key.startswith("top_songs/")
+    }
+
+
+def test_compare_to_baseline_flags_slowdowns_and_row_changes() -> None:
+    baseline = {
+        "threshold": 0.25,
+        "results": {
+            "1m/top_songs/This Year": {"p50_ms": 40.0, "p95_ms": 45.0, "rows": 50},
+            "1m/get_kpis/Today": {"p50_ms": 1.0, "p95_ms": 1.2, "rows": 1},
+        },
+    }
+    timings = [
+        QueryTiming("1m", "top_songs", "This Year", p50_ms=60.0, p95_ms=70.0, rows=49),
+        QueryTiming("1m", "get_kpis", "Today", p50_ms=2.5, p95_ms=3.0, rows=1),
+        QueryTiming("1m", "top_albums", "Today", p50_ms=500.0, p95_ms=600.0, rows=1),
+    ]
+
+    problems = compare_to_baseline(timings, baseline)
+
+    assert len(problems) == 2
+    assert all(problem.startswith("1m/top_songs/This Year") for problem in problems)
+    assert compare_to_baseline(timings[:1], baseline, threshold=1.0) == [problems[0]]
+
+
+def test_ingest_benchmark_counts_listens_and_statements(tmp_path) -> None:
+    inputs = prepare_inputs("sync", 500, tmp_path, sync_calls=4)
+    result = run_scenario("sync", inputs, tmp_path)
+
+    assert len(inputs) == 4
+    assert result.listens == 200
+    assert 0 < result.inserted <= result.listens
+    assert result.statements_per_listen > 0
+    assert result.peak_rss_mb > 0
@@ -1,5 +1,7 @@
-from datetime import date
+import random
+from datetime import date, timedelta
 
+from analytics.date_ranges import DateRange, plan_range
 from app.ui.date_filter import date_range_from_preset
 
 
@@ -14,3 +16,40 @@ def test_last_3_years_range() -> None:
     result = date_range_from_preset("last_3_years", today=date(2026, 2, 14))
     assert result.start == date(2024, 1, 1)
     assert result.end == date(2026, 2, 14)
+
+
+def test_plan_range_splits_random_ranges_into_aligned_spans() -> None:
+    rng = random.Random(11)
+    for _ in range(500):
+        start = date(2022, 1, 1) + timedelta(days=rng.randrange(1500))
+        end = start + timedelta(days=rng.randrange(1200))
+        plan = plan_range(DateRange(start, end))
+
+        assert len(plan.years) <= 1 and len(plan.months) <= 2 and len(plan.days) <= 2
+        for span in plan.years:
+            assert (span.start.month, span.start.day) == (1, 1)
+            assert (span.end.month, span.end.day) == (12, 31)
+        for span in plan.months:
+            assert span.start.day == 1
+            assert (span.end + timedelta(days=1)).day == 1
+
+        covered = [
+            span.start + timedelta(days=offset)
+            for span in plan.years + plan.months + plan.days
+            for offset in range((span.end - span.start).days + 1)
+        ]
+        assert sorted(covered) == [
+            start + timedelta(days=offset) for offset in range((end - start).days + 1)
+        ]
+
+
+def test_plan_range_keeps_short_ranges_as_days() -> None:
+    plan = plan_range(DateRange(date(2026, 1, 31), date(2026, 3, 1)))
+    assert plan.years == ()
+    assert [(span.start, span.end) for span in plan.months] == [
+        (date(2026, 2, 1), date(2026, 2, 28))
+    ]
+    assert [(span.start, span.end) for span in plan.days] == [
+        (date(2026, 1, 31), date(2026, 1, 31)),
+        (date(2026, 3, 1), date(2026, 3, 1)),
+    ]
@@ -0,0 +1,128 @@
+import hashlib
+import io
+import json
+import os
+import zipfile
+from datetime import UTC, datetime
+
+import pytest
+
+from spotify.history import history_zip_members, iter_history_items
+from spotify.import_pool import iter_parsed_chunks
+from spotify.normalize import history_records, iter_history_record_chunks
+
+
+def test_iter_history_items_across_chunk_boundaries() -> None:
+    items = [
+        {"ts": f"2026-02-14T09:{idx % 60:02d}:00Z", "ms_played": idx * 1000, "name": "Björk ✓"}
+        for idx in range(200)
+    ]
+    payload = ("\ufeff" + json.dumps(items, indent=2, ensure_ascii=False)).encode("utf-8")
+
+    result = list(iter_history_items(io.BytesIO(payload), chunk_size=7))
+
+    assert result == items
+
+
+def test_iter_history_items_ignores_non_array_payload() -> None:
+    assert list(iter_history_items(io.BytesIO(b'{"ts": "2026-02-14T09:00:00Z"}'))) == []
+    assert list(iter_history_items(io.BytesIO(b" [ ] "))) == []
+
+
+def test_iter_parsed_chunks_reports_each_source_from_worker_pool(tmp_path) -> None:
+    paths = []
+    for idx in range(2):
+        path = tmp_path / f"Streaming_History_Audio_{idx}.json"
+        rows = [
+            {"ts": f"2026-02-14T09:0{i}:00Z", "ms_played": 1000, "spotify_track_uri": f"t:{i}"}
+            for i in range(idx + 2)
+        ]
+        path.write_text(json.dumps(rows), encoding="utf-8")
+        paths.append(str(path))
+
+    # An in-memory upload is parsed by the writer process alongside the pooled files.
+    upload = io.BytesIO(json.dumps([{"ts": "2026-02-14T10:00:00Z", "ms_played": 1}]).encode())
+    records: dict[int, int] = {0: 0, 1: 0, 2: 0}
+    finished: list[int] = []
+    for index, chunk in iter_parsed_chunks([*paths, upload], workers=2):
+        if chunk is None:
+            finished.append(index)
+        else:
+            records[index] += len(chunk[1])
+
+    assert records == {0: 2, 1: 3, 2: 1}
+    assert sorted(finished) == [0, 1, 2]
+
+
+def _exit_without_reporting(*_args) -> None:
+    os._exit(3)
+
+
+def test_iter_parsed_chunks_raises_when_a_parser_process_dies(tmp_path, monkeypatch) -> None:
+    paths = []
+    for idx in range(2):
+        path = tmp_path / f"Streaming_History_Audio_{idx}.json"
+        path.write_text("[]", encoding="utf-8")
+        paths.append(str(path))
+    monkeypatch.setattr("spotify.import_pool._parse_into_queue", _exit_without_reporting)
+
+    with pytest.raises(RuntimeError, match="exited with code 3"):
+        list(iter_parsed_chunks(paths, workers=2))
+
+
+def test_history_zip_members_streams_audio_history_only() -> None:
+    audio = [
+        {"ts": "2026-02-14T09:00:00Z", "ms_played": 1000, "spotify_track_uri": "spotify:track:t1"},
+        {"ts": "2026-02-14T09:05:00Z", "ms_played": 2000, "spotify_episode_uri": "e1"},
+    ]
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, "w", compression=zipfile.ZIP_DEFLATED) as handle:
+        folder = "Spotify Extended Streaming History"
+        handle.writestr(f"{folder}/Streaming_History_Audio_2026.json", json.dumps(audio))
+        handle.writestr(f"{folder}/Streaming_History_Video_2026.json", "[]")
+        handle.writestr(f"{folder}/ReadMeFirst.pdf", b"%PDF")
+
+    members = history_zip_members(archive)
+    assert [member.name for member in members] == ["Streaming_History_Audio_2026.json"]
+    assert len(history_zip_members(archive, include_video=True)) == 2
+
+    assert list(iter_history_items(members[0])) == audio
+    chunks = list(iter_history_record_chunks(members[0], include_podcasts=False))
+    assert [record.track_id for _, chunk in chunks for record in chunk] == ["t1"]
+    assert sum(items for items, _ in chunks) == 2
+
+    uploads = history_zip_members(archive) + [io.BytesIO(json.dumps(audio[:1]).encode("utf-8"))]
+    parsed = [chunk for _, chunk in iter_parsed_chunks(uploads, workers=2) if chunk is not None]
+    assert sorted(items for items, _ in parsed) == [1, 2]
+
+
+def test_history_records_keep_existing_id_scheme() -> None:
+    items = [
+        {
+            "ts": "2026-02-14T09:00:00Z",
+            "ms_played": 1000,
+            "spotify_track_uri": "spotify:track:abc",
+            "master_metadata_track_name": "Song",
+            "master_metadata_album_artist_name": "Artist",
+            "master_metadata_album_album_name": "Album",
+        },
+        {"ts": "2026-02-14T10:00:00.500+01:00", "ms_played": None},
+        {"ts": None, "ms_played": 5},
+        {"ts": "2026-02-14T11:00:00Z", "spotify_episode_uri": "spotify:episode:e1"},
+    ]
+
+    def sha1(value: str) -> str:
+        return hashlib.sha1(value.encode("utf-8")).hexdigest()
+
+    first, second, episode = history_records(items)
+    assert first.played_at == datetime(2026, 2, 14, 9, 0, tzinfo=UTC)
+    assert first.track_id == "abc"
+    assert first.album_id == f"alb_{sha1('Album')[:16]}"
+    assert first.artist_ids == (f"art_{sha1('Artist')[:16]}",)
+
+    assert str(second.played_at) == "2026-02-14 09:00:00.500000+00:00"
+    assert second.ms_played == 0
+    assert second.track_id == f"local_{sha1('Unknown Track|Unknown Artist|Unknown Album')[:20]}"
+    assert second.album_name == "Unknown Album"
+    assert episode.track_id == second.track_id
+    assert len(history_records(items, include_podcasts=False)) == 2
@@ -0,0 +1,97 @@
+import json
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from db.import_registry import begin_import, checkpoint_import
+from db.models import Base
+from spotify.history import content_hash
+from spotify.sync import import_extended_history_files
+
+
+def _no_client() -> None:
+    raise RuntimeError("offline")
+
+
+def test_import_resumes_from_checkpoint_and_skips_completed_files(tmp_path, monkeypatch) -> None:
+    engine = create_engine("sqlite+pysqlite:///:memory:", future=True)
+    TestingSessionLocal = sessionmaker(bind=engine, future=True)
+    Base.metadata.create_all(engine)
+    monkeypatch.setattr("spotify.sync.SessionLocal", TestingSessionLocal)
+    monkeypatch.setattr("db.repository.SessionLocal", TestingSessionLocal)
+    monkeypatch.setattr("spotify.sync.get_spotify_client", _no_client)
+
+    path = tmp_path / "Streaming_History_Audio_2026.json"
+    rows = [
+        {
+            "ts": f"2026-02-14T09:0{i}:00Z",
+            "ms_played": 60000,
+            "spotify_track_uri": f"spotify:track:t{i}",
+            "master_metadata_track_name": f"Song {i}",
+            "master_metadata_album_artist_name": "Artist",
+            "master_metadata_album_album_name": "Album",
+        }
+        for i in range(5)
+    ]
+    path.write_text(json.dumps(rows), encoding="utf-8")
+
+    digest = content_hash(path)
+    with TestingSessionLocal() as session:
+        begin_import(session, digest, path.name)
+        checkpoint_import(session, digest, 3)
+        session.commit()
+
+    assert import_extended_history_files([path]) == 2
+    assert import_extended_history_files([str(path)]) == 0
+
+    with TestingSessionLocal() as session:
+        tracks = session.execute(text("SELECT track_id FROM listens ORDER BY played_at")).scalars()
+        assert list(tracks) == ["t3", "t4"]
+        status, items_done = session.execute(
+            text("SELECT status, items_done FROM import_files WHERE content_hash = :h"),
+            {"h": digest},
+        ).one()
+    assert (status, items_done) == ("complete", 5)
+
+
+def test_import_without_podcasts_does_not_complete_an_import_with_podcasts(
+    tmp_path, monkeypatch
+) -> None:
+    engine = create_engine("sqlite+pysqlite:///:memory:", future=True)
+    TestingSessionLocal = sessionmaker(bind=engine, future=True)
+    Base.metadata.create_all(engine)
+    monkeypatch.setattr("spotify.sync.SessionLocal", TestingSessionLocal)
+    monkeypatch.setattr("db.repository.SessionLocal", TestingSessionLocal)
+    monkeypatch.setattr("spotify.sync.get_spotify_client", _no_client)
+
+    path = tmp_path / "Streaming_History_Audio_2026.json"
+    rows = [
+        {
+            "ts": "2026-02-14T09:00:00Z",
+            "ms_played": 60000,
+            "spotify_track_uri": "spotify:track:t0",
+            "master_metadata_track_name": "Song 0",
+            "master_metadata_album_artist_name": "Artist",
+            "master_metadata_album_album_name": "Album",
+        },
+        {
+            "ts": "2026-02-14T10:00:00Z",
+            "ms_played": 900000,
+            "spotify_episode_uri": "spotify:episode:e0",
+            "episode_name": "Episode 0",
+            "episode_show_name": "Show",
+        },
+    ]
+    path.write_text(json.dumps(rows), encoding="utf-8")
+
+    assert import_extended_history_files([path], include_podcasts=False) == 1
+    assert import_extended_history_files([path], include_podcasts=False) == 0
+    assert import_extended_history_files([path], include_podcasts=True) == 1
+    assert import_extended_history_files([path], include_podcasts=True) == 0
+
+    with TestingSessionLocal() as session:
+        assert session.execute(text("SELECT COUNT(*) FROM listens")).scalar_one() == 2
+        status, include_podcasts = session.execute(
+            text("SELECT status, include_podcasts FROM import_files")
+        ).one()
+    assert (status, bool(include_podcasts)) == ("complete", True)
@@ -0,0 +1,124 @@
+from datetime import UTC, date, datetime
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from db.ingest import DedupeIndex, DimensionCache, ListenRecord, ListenWriter
+from db.models import Base
+from db.timestamps import epoch_ms
+
+
+def _record(played_at: datetime, ms_played: int, track_id: str = "trk1") -> ListenRecord:
+    return ListenRecord(
+        played_at=played_at,
+        ms_played=ms_played,
+        track_id=track_id,
+        track_name=f"Track {track_id}",
+        album_id="alb1",
+        album_name="Album 1",
+        artist_ids=("art1", "art2"),
+        artist_names=("Artist 1", "Artist 2"),
+    )
+
+
+def test_listen_writer_dedupes_within_batch_and_against_existing_rows() -> None:
+    engine = create_engine("sqlite+pysqlite:///:memory:", future=True)
+    TestingSessionLocal = sessionmaker(bind=engine, future=True)
+    Base.metadata.create_all(engine)
+
+    first = datetime(2026, 2, 14, 9, 0, tzinfo=UTC)
+    second = datetime(2026, 2, 15, 23, 30, tzinfo=UTC)
+
+    with TestingSessionLocal() as session:
+        writer = ListenWriter(session, batch_size=2)
+        writer.add(_record(first, 180000))
+        stats = writer.close()
+        session.commit()
+    assert stats.inserted == 1
+
+    with TestingSessionLocal() as session:
+        writer = ListenWriter(session, batch_size=3)
+        writer.add(_record(first, 180500))
+        writer.add(_record(second, 200000))
+        writer.add(_record(second, 200900))
+        writer.add(_record(second, 200000, track_id="trk2"))
+        stats = writer.close()
+        session.commit()
+
+        listens = session.execute(text("SELECT COUNT(*) FROM listens")).scalar_one()
+        track_artists = session.execute(text("SELECT COUNT(*) FROM track_artists")).scalar_one()
+
+    assert stats.processed == 4
+    assert stats.inserted == 2
+    assert stats.touched_days == {date(2026, 2, 15)}
+    assert listens == 3
+    assert track_artists == 4
+
+
+def test_dedupe_index_matches_within_tolerance_after_loading_window() -> None:
+    engine = create_engine("sqlite+pysqlite:///:memory:", future=True)
+    TestingSessionLocal = sessionmaker(bind=engine, future=True)
+    Base.metadata.create_all(engine)
+
+    played_at = datetime(2026, 2, 14, 9, 0, tzinfo=UTC)
+    with TestingSessionLocal() as session:
+        writer = ListenWriter(session)
+        writer.add(_record(played_at, 180000))
+        writer.close()
+        session.commit()
+
+    stamp = epoch_ms(played_at)
+    dedupe = DedupeIndex()
+    with TestingSessionLocal() as session:
+        dedupe.load_window(session, stamp, stamp)
+
+    assert dedupe.contains(stamp, "trk1", 181000)
+    assert not dedupe.contains(stamp, "trk1", 181001)
+    assert not dedupe.contains(stamp, "trk2", 180000)
+    assert dedupe._missing(stamp, stamp + 1) == []
+
+
+def test_dimension_cache_skips_unchanged_rows_and_stays_bounded() -> None:
+    cache = DimensionCache(max_entries=2)
+
+    assert cache.changed("track", "trk1", ("Track 1", "alb1"))
+    assert not cache.changed("track", "trk1", ("Track 1", "alb1"))
+    assert cache.changed("track", "trk1", ("Track 1 (Remastered)", "alb1"))
+    assert cache.changed("album", "alb1", ("Album 1",))
+    assert cache.changed("artist", "art1", ("Artist 1",))
+
+    assert len(cache) == 2
+    assert cache.changed("track", "trk1", ("Track 1 (Remastered)", "alb1"))
+
+
+def test_dedupe_index_loads_batch_hours_and_releases_table_keys() -> None:
+    engine = create_engine("sqlite+pysqlite:///:memory:", future=True)
+    TestingSessionLocal = sessionmaker(bind=engine, future=True)
+    Base.metadata.create_all(engine)
+
+    early = datetime(2025, 1, 1, 9, 0, tzinfo=UTC)
+    between = datetime(2025, 6, 1, 9, 0, tzinfo=UTC)
+    late = datetime(2026, 2, 14, 9, 30, tzinfo=UTC)
+    with TestingSessionLocal() as session:
+        writer = ListenWriter(session)
+        for played_at in (early, between, late):
+            writer.add(_record(played_at, 180000))
+        writer.close()
+        session.commit()
+
+    dedupe = DedupeIndex()
+    with TestingSessionLocal() as session:
+        dedupe.load_hours(session, [epoch_ms(early), epoch_ms(late)])
+    assert dedupe.contains(epoch_ms(early), "trk1", 180000)
+    assert dedupe.contains(epoch_ms(late), "trk1", 180000)
+    assert not dedupe.contains(epoch_ms(between), "trk1", 180000)
+    assert len(dedupe) == 2
+
+    dedupe.add(epoch_ms(between), "trk2", 1000)
+    dedupe.release_loaded()
+    assert len(dedupe) == 1
+    assert not dedupe.contains(epoch_ms(early), "trk1", 180000)
+    assert dedupe.contains(epoch_ms(between), "trk2", 1500)
+    assert dedupe._missing(epoch_ms(early), epoch_ms(early) + 1) == [
+        (epoch_ms(early), epoch_ms(early) + 1)
+    ]
@@ -0,0 +1,59 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import spotipy
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from db.models import Base
+from spotify.metadata_resolver import resolve_track_ids
+
+
+class _FakeSpotifySearch(BaseHTTPRequestHandler):
+    queries: list[str] = []
+
+    def do_GET(self) -> None:  # noqa: N802
+        query = parse_qs(urlparse(self.path).query)["q"][0]
+        type(self).queries.append(query)
+        items = [] if "Unknown" in query else [{"id": f"id_{len(query)}"}]
+        body = json.dumps({"tracks": {"items": items}}).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *_args) -> None:  # type: ignore[no-untyped-def]
+        return
+
+
+def test_resolve_track_ids_dedupes_and_caches_hits_and_misses(monkeypatch) -> None:
+    engine = create_engine("sqlite+pysqlite:///:memory:", future=True)
+    TestingSessionLocal = sessionmaker(bind=engine, future=True)
+    Base.metadata.create_all(engine)
+    monkeypatch.setattr("spotify.metadata_resolver.SessionLocal", TestingSessionLocal)
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _FakeSpotifySearch)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    client = spotipy.Spotify(auth="fake-token", retries=0)
+    client.prefix = f"http://127.0.0.1:{server.server_port}/v1/"
+
+    pairs = [
+        ("Song A", "Artist"),
+        ("song a ", "ARTIST"),
+        ("Unknown Song", "Artist"),
+    ]
+    try:
+        first = resolve_track_ids(pairs, client=client, per_second=0)
+        second = resolve_track_ids(pairs, client=client, per_second=0)
+    finally:
+        server.shutdown()
+
+    assert len(_FakeSpotifySearch.queries) == 2
+    assert first == second
+    assert first[("song a", "artist")] is not None
+    assert first[("unknown song", "artist")] is None
+    with TestingSessionLocal() as session:
+        assert session.execute(text("SELECT COUNT(*) FROM track_resolutions")).scalar_one() == 2
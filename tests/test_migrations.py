@@ -0,0 +1,81 @@
+from datetime import date
+from pathlib import Path
+
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from analytics.date_ranges import DateRange
+from db.repository import daily_minutes, get_kpis
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+def test_upgrade_recomputes_baseline_daily_aggregates(tmp_path, monkeypatch) -> None:
+    url = f"sqlite:///{tmp_path / 'baseline.db'}"
+    monkeypatch.setenv("DATABASE_URL", url)
+    config = Config(str(ROOT / "alembic.ini"))
+    config.set_main_option("script_location", str(ROOT / "db" / "migrations"))
+    command.upgrade(config, "0003_app_settings")
+
+    engine = create_engine(url, future=True)
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO albums(id, name) VALUES('alb1', 'Album 1')"))
+        conn.execute(
+            text(
+                "INSERT INTO tracks(id, name, album_id) "
+                "VALUES('trk1', 'Track 1', 'alb1'), ('trk2', 'Track 2', 'alb1')"
+            )
+        )
+        conn.execute(text("INSERT INTO artists(id, name) VALUES('art1', 'A1'), ('art2', 'A2')"))
+        conn.execute(
+            text(
+                "INSERT INTO track_artists(track_id, artist_id) "
+                "VALUES('trk1', 'art1'), ('trk1', 'art2'), ('trk2', 'art1')"
+            )
+        )
+        for played_at, track_id in (
+            ("2026-02-14 09:00:00.000000+00:00", "trk1"),
+            ("2026-02-14 10:00:00.000000+00:00", "trk2"),
+            ("2026-02-15 09:00:00.000000+00:00", "trk2"),
+            ("2026-02-16 09:00:00.000000+00:00", "trk1"),
+        ):
+            conn.execute(
+                text(
+                    "INSERT INTO listens(played_at, ms_played, track_id) "
+                    "VALUES(:played_at, 90000, :track_id)"
+                ),
+                {"played_at": played_at, "track_id": track_id},
+            )
+        # What the baseline per-day refresh stored: minutes truncated, trk1's listen counted once
+        # per artist, and no row for the 16th, which was never refreshed.
+        conn.execute(
+            text(
+                "INSERT INTO aggregates_daily"
+                "(day, minutes, plays, unique_tracks, unique_artists, unique_albums) "
+                "VALUES('2026-02-14', 4, 3, 2, 2, 1), ('2026-02-15', 1, 1, 1, 1, 1)"
+            )
+        )
+
+    command.upgrade(config, "head")
+    monkeypatch.setattr("db.repository.SessionLocal", sessionmaker(bind=engine, future=True))
+
+    february = DateRange(date(2026, 2, 1), date(2026, 2, 28))
+    kpis = get_kpis(february)
+    assert (kpis["plays"], kpis["total_minutes"]) == (4, 6.0)
+    assert (kpis["unique_songs"], kpis["unique_artists"], kpis["unique_albums"]) == (2, 2, 1)
+    assert daily_minutes(february)[["day", "plays", "minutes"]].values.tolist() == [
+        ["2026-02-14", 2, 3.0],
+        ["2026-02-15", 1, 1.5],
+        ["2026-02-16", 1, 1.5],
+    ]
+    with engine.connect() as conn:
+        uniques = conn.execute(
+            text(
+                "SELECT unique_tracks, unique_artists, unique_albums "
+                "FROM aggregates_daily ORDER BY day"
+            )
+        ).all()
+    assert [tuple(row) for row in uniques] == [(2, 2, 1), (1, 1, 1), (1, 2, 1)]
+    engine.dispose()
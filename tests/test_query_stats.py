@@ -0,0 +1,88 @@
+from datetime import UTC, date, datetime
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from analytics.date_ranges import DateRange
+from db import query_stats
+from db.models import Base
+from db.repository import (
+    daily_minutes,
+    get_kpis,
+    refresh_daily_aggregates,
+    top_entities_for_dashboard,
+    top_songs,
+)
+from db.timestamps import epoch_ms
+
+
+def test_fetch_df_records_per_function_stats(monkeypatch) -> None:
+    engine = create_engine("sqlite+pysqlite:///:memory:", future=True)
+    TestingSessionLocal = sessionmaker(bind=engine, future=True)
+    Base.metadata.create_all(engine)
+    monkeypatch.setattr("db.repository.SessionLocal", TestingSessionLocal)
+    query_stats.reset()
+
+    with TestingSessionLocal() as session:
+        session.execute(text("INSERT INTO tracks(id, name) VALUES('trk1', 'Track 1')"))
+        session.execute(
+            text("INSERT INTO listens(played_at, ms_played, track_id) VALUES(:at, 1000, 'trk1')"),
+            {"at": epoch_ms(datetime(2026, 2, 14, 9, 0, tzinfo=UTC))},
+        )
+        session.commit()
+    refresh_daily_aggregates([date(2026, 2, 14)])
+
+    date_range = DateRange(start=date(2026, 2, 1), end=date(2026, 2, 28), label="Feb")
+    get_kpis(date_range)
+    get_kpis(date_range)
+    daily_minutes(date_range)
+
+    stats = query_stats.snapshot().set_index("query")
+    assert stats.loc["get_kpis", "calls"] == 2
+    assert stats.loc["get_kpis", "rows"] == 2
+    assert stats.loc["get_kpis", "memory_kb"] > 0
+    assert stats.loc["get_kpis", "p95_ms"] >= stats.loc["get_kpis", "p50_ms"] > 0
+    assert stats.loc["daily_minutes", "calls"] == 1
+
+    cache: dict[tuple, object] = {}
+
+    @query_stats.track_cache("cached_kpis")
+    def cached_kpis(start: date, end: date) -> object:
+        if (start, end) not in cache:
+            cache[(start, end)] = get_kpis(DateRange(start=start, end=end, label="cached"))
+        return cache[(start, end)]
+
+    for _ in range(3):
+        cached_kpis(date_range.start, date_range.end)
+
+    stats = query_stats.snapshot().set_index("query")
+    assert stats.loc["cached_kpis", "cache_misses"] == 1
+    assert stats.loc["cached_kpis", "cache_hits"] == 2
+    assert stats.loc["get_kpis", "calls"] == 3
+
+    # A ranking whose top-K pass falls back to the full query is still one call.
+    query_stats.reset()
+    monkeypatch.setattr("db.repository._top_k_settled", lambda _df, _pagination: False)
+    top_songs(date_range)
+    stats = query_stats.snapshot().set_index("query")
+    assert stats.loc["top_songs", "calls"] == 1
+
+    # A cached dashboard helper is one row holding both its calls and its cache lookups.
+    @query_stats.track_cache("top_entities_for_dashboard")
+    def cached_top(start: date, end: date) -> object:
+        if "top" not in cache:
+            cache["top"] = top_entities_for_dashboard(
+                DateRange(start=start, end=end, label="cached")
+            )
+        return cache["top"]
+
+    query_stats.reset()
+    for _ in range(2):
+        cached_top(date_range.start, date_range.end)
+    stats = query_stats.snapshot().set_index("query")
+    assert list(stats.index) == ["top_entities_for_dashboard"]
+    top = stats.loc["top_entities_for_dashboard"]
+    assert (top["calls"], top["cache_misses"], top["cache_hits"]) == (1, 1, 1)
+
+    query_stats.reset()
+    assert query_stats.snapshot().empty
@@ -0,0 +1,152 @@
+from datetime import UTC, date, datetime
+
+import pandas as pd
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from analytics.date_ranges import DateRange
+from db.models import Base
+from db.repository import (
+    daily_minutes,
+    genre_evolution,
+    hourly_distribution,
+    listened_days,
+    refresh_daily_aggregates,
+    top_songs,
+    weekday_week_matrix,
+    weekday_weekend,
+)
+from db.timestamps import epoch_ms, from_epoch_ms
+
+
+def test_epoch_ms_round_trips_and_treats_naive_as_utc() -> None:
+    aware = datetime(2026, 2, 14, 9, 0, 0, 500000, tzinfo=UTC)
+
+    assert epoch_ms(aware) == 1771059600500
+    assert epoch_ms(aware.replace(tzinfo=None)) == epoch_ms(aware)
+    assert from_epoch_ms(epoch_ms(aware)) == aware
+
+
+def test_integer_bucketing_matches_calendar(monkeypatch) -> None:
+    engine = create_engine("sqlite+pysqlite:///:memory:", future=True)
+    TestingSessionLocal = sessionmaker(bind=engine, future=True)
+    Base.metadata.create_all(engine)
+    monkeypatch.setattr("db.repository.SessionLocal", TestingSessionLocal)
+
+    # Sunday 23:59:59.999, Monday 00:00, Saturday 13:30, and a listen just past the range.
+    played = [
+        datetime(2026, 3, 1, 23, 59, 59, 999000, tzinfo=UTC),
+        datetime(2026, 3, 2, 0, 0, tzinfo=UTC),
+        datetime(2026, 3, 7, 13, 30, tzinfo=UTC),
+        datetime(2026, 3, 8, 0, 0, tzinfo=UTC),
+    ]
+    with TestingSessionLocal() as session:
+        session.execute(text("INSERT INTO albums(id, name) VALUES('alb1', 'Album 1')"))
+        session.execute(
+            text("INSERT INTO tracks(id, name, album_id) VALUES('trk1', 'Track 1', 'alb1')")
+        )
+        session.execute(text("INSERT INTO artists(id, name) VALUES('art1', 'Artist 1')"))
+        session.execute(
+            text("INSERT INTO track_artists(track_id, artist_id) VALUES('trk1', 'art1')")
+        )
+        session.execute(text("INSERT INTO genres(id, name) VALUES(1, 'indie')"))
+        session.execute(text("INSERT INTO artist_genres(artist_id, genre_id) VALUES('art1', 1)"))
+        for played_at in played:
+            session.execute(
+                text(
+                    "INSERT INTO listens(played_at, ms_played, track_id) "
+                    "VALUES(:played_at, 60000, 'trk1')"
+                ),
+                {"played_at": epoch_ms(played_at)},
+            )
+        session.commit()
+    refresh_daily_aggregates()
+
+    date_range = DateRange(start=date(2026, 3, 1), end=date(2026, 3, 7), label="Week")
+
+    assert list(daily_minutes(date_range)["day"]) == ["2026-03-01", "2026-03-02", "2026-03-07"]
+    assert listened_days(date_range) == [date(2026, 3, 1), date(2026, 3, 2), date(2026, 3, 7)]
+    assert list(hourly_distribution(date_range)["hour"]) == [0, 13, 23]
+    assert weekday_weekend(date_range) == {"weekday_minutes": 1.0, "weekend_minutes": 2.0}
+    assert list(genre_evolution(date_range, "week")["bucket"]) == ["2026-02-23", "2026-03-02"]
+    assert list(genre_evolution(date_range, "month")["bucket"]) == ["2026-03-01"]
+    last_played = top_songs(date_range)["last_played"].iloc[0]
+    assert last_played == pd.Timestamp("2026-03-07 13:30", tz="UTC")
+
+
+def test_calendar_columns_follow_iso_weeks_across_years() -> None:
+    engine = create_engine("sqlite+pysqlite:///:memory:", future=True)
+    Base.metadata.create_all(engine)
+    played = [
+        datetime(2025, 12, 28, 23, 0, tzinfo=UTC),
+        datetime(2026, 1, 1, 7, 15, tzinfo=UTC),
+        datetime(2026, 1, 4, 12, 0, tzinfo=UTC),
+    ]
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO albums(id, name) VALUES('alb1', 'Album 1')"))
+        conn.execute(
+            text("INSERT INTO tracks(id, name, album_id) VALUES('trk1', 'Track 1', 'alb1')")
+        )
+        for played_at in played:
+            conn.execute(
+                text(
+                    "INSERT INTO listens(played_at, ms_played, track_id) "
+                    "VALUES(:played_at, 1, 'trk1')"
+                ),
+                {"played_at": epoch_ms(played_at)},
+            )
+        rows = conn.execute(
+            text(
+                """
+                SELECT date(played_day * 86400, 'unixepoch'), played_hour, played_weekday,
+                       date(played_week * 86400, 'unixepoch')
+                FROM listens ORDER BY played_at
+                """
+            )
+        ).all()
+
+    # 2026-01-01 is a Thursday in the ISO week that starts on Monday 2025-12-29.
+    assert [tuple(row) for row in rows] == [
+        ("2025-12-28", 23, 6, "2025-12-22"),
+        ("2026-01-01", 7, 3, "2025-12-29"),
+        ("2026-01-04", 12, 6, "2025-12-29"),
+    ]
+
+
+def test_weekday_week_matrix_keeps_weeks_from_different_years_apart(monkeypatch) -> None:
+    engine = create_engine("sqlite+pysqlite:///:memory:", future=True)
+    TestingSessionLocal = sessionmaker(bind=engine, future=True)
+    Base.metadata.create_all(engine)
+    monkeypatch.setattr("db.repository.SessionLocal", TestingSessionLocal)
+
+    # Both Mondays start ISO week 1, of 2025 and 2026 respectively.
+    played = [
+        datetime(2024, 12, 30, 8, 0, tzinfo=UTC),
+        datetime(2025, 12, 29, 8, 0, tzinfo=UTC),
+        datetime(2026, 1, 3, 22, 0, tzinfo=UTC),
+    ]
+    with TestingSessionLocal() as session:
+        session.execute(text("INSERT INTO albums(id, name) VALUES('alb1', 'Album 1')"))
+        session.execute(
+            text("INSERT INTO tracks(id, name, album_id) VALUES('trk1', 'Track 1', 'alb1')")
+        )
+        for played_at in played:
+            session.execute(
+                text(
+                    "INSERT INTO listens(played_at, ms_played, track_id) "
+                    "VALUES(:played_at, 60000, 'trk1')"
+                ),
+                {"played_at": epoch_ms(played_at)},
+            )
+        session.commit()
+    refresh_daily_aggregates()
+
+    date_range = DateRange(start=date(2024, 12, 1), end=date(2026, 1, 31), label="Span")
+    matrix = weekday_week_matrix(date_range)
+    assert matrix.values.tolist() == [
+        ["2024-12-30", 0, 1.0],
+        ["2025-12-29", 0, 1.0],
+        ["2025-12-29", 5, 1.0],
+    ]
+    assert list(hourly_distribution(date_range)["hour"]) == [8, 22]
+    assert weekday_weekend(date_range) == {"weekday_minutes": 2.0, "weekend_minutes": 1.0}
@@ -0,0 +1,21 @@
+from analytics.sketches import SPARSE_LIMIT, build_sketch, merged_count
+
+
+def test_small_sets_count_exactly_and_merge_by_union() -> None:
+    monday = build_sketch(["a", "b", "c", "c"])
+    tuesday = build_sketch(["c", "d"])
+
+    assert merged_count([monday]) == 3
+    assert merged_count([monday, tuesday, None]) == 4
+    assert merged_count([]) == 0
+    assert len(build_sketch(str(i) for i in range(SPARSE_LIMIT))) == 1 + 8 * SPARSE_LIMIT
+
+
+def test_large_sets_estimate_within_two_percent() -> None:
+    ids = [f"track-{i}" for i in range(60_000)]
+    # Overlapping daily sketches, some already dense, merged into one estimate.
+    days = [build_sketch(ids[start : start + 5_000]) for start in range(0, 55_001, 2_500)]
+    days += [build_sketch(ids[start : start + 500]) for start in range(0, 60_000, 7_000)]
+
+    assert abs(merged_count(days) - 60_000) < 0.02 * 60_000
+    assert abs(merged_count([build_sketch(ids[:SPARSE_LIMIT + 1])]) - (SPARSE_LIMIT + 1)) < 50
@@ -0,0 +1,105 @@
+import time
+from datetime import date
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from analytics.date_ranges import DateRange
+from db import slow_queries
+from db.models import Base
+from db.repository import artist_daily_trend, daily_minutes, latest_listen, song_daily_trend
+
+
+def test_scans_listens_resolves_table_aliases() -> None:
+    sql = "SELECT 1 FROM listens l JOIN track_artists ta ON ta.track_id = l.track_id"
+
+    assert slow_queries.scans_listens(sql, ["SCAN l", "SEARCH ta USING INDEX x (track_id=?)"])
+    assert not slow_queries.scans_listens(sql, ["SCAN ta", "SEARCH l USING INDEX y (rowid=?)"])
+    assert slow_queries.scans_listens("SELECT 1 FROM listens WHERE 1", ["SCAN listens"])
+    assert not slow_queries.scans_listens("SELECT 1 FROM listens\nWHERE 1", ["SCAN WHERE"])
+
+
+def test_slow_queries_are_logged_with_plans_and_bounded(tmp_path, monkeypatch) -> None:
+    # The log is written from a background thread, so the database must be shared across threads.
+    engine = create_engine(f"sqlite+pysqlite:///{tmp_path / 'slow.db'}", future=True)
+    TestingSessionLocal = sessionmaker(bind=engine, future=True)
+    Base.metadata.create_all(engine)
+    monkeypatch.setattr("db.repository.SessionLocal", TestingSessionLocal)
+    monkeypatch.setattr("db.slow_queries.SessionLocal", TestingSessionLocal)
+    monkeypatch.setattr(slow_queries, "SLOW_QUERY_MS", 0.0)
+    monkeypatch.setattr(slow_queries, "SLOW_QUERY_LOG_SIZE", 3)
+
+    date_range = DateRange(start=date(2026, 2, 1), end=date(2026, 2, 28), label="Feb")
+    daily_minutes(date_range)
+    latest_listen()
+    slow_queries.flush()
+
+    logged = slow_queries.recent_slow_queries()
+    assert list(logged["query_name"]) == ["latest_listen", "daily_minutes"]
+    daily = logged.iloc[1]
+    assert "2026-02-01" in daily["params"]
+    assert "SEARCH aggregates_daily" in daily["query_plan"]
+    assert not daily["full_scan"]
+    assert logged.iloc[0]["full_scan"]
+
+    for _ in range(3):
+        daily_minutes(date_range)
+    slow_queries.flush()
+    assert len(slow_queries.recent_slow_queries()) == 3
+
+    monkeypatch.setattr(slow_queries, "SLOW_QUERY_MS", -1.0)
+    slow_queries.clear_slow_queries()
+    daily_minutes(date_range)
+    slow_queries.flush()
+    assert slow_queries.recent_slow_queries().empty
+
+
+def test_entity_trends_read_rollups_by_entity_and_day(tmp_path, monkeypatch) -> None:
+    engine = create_engine(f"sqlite+pysqlite:///{tmp_path / 'slow.db'}", future=True)
+    TestingSessionLocal = sessionmaker(bind=engine, future=True)
+    Base.metadata.create_all(engine)
+    monkeypatch.setattr("db.repository.SessionLocal", TestingSessionLocal)
+    monkeypatch.setattr("db.slow_queries.SessionLocal", TestingSessionLocal)
+    monkeypatch.setattr(slow_queries, "SLOW_QUERY_MS", 0.0)
+
+    date_range = DateRange(start=date(2026, 2, 1), end=date(2026, 2, 28), label="Feb")
+    song_daily_trend("trk1", date_range)
+    artist_daily_trend("art1", date_range)
+    slow_queries.flush()
+
+    logged = slow_queries.recent_slow_queries()
+    plans = dict(zip(logged["query_name"], logged["query_plan"], strict=True))
+    assert "COVERING INDEX ix_track_daily_track_day (track_id=? AND day>? AND day<?)" in (
+        plans["song_daily_trend"]
+    )
+    assert "COVERING INDEX ix_artist_daily_artist_day" in plans["artist_daily_trend"]
+    assert not logged["full_scan"].any()
+
+
+def test_slow_query_log_does_not_wait_for_a_locked_database(tmp_path, monkeypatch) -> None:
+    engine = create_engine(f"sqlite+pysqlite:///{tmp_path / 'slow.db'}", future=True)
+    TestingSessionLocal = sessionmaker(bind=engine, future=True)
+    Base.metadata.create_all(engine)
+    monkeypatch.setattr("db.repository.SessionLocal", TestingSessionLocal)
+    monkeypatch.setattr("db.slow_queries.SessionLocal", TestingSessionLocal)
+    monkeypatch.setattr(slow_queries, "SLOW_QUERY_MS", 0.0)
+
+    date_range = DateRange(start=date(2026, 2, 1), end=date(2026, 2, 28), label="Feb")
+    with engine.connect() as importer:
+        importer.exec_driver_sql("BEGIN IMMEDIATE")
+        started = time.perf_counter()
+        daily_minutes(date_range)
+        assert time.perf_counter() - started < 1
+        slow_queries.flush()
+        importer.exec_driver_sql("ROLLBACK")
+
+    assert slow_queries.recent_slow_queries().empty
+
+
+def test_slow_query_params_show_day_bounds_as_dates() -> None:
+    params = {"first_day": 20498, "year_start_0_first": 20454, "day_1_last": -1, "limit": 50}
+
+    assert slow_queries._readable_params(params) == (
+        '{"day_1_last": "1969-12-31", "first_day": "2026-02-14", "limit": 50, '
+        '"year_start_0_first": "2026-01-01"}'
+    )
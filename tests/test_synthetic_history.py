@@ -0,0 +1,55 @@
+from collections import Counter
+from datetime import date
+
+import numpy as np
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from db.models import Base
+from db.synthetic_history import generate_history, insert_history, write_history_files
+from spotify.history import iter_history_items
+from spotify.normalize import history_records
+
+
+def test_generate_history_is_reproducible_and_skewed() -> None:
+    catalog, history = generate_history(10_000, seed=7, end=date(2026, 2, 14))
+    _, again = generate_history(10_000, seed=7, end=date(2026, 2, 14))
+
+    assert len(history) == 10_000
+    assert np.array_equal(history.played_at, again.played_at)
+    assert np.array_equal(history.tracks, again.tracks)
+    assert np.all(np.diff(history.played_at) >= 0)
+
+    plays = Counter(history.tracks.tolist())
+    counts = sorted(plays.values(), reverse=True)
+    assert counts[0] > 20 * counts[len(counts) // 2]
+    assert any(len(artists) > 1 for artists in catalog.track_artists)
+    assert all(catalog.artist_genres)
+
+
+def test_synthetic_history_writes_files_and_bulk_inserts(tmp_path, monkeypatch) -> None:
+    engine = create_engine("sqlite+pysqlite:///:memory:", future=True)
+    TestingSessionLocal = sessionmaker(bind=engine, future=True)
+    Base.metadata.create_all(engine)
+    monkeypatch.setattr("db.repository.SessionLocal", TestingSessionLocal)
+
+    catalog, history = generate_history(20_000, seed=3, end=date(2026, 2, 14))
+
+    paths = write_history_files(catalog, history, tmp_path)
+    assert len(paths) == 2
+    records = [
+        record for path in paths for record in history_records(list(iter_history_items(path)))
+    ]
+    assert len(records) == len(history)
+    assert records[0].track_id == catalog.track_ids[history.tracks[0]]
+
+    with TestingSessionLocal() as session:
+        inserted = insert_history(session, catalog, history)
+        session.commit()
+        listens = session.execute(text("SELECT COUNT(*) FROM listens")).scalar_one()
+        plays = session.execute(text("SELECT SUM(plays) FROM aggregates_daily")).scalar_one()
+        genres = session.execute(text("SELECT COUNT(*) FROM artist_genres")).scalar_one()
+
+    assert inserted == listens == plays
+    assert listens > 19_900
+    assert genres >= len(catalog.artist_ids)